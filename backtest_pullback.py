@@ -4,7 +4,8 @@ Obiettivo: calibrare MIN_BODY_PCT, MIN_VOL_RATIO, MAX_DIST_EMA50_D.
 
 Metodologia:
   - Entry: open della candela SUCCESSIVA al segnale (realistico)
-  - Exit: SL fisso → -1R | Trailing 2×ATR attivo da 1.5R | Timeout 40 candele
+  - Exit: SL fisso → -1R | Ratchet floor del bot (RATCHET_TABLE) + trailing 2×ATR
+    attivo dal primo ratchet | Timeout 40 candele
   - P&L espresso in R (multipli del rischio)
   - Fee: 0.055% per lato × 2 = 0.11% round-trip (taker Bybit)
   - Leva 5× implicita nel sizing (1% equity / r_dist)
@@ -17,6 +18,8 @@ from ta.momentum import RSIIndicator
 from ta.volatility import AverageTrueRange
 from itertools import product
 
+from bybit_core.trailing import ladder_for
+
 warnings.filterwarnings("ignore")
 
 BASE = "https://api.bybit.com"
@@ -135,14 +138,15 @@ def compute_daily_ok(df4, df_d):
 FEE_RT     = 0.0011   # 0.055% × 2 lati
 SL_BUFFER  = 0.3
 TRAIL_MULT = 2.0
-TRAIL_R    = 1.5
 MAX_HOLD   = 40       # candele max (~6.7 giorni 4h)
 
 
 def simulate(df4, entry_idx, entry_price, sl_price, r_dist, atr0):
     if entry_idx >= len(df4):
         return np.nan
-    trail_active, trail_sl, peak = False, sl_price, entry_price
+    # Stessa scala ratchet del bot live (bybit_core.trailing)
+    ladder = ladder_for(entry_price, 1)
+    trail_active, active_sl, peak = False, sl_price, entry_price
     for i in range(entry_idx, min(entry_idx + MAX_HOLD, len(df4))):
         hi  = df4["High"].iat[i]
         lo  = df4["Low"].iat[i]
@@ -151,11 +155,12 @@ def simulate(df4, entry_idx, entry_price, sl_price, r_dist, atr0):
             atr = atr0
         if hi > peak:
             peak = hi
-        if not trail_active and peak >= entry_price + TRAIL_R * r_dist:
-            trail_active = True
+        floor_lev, floor_price = ladder.floor(peak)
+        if floor_lev is not None:
+            trail_active = True   # come nel bot: l'ATR trail parte col primo ratchet
+            active_sl = max(active_sl, floor_price)
         if trail_active:
-            trail_sl = max(trail_sl, peak - TRAIL_MULT * atr)
-        active_sl = trail_sl if trail_active else sl_price
+            active_sl = max(active_sl, peak - TRAIL_MULT * atr)
         if lo <= active_sl:
             pnl_r = (active_sl - entry_price) / r_dist
             return pnl_r - FEE_RT / (r_dist / entry_price)
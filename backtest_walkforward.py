@@ -16,6 +16,8 @@ from ta.momentum import RSIIndicator
 from ta.volatility import AverageTrueRange
 from itertools import product
 
+from bybit_core.trailing import ladder_for
+
 warnings.filterwarnings("ignore")
 np.random.seed(42)
 
@@ -29,7 +31,6 @@ COINS = [
 FEE_RT     = 0.0011
 SL_BUFFER  = 0.3
 TRAIL_MULT = 2.0
-TRAIL_R    = 1.5
 MAX_HOLD   = 40
 
 # ── DOWNLOAD ──────────────────────────────────────────────────────────────────
@@ -101,17 +102,19 @@ def compute_daily_ok(df4, df_d):
 # ── SIMULAZIONE TRADE ─────────────────────────────────────────────────────────
 def simulate(df4, entry_idx, entry_price, sl_price, r_dist, atr0):
     if entry_idx >= len(df4): return np.nan
-    trail_active, trail_sl, peak = False, sl_price, entry_price
+    ladder = ladder_for(entry_price, 1)   # ratchet identico al bot live
+    trail_active, active_sl, peak = False, sl_price, entry_price
     for i in range(entry_idx, min(entry_idx + MAX_HOLD, len(df4))):
         hi = df4["High"].iat[i]; lo = df4["Low"].iat[i]
         atr = df4["ATR"].iat[i]
         if pd.isna(atr) or atr <= 0: atr = atr0
         if hi > peak: peak = hi
-        if not trail_active and peak >= entry_price + TRAIL_R * r_dist:
+        floor_lev, floor_price = ladder.floor(peak)
+        if floor_lev is not None:
             trail_active = True
+            active_sl = max(active_sl, floor_price)
         if trail_active:
-            trail_sl = max(trail_sl, peak - TRAIL_MULT * atr)
-        active_sl = trail_sl if trail_active else sl_price
+            active_sl = max(active_sl, peak - TRAIL_MULT * atr)
         if lo <= active_sl:
             return (active_sl - entry_price) / r_dist - FEE_RT / (r_dist / entry_price)
     ep = df4["Close"].iat[min(entry_idx + MAX_HOLD - 1, len(df4) - 1)]
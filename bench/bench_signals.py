@@ -0,0 +1,101 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# BENCH SIGNALI — check_entry_signal per simbolo sulle finestre registrate
+#
+#   python bench/bench_signals.py                 percorso attuale (array NumPy)
+#   python bench/bench_signals.py --baseline REV  anche signals.py alla revisione
+#                                                 git REV (es. 223a66c, DataFrame)
+#
+# Finestre e indicatori sono preparati prima: si misura la sola valutazione
+# del segnale, come la vede lo scan. La versione REV arriva da `git show` e
+# riceve (DataFrame, indicatori) costruiti a ogni chiamata, come faceva allora
+# fetch_klines_ind. Round alternati, minimo per percorso.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+from bybit_core import signals  # noqa: E402
+from bybit_core.direction import LONG, SHORT  # noqa: E402
+from bybit_core.indicators import IndicatorTrack  # noqa: E402
+from bybit_core.klines import KLINE_COLUMNS, _parse_rows  # noqa: E402
+
+FIXTURE = os.path.join(ROOT, "tests", "fixtures", "signal_windows.json")
+
+
+def _load_windows() -> list:
+    with open(FIXTURE, encoding="utf-8") as fh:
+        recorded = json.load(fh)
+    windows = []
+    for w in recorded["windows"]:
+        ts, vals = _parse_rows(w["rows"])
+        windows.append((ts, vals, IndicatorTrack().sync(ts, vals)))
+    return windows
+
+
+def _baseline_module(rev: str) -> types.ModuleType:
+    src = subprocess.run(["git", "-C", ROOT, "show", f"{rev}:bybit_core/signals.py"],
+                         check=True, capture_output=True, text=True).stdout
+    mod = types.ModuleType(f"signals_{rev}")
+    exec(compile(src, f"{rev}:bybit_core/signals.py", "exec"), mod.__dict__)
+    return mod
+
+
+def _runner(mod, windows: list, as_frame: bool):
+    current = {}
+
+    def fetch(*_a, **_k):
+        ts, vals, ind = current["w"]
+        if not as_frame:
+            return ts, vals, ind
+        df = pd.DataFrame(vals, columns=KLINE_COLUMNS[1:])
+        df.insert(0, "timestamp", ts)
+        return df, ind
+
+    mod.fetch_klines_ind = fetch
+    mod.log = lambda _m: None
+
+    def run():
+        for d in (LONG, SHORT):
+            for rank in (1, 99):
+                for w in windows:
+                    current["w"] = w
+                    mod.check_entry_signal(d, "TESTUSDT", {}, rank=rank)
+    return run
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark di check_entry_signal")
+    ap.add_argument("--baseline", help="revisione git di bybit_core/signals.py da confrontare")
+    ap.add_argument("--repeat", type=int, default=7)
+    args = ap.parse_args()
+
+    windows = _load_windows()
+    paths = {"attuale": _runner(signals, windows, as_frame=False)}
+    if args.baseline:
+        paths[args.baseline] = _runner(_baseline_module(args.baseline), windows, as_frame=True)
+
+    best = {name: float("inf") for name in paths}
+    for _ in range(args.repeat):
+        for name, run in paths.items():
+            t0 = time.perf_counter()
+            run()
+            best[name] = min(best[name], time.perf_counter() - t0)
+    evals = 4 * len(windows)
+    for name, sec in best.items():
+        print(f"{name:10s} {sec / evals * 1e6:8.1f} µs per simbolo")
+    if args.baseline:
+        print(f"rapporto attuale/{args.baseline} {best['attuale'] / best[args.baseline]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Componenti condivisi dai bot LONG (main-pullback.py) e SHORT (main-short-pullback.py)."""
@@ -0,0 +1,88 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# ACCOUNT SNAPSHOT — equity e saldo USDT da una sola chiamata wallet-balance
+#
+# Durante uno scan equity e saldo servono più volte (cap di rischio, sizing di
+# ogni segnale, circuit breaker): una sola /v5/account/wallet-balance riempie
+# entrambi e resta valida per `ttl` secondi.
+# Dopo ogni fill o chiusura il chiamante invoca invalidate(): il sizing
+# successivo rilegge il wallet invece di usare un saldo superato.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import threading
+import time
+from typing import Callable, Optional
+
+DEFAULT_TTL_SEC = 10.0
+
+
+def parse_usdt_available(acct: dict) -> float:
+    """Saldo USDT disponibile dal record account di wallet-balance."""
+    for c in acct.get("coin", []):
+        if c.get("coin") == "USDT":
+            v = (c.get("availableToWithdraw")
+                 or c.get("availableBalance")
+                 or c.get("walletBalance") or "0")
+            return float(v)
+    return float(acct.get("totalAvailableBalance") or 0.0)
+
+
+def parse_total_equity(acct: dict) -> float:
+    """Equity totale dal record account di wallet-balance."""
+    return float(acct.get("totalEquity")
+                 or acct.get("totalAvailableBalance") or 0.0)
+
+
+class AccountSnapshot:
+    """
+    Cache a TTL breve di equity + saldo USDT.
+    `fetch` restituisce il record account (result.list[0]) o solleva eccezione;
+    gli errori non vengono messi in cache, la chiamata successiva riprova.
+    """
+
+    def __init__(self, fetch: Callable[[], dict], ttl: float = DEFAULT_TTL_SEC):
+        self._fetch = fetch
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._equity: Optional[float] = None
+        self._usdt: Optional[float] = None
+        self._ts = 0.0
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if self._usdt is not None and time.time() - self._ts <= self._ttl:
+                return
+            try:
+                acct = self._fetch()
+            except Exception:
+                self._equity = self._usdt = None
+                return
+            self._apply(acct)
+
+    def _apply(self, acct: dict) -> None:
+        try:
+            usdt = parse_usdt_available(acct)
+        except Exception:
+            usdt = 0.0
+        try:
+            equity = parse_total_equity(acct)
+        except Exception:
+            equity = usdt
+        self._equity, self._usdt, self._ts = equity, usdt, time.time()
+
+    def equity(self) -> float:
+        self._refresh()
+        return self._equity or 0.0
+
+    def usdt_available(self) -> float:
+        self._refresh()
+        return self._usdt or 0.0
+
+    def update(self, acct: dict) -> None:
+        """Record account spinto dallo stream privato (topic wallet): valido per `ttl` da ora."""
+        with self._lock:
+            self._apply(acct)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._equity = self._usdt = None
+            self._ts = 0.0
@@ -0,0 +1,91 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# ADAPTIVE ENGINE — storici vettorizzati per le soglie adattive (LONG e SHORT)
+#
+# Sostituisce i cicli `for j in range(...)` con .iloc/.max()/.mean() per barra:
+# le finestre mobili su h/l/v sono viste strided (sliding_window_view), quindi
+# ogni storico si calcola con una manciata di operazioni NumPy.
+# Le operazioni elemento per elemento sono le stesse del ciclo originale:
+# i valori risultanti sono identici bit per bit, anche con NaN e storico corto.
+#
+# Parità con il ciclo originale: tests/test_adaptive.py
+# ─────────────────────────────────────────────────────────────────────────────
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+RVOL_AVG_BARS = 20   # media volume sulle 20 barre precedenti
+
+
+def adaptive_histories(
+    c,
+    h,
+    l,
+    v,
+    atr_series,
+    last_idx: int,
+    base_lookback_bars: int,
+    adaptive_lookback_bars: int,
+    direction: int = 1,
+) -> dict:
+    """
+    Storici usati dalle soglie adattive fino a `last_idx` (incluso):
+      base:  ampiezza % della base (max high − min low sulle `base_lookback_bars` precedenti)
+      rvol:  volume / media volume delle 20 barre precedenti
+      chg1h, chg4h: variazioni % a 1 e 4 barre (NaN esclusi)
+      norm:  move 1h normalizzato per ATR%, con segno `direction` (+1 LONG, −1 SHORT)
+    """
+    c = np.asarray(c, dtype=float)
+    h = np.asarray(h, dtype=float)
+    l = np.asarray(l, dtype=float)
+    v = np.asarray(v, dtype=float)
+    atr = np.asarray(atr_series, dtype=float)
+    lookback = max(24, min(adaptive_lookback_bars, last_idx - 6))
+    first_j = last_idx - lookback + 1
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Base: finestra h[j-B:j] → riga j-B della vista strided.
+        # fmax/fmin ignorano i NaN come Series.max()/min() (NaN solo se tutta NaN).
+        b = base_lookback_bars
+        js = np.arange(max(b, first_j), last_idx + 1)
+        close_j = c[js]
+        base_high = np.fmax.reduce(sliding_window_view(h, b), axis=1)[js - b]
+        base_low = np.fmin.reduce(sliding_window_view(l, b), axis=1)[js - b]
+        keep = ~(close_j <= 0)
+        base = (base_high[keep] - base_low[keep]) / close_j[keep] * 100.0
+
+        # RVOL: come Series.mean() sulla finestra v[j-20:j] — NaN a 0 nella
+        # stessa somma pairwise, diviso per il numero di valori non NaN.
+        n = RVOL_AVG_BARS
+        # Con storico corto (last_idx < 22) non c'è nessuna finestra.
+        js = np.arange(max(22, first_j), last_idx + 1)
+        if js.size:
+            v_nan = np.isnan(v)
+            v_sum = sliding_window_view(np.where(v_nan, 0.0, v), n).sum(axis=1)
+            v_cnt = n - sliding_window_view(v_nan, n).sum(axis=1)
+            vol_avg = (v_sum / v_cnt)[js - n]
+            keep = ~(vol_avg <= 0)
+            rvol = v[js][keep] / vol_avg[keep]
+        else:
+            rvol = np.empty(0)
+
+        js = np.arange(max(1, first_j), last_idx + 1)
+        chg1h = (c[js] / c[js - 1] - 1) * 100.0
+        js = np.arange(max(4, first_j), last_idx + 1)
+        chg4h = (c[js] / c[js - 4] - 1) * 100.0
+
+        js = np.arange(max(1, first_j), last_idx + 1)
+        close_j = c[js]
+        prev_j = c[js - 1]
+        atr_j = atr[js]
+        atr_pct = atr_j / close_j * 100.0
+        keep = ~((close_j <= 0) | (prev_j <= 0) | (atr_j <= 0) | (atr_pct <= 0))
+        ret_1h = (close_j[keep] / prev_j[keep] - 1.0) * 100.0
+        norm = (ret_1h if direction >= 0 else -ret_1h) / atr_pct[keep]
+
+    return {
+        "base": base,
+        "rvol": rvol,
+        "chg1h": chg1h[~np.isnan(chg1h)],
+        "chg4h": chg4h[~np.isnan(chg4h)],
+        "norm": norm,
+    }
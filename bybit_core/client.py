@@ -0,0 +1,306 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# CLIENT — sessione HTTP, log/Telegram, firma Bybit, saldo e posizioni
+#
+# Stato condiviso dal processo: una sola SESSION (pool di connessioni), un solo
+# offset di timestamp e un solo snapshot wallet anche con più direzioni attive.
+# Con PRIVATE_STREAM attivo fill, chiusure e wallet arrivano via WebSocket;
+# senza (o a stream giù) tutto resta sul polling REST.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import re
+import threading
+import time
+from typing import Optional
+
+import requests
+from urllib3.util.retry import Retry
+
+from bybit_core.account import AccountSnapshot
+from bybit_core.clocksync import ClockSync
+from bybit_core.private_stream import PrivateStream
+from bybit_core.ratelimit import RateLimitedAdapter, RateLimiter
+from bybit_core.signing import Signer, encode_body, encode_query
+from bybit_core.config import (
+    BYBIT_ACCOUNT_TYPE, BYBIT_BASE_URL, BYBIT_WS_PRIVATE_URL, CLOCK_SYNC_SEC, KEY,
+    POSITIONS_TTL_SEC, PRIVATE_STREAM, RATE_LIMIT_SCALE, SECRET,
+    TELEGRAM_CHAT_ID, TELEGRAM_TOKEN,
+)
+
+_last_log_times:  dict = {}
+_positions_cache: Optional[tuple] = None   # (ts, lista posizioni USDT linear)
+_positions_lock = threading.Lock()
+_private_stream: Optional[PrivateStream] = None
+_signer = Signer(KEY, SECRET)
+
+# ── HTTP SESSION ──────────────────────────────────────────────────────────────
+# Ogni richiesta Bybit passa dal rate limiter (bucket public / per endpoint
+# privato). 429 gestito dal limiter: urllib3 ritenta solo gli errori 5xx.
+LIMITER = RateLimiter(scale=RATE_LIMIT_SCALE)
+SESSION = requests.Session()
+_retry  = Retry(total=3, backoff_factor=0.5,
+                status_forcelist=[500, 502, 503, 504],
+                allowed_methods=["GET", "POST"])
+_adapter = RateLimitedAdapter(LIMITER, max_retries=_retry, pool_maxsize=30)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+
+# ── LOG ───────────────────────────────────────────────────────────────────────
+def log(msg: str) -> None:
+    print(time.strftime("[%Y-%m-%d %H:%M:%S]"), msg, flush=True)
+
+
+def tlog(key: str, msg: str, interval_sec: int = 60) -> None:
+    now = time.time()
+    if now - _last_log_times.get(key, 0) >= interval_sec:
+        _last_log_times[key] = now
+        log(msg)
+
+
+def notify_telegram(msg: str, prefix: str) -> None:
+    if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
+        return
+    try:
+        requests.post(
+            f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage",
+            data={"chat_id": TELEGRAM_CHAT_ID, "text": f"{prefix} {msg}"},
+            timeout=10,
+        )
+    except Exception as e:
+        log(f"[TELEGRAM] err: {e}")
+
+
+# ── FIRMA BYBIT ───────────────────────────────────────────────────────────────
+def _fetch_server_time_ms() -> Optional[int]:
+    resp = SESSION.get(f"{BYBIT_BASE_URL}/v5/market/time", timeout=5)
+    data = resp.json()
+    if data.get("retCode") != 0:
+        return None
+    nano = data.get("result", {}).get("timeNano")
+    return int(nano) // 1_000_000 if nano else int(data["time"])
+
+
+# Offset server − locale stimato in background (CLOCK.start() all'avvio del bot)
+CLOCK = ClockSync(_fetch_server_time_ms, interval=CLOCK_SYNC_SEC, log=log)
+
+
+def signed_ts_ms() -> int:
+    return int(time.time() * 1000) + CLOCK.offset_ms()
+
+
+def _maybe_adjust_ts_offset(ret_msg: str) -> None:
+    """Fallback reattivo: Bybit ha rifiutato il timestamp nonostante la sync."""
+    m = re.search(r"req_timestamp\[(\d+)\],server_timestamp\[(\d+)\]", ret_msg)
+    if not m:
+        return
+    req_ts = int(m.group(1))
+    srv_ts = int(m.group(2))
+    delta = srv_ts - req_ts
+    if abs(delta) >= 50:
+        CLOCK.adjust(delta)
+        tlog("ts_offset",
+             f"[TIME] offset aggiustato di {delta}ms (tot={CLOCK.offset_ms()}ms)",
+             120)
+
+
+def bybit_signed_get(path: str, params: dict):
+    # Query serializzata una volta: stessa stringa firmata e inviata, anche nei retry
+    qs        = encode_query(params)
+    qs_bytes  = qs.encode()
+    url       = f"{BYBIT_BASE_URL}{path}?{qs}" if qs else f"{BYBIT_BASE_URL}{path}"
+    last_resp = None
+    for _ in range(3):
+        headers   = _signer.get_headers(str(signed_ts_ms()), qs_bytes)
+        last_resp = SESSION.get(url, headers=headers, timeout=10)
+        try:
+            data = last_resp.json()
+            if data.get("retCode") == 0:
+                return last_resp
+            msg = str(data.get("retMsg") or "")
+            if "server timestamp" in msg or "recv_window" in msg:
+                _maybe_adjust_ts_offset(msg)
+                continue
+        except Exception:
+            return last_resp
+        return last_resp
+    return last_resp
+
+
+def bybit_signed_post(path: str, body: dict):
+    body_bytes = encode_body(body)
+    url        = f"{BYBIT_BASE_URL}{path}"
+    last_resp  = None
+    for _ in range(3):
+        headers   = _signer.post_headers(str(signed_ts_ms()), body_bytes)
+        last_resp = SESSION.post(url, headers=headers, data=body_bytes, timeout=10)
+        try:
+            data = last_resp.json()
+            if data.get("retCode") == 0:
+                return last_resp
+            msg = str(data.get("retMsg") or "")
+            if "server timestamp" in msg or "recv_window" in msg:
+                _maybe_adjust_ts_offset(msg)
+                continue
+        except Exception:
+            return last_resp
+        return last_resp
+    return last_resp
+
+
+# ── BILANCIO ──────────────────────────────────────────────────────────────────
+def _fetch_wallet_account() -> dict:
+    resp = bybit_signed_get("/v5/account/wallet-balance",
+                            {"accountType": BYBIT_ACCOUNT_TYPE})
+    return resp.json().get("result", {}).get("list", [{}])[0]
+
+
+# Una sola wallet-balance per equity + saldo, invalidata dopo fill/chiusure
+account = AccountSnapshot(_fetch_wallet_account)
+
+
+def get_usdt_balance() -> float:
+    return account.usdt_available()
+
+
+def get_total_equity() -> float:
+    return account.equity()
+
+
+# ── POSIZIONI BYBIT ───────────────────────────────────────────────────────────
+def get_open_qty(symbol: str, side: str) -> float:
+    try:
+        resp = bybit_signed_get("/v5/position/list",
+                                {"category": "linear", "symbol": symbol})
+        data = resp.json()
+        if data.get("retCode") != 0:
+            return 0.0
+        for pos in data.get("result", {}).get("list", []):
+            if pos.get("side") == side:
+                return float(pos.get("size", 0) or 0)
+    except Exception:
+        pass
+    return 0.0
+
+
+def get_open_fill(symbol: str, side: str) -> tuple[float, float]:
+    try:
+        resp = bybit_signed_get("/v5/position/list",
+                                {"category": "linear", "symbol": symbol})
+        data = resp.json()
+        if data.get("retCode") != 0:
+            return 0.0, 0.0
+        for pos in data.get("result", {}).get("list", []):
+            if pos.get("side") == side:
+                qty = float(pos.get("size", 0) or 0)
+                entry_price = float(pos.get("avgPrice", 0) or 0)
+                return qty, entry_price
+    except Exception:
+        pass
+    return 0.0, 0.0
+
+
+def _fetch_positions() -> Optional[list]:
+    """Tutte le posizioni USDT linear (entrambi i lati) con cache di POSITIONS_TTL_SEC."""
+    global _positions_cache
+    with _positions_lock:
+        if _positions_cache and time.time() - _positions_cache[0] <= POSITIONS_TTL_SEC:
+            return _positions_cache[1]
+        try:
+            resp = bybit_signed_get("/v5/position/list",
+                                    {"category": "linear", "settleCoin": "USDT", "limit": 200})
+            data = resp.json()
+            if data.get("retCode") != 0:
+                return None
+            positions = data.get("result", {}).get("list", [])
+        except Exception:
+            return None
+        _positions_cache = (time.time(), positions)
+        return positions
+
+
+def invalidate_positions() -> None:
+    """Scarta lo snapshot posizioni dopo un fill o una chiusura."""
+    global _positions_cache
+    with _positions_lock:
+        _positions_cache = None
+
+
+def get_positions_snapshot(side: str) -> Optional[dict]:
+    """
+    {symbol: posizione aperta sul lato `side`}; None se errore.
+    Una sola /v5/position/list serve entrambi i lati: main loop, trailing e
+    watchdog di LONG e SHORT nello stesso processo condividono lo snapshot.
+    """
+    positions = _fetch_positions()
+    if positions is None:
+        return None
+    return {
+        p["symbol"]: p
+        for p in positions
+        if p.get("side") == side and float(p.get("size", 0) or 0) > 0
+    }
+
+
+# ── PRIVATE STREAM ────────────────────────────────────────────────────────────
+def _seed_positions() -> Optional[list]:
+    invalidate_positions()
+    return _fetch_positions()
+
+
+def start_private_stream() -> bool:
+    """Avvia il feed WebSocket privato se PRIVATE_STREAM è attivo; False se resta su REST."""
+    global _private_stream
+    if not PRIVATE_STREAM:
+        return False
+    if _private_stream is not None:
+        return True   # già avviato da un'altra direzione
+    stream = PrivateStream(BYBIT_WS_PRIVATE_URL, KEY, SECRET,
+                           seed_positions=_seed_positions, log=log, now_ms=signed_ts_ms)
+    stream.add_wallet_listener(account.update)
+    if not stream.start():
+        return False
+    _private_stream = stream
+    return True
+
+
+def get_live_positions(side: str) -> Optional[dict]:
+    """Posizioni del lato `side` dallo stream privato se pronto, altrimenti snapshot REST."""
+    stream = _private_stream
+    if stream is not None:
+        live = stream.positions(side)
+        if live is not None:
+            return live
+    return get_positions_snapshot(side)
+
+
+def get_stream_positions(side: str) -> Optional[dict]:
+    """Posizioni del lato `side` solo dallo stream privato pronto; None altrimenti (nessuna REST)."""
+    stream = _private_stream
+    if stream is None:
+        return None
+    return stream.positions(side)
+
+
+def wait_order_fill(order_id: str, position_idx: int, timeout: float) -> Optional[float]:
+    """Qty eseguita dell'ordine via stream (0.0 allo scadere); None se lo stream non è pronto."""
+    stream = _private_stream
+    if stream is None:
+        return None
+    return stream.wait_fill(order_id, position_idx, timeout)
+
+
+def wait_position_event(timeout: float) -> None:
+    """Pausa del main loop: con lo stream pronto si sveglia al primo push order/position/execution."""
+    stream = _private_stream
+    if stream is not None and stream.is_ready():
+        stream.wait_event(timeout)
+        return
+    time.sleep(timeout)
+
+
+def pop_closed_trade(symbol: str, position_idx: int) -> Optional[dict]:
+    """Prezzo medio di uscita e PnL realizzato (netto fee) dallo stream; None se non disponibile."""
+    stream = _private_stream
+    if stream is None:
+        return None
+    return stream.pop_exit(symbol, position_idx)
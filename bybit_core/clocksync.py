@@ -0,0 +1,97 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# CLOCK SYNC — offset tra orologio locale e server Bybit, stimato in anticipo
+#
+# Un thread campiona /v5/market/time ogni `interval` secondi. Per ogni
+# campione: rtt = t1 − t0, offset = server − (t0 + t1) / 2. Tra gli ultimi
+# `window` campioni vale quello con RTT minimo (il meno distorto dalla rete,
+# come in NTP). signed_ts_ms() somma l'offset: le richieste firmate partono
+# già allineate e i rifiuti "server timestamp / recv_window" restano eccezioni.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+DEFAULT_INTERVAL_SEC = 60.0
+DEFAULT_WINDOW       = 8
+
+
+class ClockSync:
+    """Stima filtrata dell'offset server − locale (ms)."""
+
+    def __init__(self, fetch_server_ms: Callable[[], Optional[int]],
+                 interval: float = DEFAULT_INTERVAL_SEC, window: int = DEFAULT_WINDOW,
+                 log: Callable[[str], None] = print):
+        self._fetch = fetch_server_ms
+        self._interval = interval
+        self._log = log
+        self._samples: deque = deque(maxlen=window)   # (rtt_ms, offset_ms, ts)
+        self._lock = threading.Lock()
+        self._offset_ms = 0
+        self._rtt_ms = 0.0
+        self._last_sync = 0.0
+        self._failures = 0
+        self._rejects = 0       # timestamp rifiutati da Bybit (dovrebbero restare ~0)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ── API pubblica ──────────────────────────────────────────────────────────
+    def offset_ms(self) -> int:
+        return self._offset_ms
+
+    def sample(self) -> bool:
+        """Un campione sincrono; False se il server non ha risposto."""
+        t0 = time.time() * 1000
+        try:
+            server_ms = self._fetch()
+        except Exception:
+            server_ms = None
+        t1 = time.time() * 1000
+        if server_ms is None:
+            with self._lock:
+                self._failures += 1
+            return False
+        rtt = t1 - t0
+        offset = server_ms - (t0 + t1) / 2
+        with self._lock:
+            self._samples.append((rtt, offset, time.time()))
+            best_rtt, best_offset, _ = min(self._samples)
+            self._offset_ms = int(round(best_offset))
+            self._rtt_ms = best_rtt
+            self._last_sync = time.time()
+        return True
+
+    def adjust(self, delta_ms: int) -> None:
+        """Correzione reattiva (timestamp rifiutato): sposta l'offset e riparte da zero campioni."""
+        with self._lock:
+            self._offset_ms += delta_ms
+            self._samples.clear()
+            self._rejects += 1
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.sample()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="clock-sync")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"offset_ms": self._offset_ms, "rtt_ms": round(self._rtt_ms, 1),
+                    "samples": len(self._samples), "failures": self._failures,
+                    "rejects": self._rejects,
+                    "age_sec": round(time.time() - self._last_sync, 1) if self._last_sync else None}
+
+    def summary(self) -> str:
+        m = self.metrics()
+        return (f"skew={m['offset_ms']:+d}ms rtt={m['rtt_ms']:.0f}ms "
+                f"campioni={m['samples']} errori={m['failures']} rifiuti_ts={m['rejects']}")
+
+    # ── Thread ────────────────────────────────────────────────────────────────
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.sample()
@@ -0,0 +1,176 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# CONFIG — variabili d'ambiente e parametri strategia dei bot LONG e SHORT
+#
+# I parametri comuni hanno lo stesso valore per le due direzioni; quelli
+# specifici mantengono il suffisso/nome della direzione (…_LONG, …_SHORT,
+# MIN_CHG_* per il long, MAX_CHG_* per lo short).
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+
+from bybit_core.private_stream import WS_PRIVATE_URL, WS_PRIVATE_URL_TESTNET
+from bybit_core.stream import WS_PUBLIC_LINEAR_URL, WS_PUBLIC_LINEAR_URL_TESTNET
+
+# ── ENV VARS ──────────────────────────────────────────────────────────────────
+TELEGRAM_TOKEN     = os.getenv("TELEGRAM_TOKEN")
+TELEGRAM_CHAT_ID   = os.getenv("TELEGRAM_CHAT_ID")
+KEY                = os.getenv("BYBIT_API_KEY", "")
+SECRET             = os.getenv("BYBIT_API_SECRET", "")
+BYBIT_TESTNET      = os.getenv("BYBIT_TESTNET", "false").lower() == "true"
+BYBIT_BASE_URL     = "https://api-testnet.bybit.com" if BYBIT_TESTNET else "https://api.bybit.com"
+BYBIT_ACCOUNT_TYPE = os.getenv("BYBIT_ACCOUNT_TYPE", "UNIFIED").upper()
+# Feed WebSocket pubblico (opzionale): prezzi e kline in memoria invece del polling REST
+MARKET_STREAM       = os.getenv("MARKET_STREAM", "false").lower() == "true"
+BYBIT_WS_PUBLIC_URL = os.getenv("BYBIT_WS_PUBLIC_URL",
+                                WS_PUBLIC_LINEAR_URL_TESTNET if BYBIT_TESTNET else WS_PUBLIC_LINEAR_URL)
+# Feed WebSocket privato (opzionale): fill, chiusure e wallet via push invece del polling REST
+PRIVATE_STREAM       = os.getenv("PRIVATE_STREAM", "false").lower() == "true"
+BYBIT_WS_PRIVATE_URL = os.getenv("BYBIT_WS_PRIVATE_URL",
+                                 WS_PRIVATE_URL_TESTNET if BYBIT_TESTNET else WS_PRIVATE_URL)
+
+# ── PARAMETRI STRATEGIA ───────────────────────────────────────────────────────
+RISK_PCT           = 0.0100   # 1% rischio per trade
+DEFAULT_LEVERAGE   = 5        # leva ridotta: 4h = posizioni più lunghe
+MAX_OPEN_POSITIONS = 5
+MARGIN_USE_PCT     = 0.30
+ORDER_USDT_MAX     = float(os.getenv("ORDER_USDT_MAX", "1000"))
+BATCH_ORDER_MAX    = 10     # ordini per richiesta /v5/order/create-batch (limite Bybit linear)
+MAX_TOTAL_OPEN_RISK_PCT = float(os.getenv("MAX_TOTAL_OPEN_RISK_PCT", "0.04"))
+
+SL_ATR_BUFFER    = 0.3   # buffer oltre swing low/high (× ATR)
+TRAIL_ATR_MULT   = 2.0   # moltiplicatore ATR per il trailing stop dal massimo/minimo
+PARTIAL_TP_R     = 2.0   # partial TP più tardi: lascia correre i vincenti
+PARTIAL_TP_PCT   = 0.20  # quota ridotta al partial TP
+
+# Ratchet floor fissi: (roi_lev_trigger%, floor_lev_garantito%)
+# Quando il P&L leveraged supera il trigger, SL si sposta al floor garantito
+# (LONG: SL sale sopra entry, SHORT: SL scende sotto entry)
+RATCHET_TABLE = [
+    ( 10,   7),
+    ( 25,  15),
+    ( 40,  25),
+    ( 60,  40),
+    ( 80,  60),
+    (100,  80),
+    (125, 100),
+    (150, 120),
+    (175, 148),
+    (200, 173),
+    (250, 223),
+    (300, 273),
+    (400, 370),
+    (500, 465),
+]
+ATR_WINDOW       = 14
+
+# Universo
+MIN_VOL_24H_USDT = 10_000_000  # solo coin liquide: >10M USDT/giorno
+COINS_TOP_N      = 100         # top N per volume da scansionare
+TRADE_TOP_N      = 12          # apre trade solo entro i primi N del ranking 24h
+
+# Filtri segnale — RILASSATI per trend following sui top mover
+RSI_MIN_4H     = 30.0   # range più selettivo: evita estremi rumorosi
+RSI_MAX_4H     = 70.0
+EMA_TOUCH_TOL  = 0.012  # tocco più preciso alla EMA20
+MAX_DIST_EMA   = 3.0    # % massima distanza close da EMA20 all'entry
+CLOSE_BELOW_EMA_TOL = 0.003  # LONG: accetta close lievemente sotto EMA20
+CLOSE_ABOVE_EMA_TOL = 0.003  # SHORT: accetta close lievemente sopra EMA20
+MAX_SL_PCT     = 8.0    # SL massimo accettabile: 8% da entry
+MIN_BODY_PCT   = 25.0   # evita doji e rimbalzi/rejection deboli
+MIN_VOL_RATIO  = 0.8    # richiede almeno volume vicino alla media
+MAX_DIST_EMA50_D = 20.0 # daily close max 20% da EMA50: evita trend overestesi
+REQUIRE_SLOPE_CONFIRMATION = True
+MIN_CHG_1H_PCT = 0.4
+MIN_CHG_4H_PCT = 1.0
+MAX_CHG_1H_PCT = -0.4
+MAX_CHG_4H_PCT = -1.0
+BASE_LOOKBACK_BARS = 6
+SL_BASE_ATR_BUFFER = 0.2
+
+# Adaptive engine (percentili + ATR-normalized momentum)
+ADAPTIVE_LOOKBACK_BARS = 48
+ADAPTIVE_BASE_WIDTH_PCTL = 0.97
+ADAPTIVE_RVOL_PCTL = 0.45
+ADAPTIVE_MOM_PCTL_LONG = 0.60
+ADAPTIVE_MIN_NORM_Z_LONG = -0.20
+ADAPTIVE_MOM_PCTL_SHORT = 0.50
+ADAPTIVE_MIN_NORM_Z_SHORT = -0.20
+ADAPTIVE_BASE_MIN_PCT = 0.8
+ADAPTIVE_BASE_MAX_PCT = 12.0
+ADAPTIVE_RVOL_MIN = 0.70
+ADAPTIVE_RVOL_MAX = 1.25
+MIN_CHG_1H_PCT_FLOOR = 0.15
+MIN_CHG_4H_PCT_FLOOR = 0.45
+MAX_CHG_1H_PCT_CEIL = -0.15
+MAX_CHG_1H_PCT_FLOOR = -2.50
+MAX_CHG_4H_PCT_CEIL = -0.40
+MAX_CHG_4H_PCT_FLOOR = -4.00
+BREAK_CONFIRM_ATR_TOL = 0.20
+BREAK_CONFIRM_PCT_TOL = 0.12
+TOP_MOVER_RSI_MAX_LONG = 76.0
+TOP_MOVER_RSI_MIN_SHORT = 24.0
+TOP_MOVER_MAX_DIST_EMA_PCT = 12.0
+TOP_MOVER_MAX_CHG1H_PCT = 10.0
+TOP_MOVER_MAX_CHG4H_PCT = 18.0
+TOP_MOVER_MIN_CHG1H_PCT = -10.0
+TOP_MOVER_MIN_CHG4H_PCT = -18.0
+TOP_MOVER_SL_ATR_MULT = 1.2
+RR_SWING_LOOKBACK = 24
+FALLBACK_TP_ATR_MULT = 2.5
+MIN_RR_EST = 1.8
+
+# BTC filter LONG — disabilitato: qualsiasi EMA a lungo periodo su BTC è sopra 65k
+# per mesi dopo il picco a 100k. Il filtro individuale daily EMA50 per ogni coin
+# è già sufficiente come protezione.
+BTC_BULL_CHECK          = False  # disabilitato
+BTC_WEEKLY_EMA200_CHECK = False  # disabilitato
+
+# Regime BTC SHORT: attiva short solo quando BTC è strutturalmente bearish
+# Se False: bot sempre attivo (solo per testing)
+BTC_SHORT_REGIME_CHECK = True
+BTC_SHORT_REGIME_SCORE_MIN = 0.55
+
+# Timing
+SCAN_INTERVAL_SEC  = 1800   # 30 min tra scan
+TRAIL_SLEEP_SEC    = 60     # giro completo del trailing senza feed WS (o feed fermo)
+TRAIL_DEBOUNCE_SEC = 2      # con feed WS: al massimo una valutazione per simbolo ogni N s
+TRAIL_FULL_PASS_SEC = 600   # con feed WS: giro completo di sicurezza
+SL_WATCH_SLEEP_SEC = 600    # 10 min
+SCAN_WORKERS       = int(os.getenv("SCAN_WORKERS", "4"))  # valutazione segnali in parallelo
+# Rate limiter: quota dei limiti Bybit usata dal processo (0.5 se due servizi condividono la API key)
+RATE_LIMIT_SCALE   = float(os.getenv("RATE_LIMIT_SCALE", "1.0"))
+METRICS_LOG_SEC    = 900    # riepilogo metriche (rate limiter, clock sync) nei log
+CLOCK_SYNC_SEC     = 60     # campionamento /v5/market/time
+TICKERS_TTL_SEC    = 60     # snapshot /v5/market/tickers condiviso tra le direzioni
+TICKERS_PRICE_SEC  = 5      # entro quest'età lo snapshot serve anche prezzo/bid/ask per simbolo
+POSITIONS_TTL_SEC  = 2      # snapshot /v5/position/list condiviso tra thread e direzioni
+INSTRUMENTS_REFRESH_SEC = 3600   # refresh in background di /v5/market/instruments-info
+# Indice strumenti su disco per riavvii a caldo ("" per disattivarlo)
+INSTRUMENTS_CACHE_PATH  = os.getenv("INSTRUMENTS_CACHE_PATH", ".cache/instruments.json")
+# Journal JSONL dello stato posizioni e simboli bloccati, per direzione ("" per disattivarli)
+POSITIONS_JOURNAL_DIR   = os.getenv("POSITIONS_JOURNAL_DIR", ".cache")
+
+# Bybit hedge mode: positionIdx=1 per long, 2 per short
+LONG_IDX           = 1
+SHORT_IDX          = 2
+
+# Time stop: chiude i trade "coricati" che non vanno da nessuna parte
+TIME_STOP_DAYS    = 10     # giorni massimi in posizione senza slancio
+TIME_STOP_MIN_LEV = 10.0  # soglia: se P&L lev < 10% dopo N giorni → esci a breakeven
+
+# Circuit breaker: daily loss limit
+CIRCUIT_BREAKER_PCT       = 3.0   # drawdown % giornaliero max prima di bloccare tutto
+CIRCUIT_BREAKER_COOLDOWN_H = 24   # ore di blocco dopo attivazione
+
+# Entry cooldown dopo una sequenza negativa
+LOSS_STREAK_LIMIT = 2
+LOSS_STREAK_COOLDOWN_H = 6
+
+EXCLUDE_SUBSTRINGS = ["USDC", "BUSD", "DAI", "TUSD", "FRAX",
+                      "3LUSDT", "3SUSDT", "BULLUSDT", "BEARUSDT"]
+EXCLUDE_SYMBOLS = {
+    s.strip().upper() for s in os.getenv("EXCLUDE_SYMBOLS", "").split(",") if s.strip()
+}
+# Simboli rifiutati da Bybit (110125/110126): esclusi dalla scan, anche dopo un riavvio
+BLOCKED_SYMBOLS_TTL_H = 168   # ore prima di ritentare un simbolo bloccato
+MIN_ABS_24H_CHANGE = float(os.getenv("MIN_ABS_24H_CHANGE", "3.5"))
@@ -0,0 +1,42 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# DIREZIONE — parametri che distinguono il bot LONG dal bot SHORT
+#
+# LONG e SHORT sono speculari: dove la formula è la stessa a meno del verso
+# si usa `sign` (+1 / −1); dove cambiano soglie o messaggi il codice legge
+# `is_long`. Hedge mode Bybit: positionIdx 1 = Buy, 2 = Sell.
+# ─────────────────────────────────────────────────────────────────────────────
+
+from bybit_core.config import LONG_IDX, SHORT_IDX
+from bybit_core.market import (
+    format_price_ceil, format_price_floor, get_ask_price, get_bid_price,
+)
+
+
+class Direction:
+    def __init__(self, name: str, side: str, position_idx: int,
+                 telegram_prefix: str, tag: str, format_price,
+                 maker_price, water_key: str):
+        self.name = name                    # "LONG" / "SHORT"
+        self.is_long = name == "LONG"
+        self.sign = 1 if self.is_long else -1
+        self.side = side                    # lato di apertura
+        self.close_side = "Sell" if side == "Buy" else "Buy"
+        self.position_idx = position_idx
+        self.telegram_prefix = telegram_prefix
+        self.tag = tag                      # suffisso nei log: "" / " SHORT"
+        self.format_price = format_price    # arrotondamento entry/SL al tick
+        self.maker_price = maker_price      # bid (long) / ask (short) per il PostOnly
+        self.water_key = water_key          # estremo favorevole visto in posizione
+
+    def reached(self, price: float, level: float) -> bool:
+        """True se `price` ha raggiunto `level` nel verso del profitto."""
+        return price >= level if self.is_long else price <= level
+
+    def __repr__(self) -> str:
+        return f"Direction({self.name})"
+
+
+LONG = Direction("LONG", "Buy", LONG_IDX, "[PULLBACK]", "",
+                 format_price_floor, get_bid_price, "high_water")
+SHORT = Direction("SHORT", "Sell", SHORT_IDX, "[SHORT-PB]", " SHORT",
+                  format_price_ceil, get_ask_price, "low_water")
@@ -0,0 +1,1529 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# ENGINE — bot trend following parametrizzato per direzione (LONG / SHORT)
+#
+# Un'istanza di Bot per direzione: stato posizioni, circuit breaker e cooldown
+# sono per-bot; sessione HTTP, cache di mercato e wallet sono condivisi dal
+# processo (bybit_core.client / bybit_core.market).
+# Thread: main loop (scan + chiusure), trailing_worker, sl_watchdog.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Optional
+
+from bybit_core import regime, trailing
+from bybit_core.client import (
+    CLOCK, LIMITER, account, bybit_signed_get, bybit_signed_post, get_live_positions,
+    get_open_fill, get_open_qty, get_positions_snapshot, get_stream_positions,
+    get_total_equity, get_usdt_balance, invalidate_positions, log, notify_telegram,
+    pop_closed_trade, start_private_stream, tlog, wait_order_fill,
+    wait_position_event,
+)
+from bybit_core.config import (
+    ADAPTIVE_BASE_WIDTH_PCTL, ADAPTIVE_LOOKBACK_BARS, ADAPTIVE_MOM_PCTL_LONG,
+    ADAPTIVE_MOM_PCTL_SHORT, ADAPTIVE_RVOL_PCTL, BASE_LOOKBACK_BARS,
+    BATCH_ORDER_MAX, BLOCKED_SYMBOLS_TTL_H, BTC_SHORT_REGIME_SCORE_MIN, CIRCUIT_BREAKER_COOLDOWN_H,
+    CIRCUIT_BREAKER_PCT, COINS_TOP_N, DEFAULT_LEVERAGE, EXCLUDE_SUBSTRINGS,
+    EXCLUDE_SYMBOLS, LOSS_STREAK_COOLDOWN_H, LOSS_STREAK_LIMIT, MARGIN_USE_PCT,
+    MAX_CHG_1H_PCT, MAX_CHG_4H_PCT, MAX_OPEN_POSITIONS, MAX_TOTAL_OPEN_RISK_PCT,
+    MIN_ABS_24H_CHANGE, MIN_CHG_1H_PCT, MIN_CHG_4H_PCT, MIN_VOL_24H_USDT,
+    METRICS_LOG_SEC, ORDER_USDT_MAX, PARTIAL_TP_PCT, PARTIAL_TP_R,
+    POSITIONS_JOURNAL_DIR, RATCHET_TABLE, RISK_PCT, RSI_MAX_4H, RSI_MIN_4H,
+    SCAN_INTERVAL_SEC, SCAN_WORKERS, SL_WATCH_SLEEP_SEC,
+    TOP_MOVER_MAX_DIST_EMA_PCT, TOP_MOVER_RSI_MAX_LONG, TOP_MOVER_RSI_MIN_SHORT,
+    TRADE_TOP_N, TRAIL_ATR_MULT, TRAIL_DEBOUNCE_SEC, TRAIL_FULL_PASS_SEC,
+    TRAIL_SLEEP_SEC,
+)
+from bybit_core.direction import LONG, SHORT, Direction
+from bybit_core.journal import PositionJournal
+from bybit_core.market import (
+    add_price_listener, format_qty_with_step, get_atr_4h, get_instrument_info,
+    get_last_price, get_tickers_snapshot, instrument_symbols, market_stream_fresh,
+    refresh_instrument_info, start_instruments, start_market_stream,
+    update_stream_subscriptions,
+)
+from bybit_core.signals import check_entry_signal
+from bybit_core.universe import Blocklist, EligibleUniverse, SymbolFilter
+
+# Bot attivi nel processo (una o due direzioni): rischio aperto e topic WS
+# si calcolano sull'insieme, il resto dello stato resta per-direzione.
+_bots: list = []
+_bots_lock = threading.Lock()
+
+# Esclusioni statiche dell'universo (quote USDT, EXCLUDE_*), precompilate
+_UNIVERSE_FILTER = SymbolFilter("USDT", EXCLUDE_SUBSTRINGS, EXCLUDE_SYMBOLS)
+
+# Stati Bybit di un ordine ancora eseguibile (la cancel non è andata a segno)
+_ORDER_LIVE = {"New", "PartiallyFilled", "Untriggered"}
+
+
+def _active_bots() -> list:
+    with _bots_lock:
+        return list(_bots)
+
+
+def portfolio_open_risk_usdt() -> float:
+    """Rischio aperto fino allo SL sommato su tutte le direzioni attive nel processo."""
+    return sum(b.estimate_open_risk_usdt() for b in _active_bots())
+
+
+def _invalidate_account_state() -> None:
+    """Dopo un fill o una chiusura: wallet e posizioni vanno riletti."""
+    account.invalidate()
+    invalidate_positions()
+
+
+# Simboli con leva già confermata da Bybit: set-leverage una volta per processo
+_leverage_ok: set = set()
+_leverage_lock = threading.Lock()
+
+
+def set_leverage(symbol: str) -> None:
+    """Leva DEFAULT_LEVERAGE sui due lati; una volta confermata non si rimanda più."""
+    with _leverage_lock:
+        if symbol in _leverage_ok:
+            return
+    try:
+        data = bybit_signed_post("/v5/position/set-leverage", {
+            "category": "linear", "symbol": symbol,
+            "buyLeverage":  str(DEFAULT_LEVERAGE),
+            "sellLeverage": str(DEFAULT_LEVERAGE),
+        }).json()
+        # 110043: leva già impostata a questo valore
+        if data.get("retCode") in (0, 110043):
+            with _leverage_lock:
+                _leverage_ok.add(symbol)
+    except Exception:
+        pass
+
+
+def run_startup_self_checks(d: Direction) -> None:
+    errs = []
+    if not (0 < RISK_PCT <= 0.05):
+        errs.append(f"RISK_PCT fuori range: {RISK_PCT}")
+    if not (1 <= DEFAULT_LEVERAGE <= 25):
+        errs.append(f"DEFAULT_LEVERAGE fuori range: {DEFAULT_LEVERAGE}")
+    if not (0 < PARTIAL_TP_PCT <= 1.0):
+        errs.append(f"PARTIAL_TP_PCT fuori range: {PARTIAL_TP_PCT}")
+    if not (0 <= RSI_MIN_4H < RSI_MAX_4H <= 100):
+        errs.append(f"RSI range invalido: {RSI_MIN_4H}-{RSI_MAX_4H}")
+    if not (1 <= TRADE_TOP_N <= COINS_TOP_N):
+        errs.append("TRADE_TOP_N invalido")
+    if BASE_LOOKBACK_BARS < 4:
+        errs.append("BASE_LOOKBACK_BARS troppo basso")
+    if d.is_long:
+        if MIN_CHG_4H_PCT < MIN_CHG_1H_PCT:
+            errs.append("MIN_CHG_4H_PCT deve essere >= MIN_CHG_1H_PCT")
+    elif MAX_CHG_4H_PCT > MAX_CHG_1H_PCT:
+        errs.append("MAX_CHG_4H_PCT deve essere <= MAX_CHG_1H_PCT")
+    if ADAPTIVE_LOOKBACK_BARS < 24:
+        errs.append("ADAPTIVE_LOOKBACK_BARS troppo basso")
+    if not (0.0 < ADAPTIVE_BASE_WIDTH_PCTL < 1.0):
+        errs.append("ADAPTIVE_BASE_WIDTH_PCTL fuori range")
+    if not (0.0 < ADAPTIVE_RVOL_PCTL < 1.0):
+        errs.append("ADAPTIVE_RVOL_PCTL fuori range")
+    if d.is_long:
+        if not (0.0 < ADAPTIVE_MOM_PCTL_LONG < 1.0):
+            errs.append("ADAPTIVE_MOM_PCTL_LONG fuori range")
+        if TOP_MOVER_RSI_MAX_LONG <= RSI_MIN_4H:
+            errs.append("TOP_MOVER_RSI_MAX_LONG incoerente")
+    else:
+        if not (0.0 < ADAPTIVE_MOM_PCTL_SHORT < 1.0):
+            errs.append("ADAPTIVE_MOM_PCTL_SHORT fuori range")
+        if not (0.0 <= BTC_SHORT_REGIME_SCORE_MIN <= 1.0):
+            errs.append("BTC_SHORT_REGIME_SCORE_MIN fuori range")
+        if TOP_MOVER_RSI_MIN_SHORT >= RSI_MAX_4H:
+            errs.append("TOP_MOVER_RSI_MIN_SHORT incoerente")
+    if TOP_MOVER_MAX_DIST_EMA_PCT <= 0:
+        errs.append("TOP_MOVER_MAX_DIST_EMA_PCT fuori range")
+    for i in range(1, len(RATCHET_TABLE)):
+        prev_t, prev_f = RATCHET_TABLE[i - 1]
+        cur_t, cur_f = RATCHET_TABLE[i]
+        if cur_t <= prev_t or cur_f <= prev_f:
+            errs.append(f"RATCHET_TABLE non crescente in posizione {i}")
+            break
+    if errs:
+        for e in errs:
+            log(f"[SELF-CHECK] ❌ {e}")
+        raise RuntimeError("Self-check startup fallito")
+    log("[SELF-CHECK] ✅ configurazione valida")
+
+
+class Bot:
+    """Bot di una direzione: stato posizioni + thread di gestione."""
+
+    def __init__(self, d: Direction):
+        self.d = d
+        self.open_positions:  set  = set()
+        # Simboli rifiutati da Bybit, persistiti: al riavvio non si ritentano
+        self.blocked_symbols = Blocklist(
+            os.path.join(POSITIONS_JOURNAL_DIR, f"blocked_{d.name.lower()}.json")
+            if POSITIONS_JOURNAL_DIR else None,
+            ttl_sec=BLOCKED_SYMBOLS_TTL_H * 3600, log=log)
+        if self.blocked_symbols.load():
+            log(f"[BLOCK] {d.name}: {len(self.blocked_symbols)} simboli bloccati da un run precedente")
+        self._universe = EligibleUniverse(_UNIVERSE_FILTER, self.blocked_symbols)
+        self.position_data:   dict = {}
+        self._state_lock            = threading.RLock()
+        self._stream_universe: list = []
+        # Trailing a eventi: simboli con prezzo nuovo in attesa del worker
+        self._trail_lock            = threading.Lock()
+        self._trail_wake            = threading.Event()
+        self._trail_dirty:    dict  = {}   # symbol -> ultimo ticker ricevuto
+        self._trail_seen:     dict  = {}   # symbol -> ts dell'ultima valutazione
+        self._water_unsaved:  set   = set()  # water mark aggiornati solo in memoria
+        # Stato posizioni su disco: al riavvio niente stime di orig_r_dist/entry_time
+        self.journal = PositionJournal(
+            os.path.join(POSITIONS_JOURNAL_DIR, f"positions_{d.name.lower()}.jsonl")
+            if POSITIONS_JOURNAL_DIR else None, log=log)
+
+        # Circuit breaker state
+        self._cb_equity_day_start: float = 0.0
+        self._cb_last_day:         str   = ""
+        self._cb_triggered:        bool  = False
+        self._cb_triggered_at:     float = 0.0
+
+        # Entry cooldown dopo una sequenza negativa
+        self._loss_streak: int = 0
+        self._entry_cooldown_until_ts: float = 0.0
+        self._last_scan_ts: float = 0.0
+
+        with _bots_lock:
+            _bots.append(self)
+
+    def notify(self, msg: str) -> None:
+        notify_telegram(msg, self.d.telegram_prefix)
+
+    # ── HELPERS STATO ─────────────────────────────────────────────────────────
+    def get_position(self, symbol: str) -> Optional[dict]:
+        with self._state_lock:
+            return self.position_data.get(symbol)
+
+    def set_position(self, symbol: str, entry: dict) -> None:
+        with self._state_lock:
+            self.position_data[symbol] = entry
+        self.journal.record(symbol, entry)
+
+    def drop_position(self, symbol: str) -> None:
+        with self._state_lock:
+            self.position_data.pop(symbol, None)
+        self.journal.record(symbol, None)
+
+    def add_open(self, symbol: str) -> None:
+        with self._state_lock:
+            self.open_positions.add(symbol)
+
+    def discard_open(self, symbol: str) -> None:
+        with self._state_lock:
+            self.open_positions.discard(symbol)
+        _invalidate_account_state()
+
+    def update_stream_subscriptions(self) -> None:
+        """Il feed WS è unico: sottoscrive l'unione degli universi e posizioni di tutte le direzioni."""
+        scan_syms: set = set()
+        held: set = set()
+        for b in _active_bots():
+            with b._state_lock:
+                held |= b.open_positions
+            scan_syms.update(b._stream_universe)
+        update_stream_subscriptions(scan_syms, held)
+
+    def estimate_open_risk_usdt(self) -> float:
+        """Somma la perdita teorica fino allo SL di tutte le posizioni aperte della direzione."""
+        total = 0.0
+        for sym in list(self.open_positions):
+            entry = self.get_position(sym)
+            if not entry:
+                continue
+            qty = float(entry.get("qty", 0) or 0)
+            ep = float(entry.get("entry_price", 0) or 0)
+            sl = float(entry.get("sl_price", 0) or 0)
+            if qty <= 0 or ep <= 0 or sl <= 0:
+                continue
+            per_unit_risk = self.d.sign * (ep - sl)
+            if per_unit_risk <= 0:
+                continue
+            total += per_unit_risk * qty
+        return total
+
+    # ── SCANSIONE UNIVERSO ────────────────────────────────────────────────────
+    def scan_universe(self) -> list:
+        """
+        Ritorna le top COINS_TOP_N coin per momentum 24h nella direzione del bot
+        (top gainers per LONG, top losers per SHORT), mantenendo il filtro di
+        liquidità (>10M USDT).
+        Nessuna soglia hard su momentum: seleziona per variazione 24h.
+        Una sola chiamata API e una sola selezione, condivise con l'altra
+        direzione se attiva.
+        """
+        snap = get_tickers_snapshot()
+        if snap is None:
+            return []
+
+        # Universo ammesso: ricalcolato solo se cambiano strumenti o blocklist;
+        # senza indice strumenti si parte dai simboli dello snapshot
+        version, symbols = instrument_symbols()
+        if not symbols:
+            version, symbols = ("tickers", snap.ts), snap.symbols
+        eligible = self._universe.get(version, symbols)
+
+        # Top gainers (LONG) / top losers (SHORT), volume per i pari-merito.
+        # Si chiedono anche tante righe quante le posizioni aperte, che qui si
+        # scartano: la selezione resta comune alle due direzioni.
+        k = COINS_TOP_N + max(len(self.open_positions), MAX_OPEN_POSITIONS)
+        gainers, losers = snap.movers(eligible, k, MIN_VOL_24H_USDT)
+        candidates = []
+        for i in (gainers if self.d.is_long else losers):
+            sym = snap.symbols[i]
+            if sym in self.open_positions:
+                continue
+            candidates.append({"symbol": sym, "vol24h": snap.turnover24h[i],
+                               "chg24h": snap.pcnt24h[i] * 100.0})
+            if len(candidates) >= COINS_TOP_N:
+                break
+        return candidates
+
+    # ── ORDINI ────────────────────────────────────────────────────────────────
+    def set_position_stoploss(self, symbol: str, sl_price: float) -> bool:
+        """
+        Imposta lo SL della posizione. LONG: SL sotto il prezzo, arrotondato al
+        tick inferiore; SHORT: SL sopra il prezzo, arrotondato al tick superiore.
+        """
+        d = self.d
+        cur = get_last_price(symbol)
+        if cur and (sl_price >= cur if d.is_long else sl_price <= cur):
+            # Fail-safe: se lo SL calcolato è finito oltre il prezzo corrente
+            # (slippage o drift), riallinealo appena dentro il mercato.
+            if d.is_long:
+                sl_price = cur * 0.999
+                log(f"[SL] {symbol} riallineato sotto mercato: {sl_price:.6f}")
+            else:
+                sl_price = cur * 1.001
+                log(f"[SL] {symbol} riallineato sopra mercato: {sl_price:.6f}")
+        info     = get_instrument_info(symbol)
+        stop_str = d.format_price(sl_price, info.get("price_step", 0.01))
+        body = {"category": "linear", "symbol": symbol,
+                "stopLoss": stop_str, "slTriggerBy": "MarkPrice",
+                "positionIdx": d.position_idx, "tpslMode": "Full"}
+        try:
+            data = bybit_signed_post("/v5/position/trading-stop", body).json()
+            ret  = data.get("retCode")
+            if ret == 0:             return True
+            if ret in (34040, 10001): return True
+            log(f"[SL] {symbol} FAIL retCode={ret} {data.get('retMsg')}")
+            return False
+        except Exception as e:
+            log(f"[SL] {symbol} exc: {e}")
+            return False
+
+    def market_close(self, symbol: str, qty: float) -> bool:
+        """Chiude (anche parzialmente) la posizione: market order reduce-only sul lato opposto."""
+        d = self.d
+        tag = "[PARTIAL-TP]" if d.is_long else "[CLOSE-SHORT]"
+        info     = get_instrument_info(symbol)
+        qty_step = float(info.get("qty_step", 0.01))
+        qty_str  = format_qty_with_step(qty, qty_step)
+        if float(qty_str) <= 0:
+            return False
+        body = {"category": "linear", "symbol": symbol,
+                "side": d.close_side, "orderType": "Market",
+                "qty": qty_str, "reduceOnly": True,
+                "positionIdx": d.position_idx}
+        try:
+            data = bybit_signed_post("/v5/order/create", body).json()
+            ret  = data.get("retCode")
+            if ret == 0:
+                _invalidate_account_state()
+                return True
+            log(f"{tag} {symbol} FAIL retCode={ret} {data.get('retMsg')}")
+            return False
+        except Exception as e:
+            log(f"{tag} {symbol} exc: {e}")
+            return False
+
+    def _size_entry(self, symbol: str, usdt_amount: float,
+                    avail: Optional[float] = None) -> Optional[dict]:
+        """
+        Qty allineata al qty_step per `usdt_amount` (limitato da margine e
+        ORDER_USDT_MAX). `avail` = saldo già letto (batch); None = saldo attuale.
+        """
+        d = self.d
+        price = get_last_price(symbol)
+        if not price:
+            return None
+        info         = get_instrument_info(symbol)
+        if info.get("fallback"):
+            # Step di default: rischio di qty/prezzi sbagliati, meglio saltare l'entry
+            log(f"[{d.name}] {symbol} skip entry: instrument info non disponibile")
+            return None
+        qty_step     = float(info.get("qty_step",      0.01))
+        min_qty      = float(info.get("min_qty",        qty_step))
+        step_dec     = Decimal(str(qty_step))
+
+        if avail is None:
+            avail    = get_usdt_balance()
+        max_notional = avail * DEFAULT_LEVERAGE * MARGIN_USE_PCT
+        amount       = min(usdt_amount, max_notional, ORDER_USDT_MAX)
+
+        raw_qty     = Decimal(str(amount)) / Decimal(str(price))
+        qty_aligned = (raw_qty // step_dec) * step_dec
+        if float(qty_aligned) < min_qty:
+            qty_aligned = Decimal(str(min_qty))
+        return {"info": info, "qty_step": qty_step, "qty_aligned": qty_aligned,
+                "notional": float(qty_aligned) * price}
+
+    def _await_limit_fill(self, symbol: str, order_id: str) -> Optional[float]:
+        """
+        Attende il fill del Limit PostOnly (~3 s); se non eseguito lo cancella.
+        Ritorna la qty eseguita, compresa quella arrivata tra lo scadere
+        dell'attesa e la cancel; 0.0 solo se l'ordine è chiuso senza fill
+        (il chiamante può andare a Market), None se resta aperto senza fill.
+        """
+        d = self.d
+        # Stream privato: fill via push; altrimenti polling della posizione
+        filled = wait_order_fill(order_id, d.position_idx, 3.0) if order_id else None
+        if filled is not None and filled > 0:
+            _invalidate_account_state()
+            return filled
+        for _ in range(6 if filled is None else 0):
+            time.sleep(0.5)
+            filled = get_open_qty(symbol, d.side)
+            if filled and filled > 0:
+                _invalidate_account_state()
+                return filled
+        if not order_id:
+            return 0.0
+        for _ in range(2):
+            self._cancel_order(symbol, order_id)
+            state = self._order_state(symbol, order_id)
+            if state is None:
+                # Ordine non leggibile: conta la posizione aperta sul lato
+                filled = get_open_qty(symbol, d.side)
+                break
+            filled, status = state
+            if status not in _ORDER_LIVE:
+                break
+        else:
+            log(f"[ENTRY] {symbol}{d.tag} Limit {order_id} ancora aperto dopo la cancel — niente Market")
+            return filled if filled > 0 else None
+        if filled > 0:
+            _invalidate_account_state()
+            log(f"[ENTRY] {symbol}{d.tag} Limit eseguito ({filled}) durante la cancel — niente Market")
+            return filled
+        return 0.0
+
+    @staticmethod
+    def _cancel_order(symbol: str, order_id: str) -> None:
+        try:
+            bybit_signed_post("/v5/order/cancel",
+                              {"category": "linear",
+                               "symbol": symbol,
+                               "orderId": order_id})
+        except Exception:
+            pass
+
+    @staticmethod
+    def _order_state(symbol: str, order_id: str) -> Optional[tuple]:
+        """(cumExecQty, orderStatus) dell'ordine da /v5/order/realtime; None se non leggibile."""
+        try:
+            data = bybit_signed_get("/v5/order/realtime",
+                                    {"category": "linear", "symbol": symbol,
+                                     "orderId": order_id}).json()
+            if data.get("retCode") != 0:
+                return None
+            orders = data.get("result", {}).get("list") or []
+            if not orders:
+                return None
+            o = orders[0]
+            return float(o.get("cumExecQty", 0) or 0), o.get("orderStatus", "")
+        except Exception:
+            return None
+
+    def _sl_fields(self, sl_price: Optional[float], price_step: float) -> dict:
+        """Campi SL per /v5/order/create: lo stop nasce con l'ordine, senza trading-stop dopo il fill."""
+        if not sl_price or sl_price <= 0:
+            return {}
+        return {"stopLoss": self.d.format_price(sl_price, price_step),
+                "slTriggerBy": "MarkPrice", "tpslMode": "Full"}
+
+    def market_entry(self, symbol: str, usdt_amount: float,
+                     sl_price: Optional[float] = None) -> Optional[float]:
+        """
+        Apre la posizione (Buy per LONG, Sell per SHORT), con `sl_price` già
+        sull'ordine se indicato.
+        Primo tentativo: Limit PostOnly al bid/ask (maker → fee ridotta su Bybit).
+        Fallback: Market order.
+        """
+        d = self.d
+        sized = self._size_entry(symbol, usdt_amount)
+        if sized is None:
+            return None
+        info, qty_step, qty_aligned = sized["info"], sized["qty_step"], sized["qty_aligned"]
+        sl_fields = self._sl_fields(sl_price, info.get("price_step", 0.01))
+
+        # Limit PostOnly al bid (long) / all'ask (short)
+        maker = d.maker_price(symbol) or 0.0
+        if maker > 0:
+            maker_str = d.format_price(maker, info.get("price_step", 0.01))
+            qty_str = format_qty_with_step(float(qty_aligned), qty_step)
+            if float(qty_str) > 0:
+                body = {"category": "linear", "symbol": symbol,
+                        "side": d.side, "orderType": "Limit",
+                        "timeInForce": "PostOnly",
+                        "qty": qty_str, "price": maker_str,
+                        "positionIdx": d.position_idx, **sl_fields}
+                try:
+                    data = bybit_signed_post("/v5/order/create", body).json()
+                    if data.get("retCode") == 0:
+                        order_id = data.get("result", {}).get("orderId", "")
+                        filled = self._await_limit_fill(symbol, order_id)
+                        if filled is None or filled > 0:
+                            return filled
+                except Exception:
+                    pass
+
+        return self._market_fill(symbol, qty_aligned, qty_step, sl_fields)
+
+    def _market_fill(self, symbol: str, qty_aligned: Decimal, qty_step: float,
+                     sl_fields: Optional[dict] = None) -> Optional[float]:
+        """Market order con i retry su qty step cambiato (170137); qty inviata o None."""
+        d = self.d
+        name_lc = d.name.lower()
+        sl_fields = sl_fields or {}
+        for _ in range(3):
+            qty_str = format_qty_with_step(float(qty_aligned), qty_step)
+            if float(qty_str) <= 0:
+                return None
+            body = {"category": "linear", "symbol": symbol,
+                    "side": d.side, "orderType": "Market",
+                    "qty": qty_str, "positionIdx": d.position_idx, **sl_fields}
+            data = bybit_signed_post("/v5/order/create", body).json()
+            if data.get("retCode") == 0:
+                _invalidate_account_state()
+                return float(qty_str)
+            ret = data.get("retCode")
+            if ret == 10001 and sl_fields:
+                # SL rifiutato (prezzo già oltre lo stop): ordine senza SL, poi trading-stop
+                tlog(f"{name_lc}_sl_order:{symbol}",
+                     f"[{d.name}] {symbol} SL sull'ordine rifiutato ({data.get('retMsg')}) — "
+                     f"fallback trading-stop", 300)
+                sl_fields = {}
+                continue
+            if ret == 110007:
+                _invalidate_account_state()
+                tlog(f"bal_err:{d.name}:{symbol}",
+                     f"[{d.name}] saldo insufficiente per {symbol}", 300)
+                break
+            if ret == 170137:
+                info      = refresh_instrument_info(symbol)
+                qty_step  = float(info.get("qty_step", qty_step))
+                step_dec  = Decimal(str(qty_step))
+                qty_aligned = (qty_aligned // step_dec) * step_dec
+                continue
+            if ret in (110125, 110126):
+                self.blocked_symbols.add(symbol)
+                tlog(f"{name_lc}_blocked:{symbol}",
+                     f"[{d.name}] {symbol} esclusa dai prossimi scan: {data.get('retMsg')}", 3600)
+                break
+            tlog(f"{name_lc}_err:{symbol}:{ret}",
+                 f"[{d.name}] retCode={ret} {data.get('retMsg')}", 300)
+            break
+        return None
+
+    # ── TRAILING WORKER ───────────────────────────────────────────────────────
+    def _on_price(self, symbol: str, ticker: dict) -> None:
+        """Listener dello stream: segna il simbolo da rivalutare e sveglia il worker."""
+        if symbol in self.open_positions:
+            with self._trail_lock:
+                self._trail_dirty[symbol] = ticker
+            self._trail_wake.set()
+
+    def _pop_due(self, now: float) -> tuple:
+        """
+        Simboli con update di prezzo pronti (debounce per simbolo: al massimo uno
+        ogni TRAIL_DEBOUNCE_SEC; gli update intermedi si fondono nell'ultimo).
+        Ritorna ({symbol: ticker}, secondi al prossimo simbolo pronto o None).
+        """
+        due: dict = {}
+        next_in = None
+        with self._trail_lock:
+            for sym, ticker in list(self._trail_dirty.items()):
+                wait = self._trail_seen.get(sym, 0.0) + TRAIL_DEBOUNCE_SEC - now
+                if wait <= 0:
+                    due[sym] = ticker
+                    del self._trail_dirty[sym]
+                    self._trail_seen[sym] = now
+                elif next_in is None or wait < next_in:
+                    next_in = wait
+        return due, next_in
+
+    def trailing_worker(self) -> None:
+        """
+        SL management: ratchet floor fissi + ATR trail dall'estremo favorevole
+        (logica in bybit_core.trailing). Con il feed WS aggiornato ogni update di
+        prezzo di una posizione la rivaluta subito (debounce per simbolo) e un
+        giro completo parte solo ogni TRAIL_FULL_PASS_SEC; con il feed assente o
+        fermo si torna al giro completo ogni TRAIL_SLEEP_SEC. Il giro a eventi
+        non chiama REST: posizioni solo dallo stream privato pronto, drift di
+        avgPrice e posizioni chiuse altrimenti al giro completo.
+        """
+        d = self.d
+        log(f"[TRAIL] avviato — ratchet + ATR trail{'' if d.is_long else ' (SHORT)'}")
+        event_driven = add_price_listener(self._on_price)
+        last_full = 0.0
+        while True:
+            next_in = None
+            try:
+                now = time.time()
+                fresh = event_driven and market_stream_fresh()
+                if now - last_full >= (TRAIL_FULL_PASS_SEC if fresh else TRAIL_SLEEP_SEC):
+                    last_full = now
+                    with self._trail_lock:
+                        self._trail_dirty.clear()
+                    # Un solo snapshot posizioni per giro: avgPrice e markPrice per tutti i simboli.
+                    self._trail_pass(list(self.open_positions), get_positions_snapshot(d.side))
+                else:
+                    due, next_in = self._pop_due(now)
+                    if due:
+                        # Giro a eventi: prezzo dallo stream e posizioni dallo stream
+                        # privato se pronto, mai REST (drift avgPrice al giro completo)
+                        self._trail_pass(list(due), get_stream_positions(d.side), due)
+            except Exception as e:
+                log(f"[TRAIL] exc: {e}")
+            if next_in is not None:
+                time.sleep(next_in)   # update già in coda: attendi solo il debounce
+            else:
+                self._trail_wake.wait(TRAIL_SLEEP_SEC)
+            self._trail_wake.clear()
+
+    def _trail_pass(self, symbols: list, positions: Optional[dict],
+                    tickers: Optional[dict] = None) -> None:
+        """Applica il trailing ai simboli; `tickers` = prezzi dallo stream (giro a eventi)."""
+        d = self.d
+        s = d.sign
+        full_pass = tickers is None
+        for symbol in symbols:
+            if symbol not in self.open_positions:
+                continue
+            entry = self.get_position(symbol)
+            if not entry:
+                continue
+            pos = positions.get(symbol) if positions is not None else None
+            if positions is not None and pos is None:
+                continue  # già chiusa su Bybit: la gestisce il main loop
+
+            # Allinea eventuali drift tra stato interno e avgPrice reale Bybit.
+            if pos is not None:
+                ex_entry = float(pos.get("avgPrice", 0) or 0)
+            elif full_pass:
+                _, ex_entry = get_open_fill(symbol, d.side)
+            else:
+                ex_entry = 0.0
+            if ex_entry > 0:
+                saved_entry = float(entry.get("entry_price", 0) or 0)
+                if saved_entry > 0:
+                    drift_pct = abs(ex_entry - saved_entry) / saved_entry * 100
+                    if drift_pct >= 0.05:
+                        entry["entry_price"] = ex_entry
+                        if (not entry.get("breakeven_active")
+                                and not entry.get("partial_tp_active")):
+                            sl_now = float(entry.get("sl_price", 0) or 0)
+                            new_r = s * (ex_entry - sl_now)
+                            if sl_now > 0 and new_r > 0:
+                                entry["r_dist"] = new_r
+                                entry["orig_r_dist"] = new_r
+                        self.set_position(symbol, entry)
+                        log(f"[SYNC-ENTRY] {symbol} avgPrice Bybit {saved_entry:.6f} → {ex_entry:.6f} "
+                            f"(drift {drift_pct:.3f}%)")
+                        entry = self.get_position(symbol) or entry
+
+            ticker = tickers.get(symbol) if tickers else None
+            if ticker:
+                price_now = ticker.get("mark") or ticker.get("price")
+            else:
+                mark_price = float(pos.get("markPrice", 0) or 0) if pos is not None else 0.0
+                price_now  = mark_price if mark_price > 0 else get_last_price(symbol)
+            if not price_now:
+                continue
+            if float(entry.get("entry_price", 0)) <= 0:
+                continue
+            self._trail_symbol(symbol, entry, price_now, persist_water=full_pass)
+
+    def _trail_symbol(self, symbol: str, entry: dict, price_now: float,
+                      persist_water: bool = True) -> None:
+        """
+        Applica a una posizione le decisioni di plan_stop / plan_exit.
+        Il water mark va nel journal con lo spostamento dello SL o al giro
+        completo (`persist_water`): a eventi resta in memoria.
+        """
+        d = self.d
+        atr = get_atr_4h(symbol) if entry.get("trailing_active") else None
+        plan = trailing.plan_stop(d, entry, price_now, atr)
+        pnl_lev = plan.pnl_lev
+
+        # ── Water mark: massimo (LONG) / minimo (SHORT) visto ────────────────
+        if plan.water != entry.get(d.water_key):
+            entry[d.water_key] = plan.water
+            self._water_unsaved.add(symbol)
+        if persist_water and symbol in self._water_unsaved:
+            self._water_unsaved.discard(symbol)
+            self.set_position(symbol, entry)
+
+        if plan.new_sl is not None:
+            new_sl_cand = plan.new_sl
+            ok = self.set_position_stoploss(symbol, new_sl_cand)
+            if ok:
+                trailing.apply_stop(entry, plan)
+                self._water_unsaved.discard(symbol)
+                self.set_position(symbol, entry)
+
+                if plan.atr_tighter(d.sign):
+                    # ATR trail più stretto del ratchet
+                    water_lbl = "hwm" if d.is_long else "lwm"
+                    log(f"[TRAIL] {symbol} ✅ ATR trail{d.tag}: "
+                        f"{water_lbl}={plan.water:.4f} atr={plan.atr:.4f} "
+                        f"SL→{new_sl_cand:.4f} P&L={pnl_lev:+.1f}%")
+                    self.notify(
+                        f"🎯 Trail attivato{d.tag} {symbol}\n"
+                        f"Prezzo: {price_now:.4f} | "
+                        f"{'High' if d.is_long else 'Min'}: {plan.water:.4f}\n"
+                        f"Trail dist: {TRAIL_ATR_MULT * plan.atr:.6f} "
+                        f"({TRAIL_ATR_MULT:.1f}×ATR)\n"
+                        f"SL → {new_sl_cand:.4f}"
+                    )
+                else:
+                    # Ratchet floor più stretto
+                    log(f"[TRAIL] {symbol} ✅ Ratchet{d.tag}: P&L={pnl_lev:+.1f}% "
+                        f"→ floor +{plan.floor_lev}% lev "
+                        f"SL→{new_sl_cand:.4f}")
+                    self.notify(
+                        f"🔒 Ratchet{d.tag} {symbol}\n"
+                        f"P&L al trigger: {pnl_lev:+.1f}% lev\n"
+                        f"Floor garantito: +{plan.floor_lev}% lev\n"
+                        f"SL → {new_sl_cand:.4f}"
+                    )
+            else:
+                log(f"[TRAIL] {symbol} ⚠️ SL update FAIL "
+                    f"cand={new_sl_cand:.4f} pnl={pnl_lev:+.1f}%")
+
+        if not plan.check_exits:
+            return
+        exit_kind = trailing.plan_exit(d, entry, price_now, pnl_lev)
+
+        # ── TIME STOP: trade coricato dopo N giorni ──────────────────────────
+        if exit_kind == trailing.TIME_STOP:
+            days_open = (time.time() - float(entry.get("entry_time", time.time()))) / 86400
+            cur_qty = float(entry.get("qty", 0))
+            if cur_qty > 0:
+                ok = self.market_close(symbol, cur_qty)
+                if ok:
+                    self.discard_open(symbol)
+                    log(f"[TIME-STOP] {symbol} ✅ chiuso dopo {days_open:.1f}gg "
+                        f"pnl={pnl_lev:+.1f}% prezzo={price_now:.4f}")
+                    self.notify(
+                        f"⏱️ Time Stop{d.tag} {symbol}\n"
+                        f"Trade aperto da {days_open:.0f} giorni senza slancio\n"
+                        f"P&L: {pnl_lev:+.1f}% lev | Chiuso a {price_now:.4f}\n"
+                        f"Capitale liberato per nuove opportunità"
+                    )
+                else:
+                    log(f"[TIME-STOP] {symbol} ⚠️ FAIL chiusura dopo {days_open:.1f}gg")
+            return
+
+        # ── PARTIAL TP a 2R ──────────────────────────────────────────────────
+        if exit_kind == trailing.PARTIAL_TP:
+            cur_qty   = float(entry.get("qty", 0))
+            close_qty = cur_qty * PARTIAL_TP_PCT
+            if close_qty <= 0:
+                return
+            # Controlla se qty è esprimibile con il qty_step del simbolo.
+            # Se è troppo piccola (es. dopo restart con residuo già dimezzato),
+            # segnala e skippa per evitare il loop infinito.
+            instr     = get_instrument_info(symbol)
+            qty_step  = float(instr.get("qty_step", 0.01))
+            qty_check = format_qty_with_step(close_qty, qty_step)
+            if float(qty_check) <= 0:
+                entry["partial_tp_active"] = True
+                self.set_position(symbol, entry)
+                log(f"[PARTIAL-TP] {symbol} ⚠️ qty {close_qty:.6f} "
+                    f"< step {qty_step} — partial già fatto, skip")
+                return
+            ok = self.market_close(symbol, close_qty)
+            if ok:
+                entry["partial_tp_active"] = True
+                entry["qty"] = cur_qty * (1.0 - PARTIAL_TP_PCT)
+                self.set_position(symbol, entry)
+                log(f"[PARTIAL-TP] {symbol} ✅ {PARTIAL_TP_PCT*100:.0f}% chiuso a "
+                    f"+{PARTIAL_TP_R:.1f}R prezzo={price_now:.4f} "
+                    f"qty={close_qty:.4f}")
+                self.notify(
+                    f"💰 Partial TP{d.tag} {symbol}\n"
+                    f"{PARTIAL_TP_PCT*100:.0f}% chiuso a +{PARTIAL_TP_R:.1f}R | "
+                    f"Prezzo: {price_now:.4f}\n"
+                    f"Resto protetto dal ratchet"
+                )
+            else:
+                log(f"[PARTIAL-TP] {symbol} ⚠️ FAIL "
+                    f"prezzo={price_now:.4f}")
+
+    # ── SL WATCHDOG ───────────────────────────────────────────────────────────
+    def sl_watchdog(self) -> None:
+        """Ogni 10 min verifica che ogni posizione aperta abbia uno SL impostato su Bybit."""
+        d = self.d
+        log("[SL-WATCH] avviato")
+        while True:
+            time.sleep(SL_WATCH_SLEEP_SEC)
+            try:
+                positions = get_positions_snapshot(d.side)
+                if positions is None:
+                    continue
+                for symbol, pos in positions.items():
+                    sl_val = float(pos.get("stopLoss", 0) or 0)
+                    if sl_val > 0:
+                        continue   # SL già presente: ok
+                    entry    = self.get_position(symbol)
+                    if not entry:
+                        continue
+                    sl_price = float(entry.get("sl_price", 0))
+                    if sl_price <= 0:
+                        ep       = float(entry.get("entry_price", 0))
+                        rd       = float(entry.get("r_dist", ep * 0.04))
+                        sl_price = ep - d.sign * rd
+                    cur = get_last_price(symbol)
+                    if cur and d.is_long and sl_price >= cur:
+                        sl_price = cur * 0.97
+                    elif cur and not d.is_long and sl_price <= cur:
+                        sl_price = cur * 1.03   # fallback: 3% sopra
+                    ok = self.set_position_stoploss(symbol, sl_price)
+                    if not ok:
+                        self.notify(
+                            f"🚨 SL MANCANTE{d.tag} {symbol} — reimpostazione FALLITA!\n"
+                            f"SL target: {sl_price:.4f} — VERIFICA MANUALE"
+                        )
+            except Exception as e:
+                log(f"[SL-WATCH] exc: {e}")
+
+    # ── SYNC POSIZIONI ALL'AVVIO ──────────────────────────────────────────────
+    @staticmethod
+    def _journal_matches(saved: Optional[dict], qty: float, entry_price: float) -> bool:
+        """True se lo stato del journal descrive la stessa posizione aperta su Bybit."""
+        if not saved:
+            return False
+        saved_ep  = float(saved.get("entry_price", 0) or 0)
+        saved_qty = float(saved.get("qty", 0) or 0)
+        if saved_ep <= 0 or saved_qty <= 0:
+            return False
+        # avgPrice spostato o qty cresciuta: posizione riaperta/incrementata a bot fermo
+        return (abs(entry_price - saved_ep) / saved_ep <= 0.005
+                and qty <= saved_qty * 1.1)
+
+    def sync_positions_from_wallet(self) -> None:
+        """
+        Al restart, recupera le posizioni aperte della direzione da Bybit.
+        Lo stato si riprende dal journal (entry_time, orig_r_dist, partial TP,
+        water mark) quando descrive la stessa posizione; altrimenti si ricostruisce.
+        Rispetta lo SL già impostato (non lo sovrascrive mai: ricalcolarlo
+        causerebbe SL più larghi ad ogni restart).
+        """
+        d = self.d
+        s = d.sign
+        log(f"[SYNC] Scansione posizioni {d.name} aperte...")
+        saved_state = self.journal.replay()
+        listed = False
+        try:
+            resp     = bybit_signed_get("/v5/position/list",
+                                        {"category": "linear", "settleCoin": "USDT"})
+            data     = resp.json()
+            listed   = data.get("retCode") == 0
+            pos_list = data.get("result", {}).get("list", []) if listed else []
+        except Exception as e:
+            log(f"[SYNC] errore: {e}")
+            pos_list = []
+
+        trovate = 0
+        dal_journal = 0
+        for pos in pos_list:
+            if pos.get("side") != d.side:
+                continue
+            qty = float(pos.get("size", 0) or 0)
+            if qty <= 0:
+                continue
+            symbol      = pos["symbol"]
+            entry_price = float(pos.get("avgPrice") or pos.get("entryPrice") or 0)
+            if entry_price <= 0:
+                continue
+
+            sl_from_bybit   = float(pos.get("stopLoss") or 0)
+            trailing_active = float(pos.get("trailingStop", 0) or 0) > 0
+
+            saved = saved_state.get(symbol)
+            if self._journal_matches(saved, qty, entry_price):
+                entry = dict(saved)
+                entry["qty"]         = qty
+                entry["entry_price"] = entry_price
+                if sl_from_bybit > 0:
+                    entry["sl_price"] = sl_from_bybit   # lo SL vero è quello su Bybit
+                self.set_position(symbol, entry)
+                self.add_open(symbol)
+                if sl_from_bybit <= 0 and float(entry.get("sl_price", 0) or 0) > 0:
+                    self.set_position_stoploss(symbol, float(entry["sl_price"]))
+                days_open = (time.time() - float(entry.get("entry_time", time.time()))) / 86400
+                log(f"[SYNC] {d.name}: {symbol} dal journal qty={qty} entry={entry_price:.4f} "
+                    f"SL={float(entry.get('sl_price', 0)):.4f} aperta da {days_open:.1f}gg "
+                    f"partial={'SI' if entry.get('partial_tp_active') else 'NO'}")
+                trovate += 1
+                dal_journal += 1
+                continue
+
+            if d.is_long:
+                sl_at_risk  = sl_from_bybit > 0 and sl_from_bybit < entry_price * 0.999
+                sl_in_profit = sl_from_bybit >= entry_price * 0.999
+            else:
+                sl_at_risk  = sl_from_bybit > 0 and sl_from_bybit > entry_price * 1.001
+                sl_in_profit = sl_from_bybit > 0 and sl_from_bybit <= entry_price * 1.001
+
+            if sl_at_risk:
+                # Caso normale: SL oltre entry dal lato della perdita (non ancora breakeven)
+                sl_price        = sl_from_bybit
+                r_dist          = s * (entry_price - sl_price)
+                orig_r_dist     = r_dist
+                breakeven_active = False
+                set_sl_on_bybit = False
+            elif sl_in_profit:
+                # SL a/oltre entry: il breakeven è già stato applicato.
+                # NON sovrascrivere il SL — stima orig_r_dist via ATR.
+                sl_price        = sl_from_bybit
+                atr_s           = get_atr_4h(symbol) or entry_price * 0.03
+                orig_r_dist     = atr_s * 2.0
+                r_dist          = orig_r_dist
+                breakeven_active = True
+                set_sl_on_bybit = False
+                log(f"[SYNC] {symbol}: SL={sl_price:.4f} {'≥' if d.is_long else '≤'} entry — "
+                    f"breakeven già attivo")
+            else:
+                # Fallback: posizione senza SL impostato (non dovrebbe accadere)
+                atr_s           = get_atr_4h(symbol) or entry_price * 0.03
+                orig_r_dist     = atr_s * 2.0
+                r_dist          = orig_r_dist
+                sl_price        = entry_price - s * r_dist
+                breakeven_active = False
+                set_sl_on_bybit = True
+
+            # Se trailing già attivo su Bybit, anche breakeven è certamente passato
+            if trailing_active:
+                breakeven_active = True
+
+            # Determina se il partial TP è già stato eseguito in precedenti run.
+            # Se il trailing è attivo e il prezzo corrente ha già superato la soglia 2R,
+            # il partial è quasi certamente avvenuto — evita un secondo fire al restart.
+            price_now_sync   = get_last_price(symbol) or 0.0
+            partial_trigger  = entry_price + s * PARTIAL_TP_R * orig_r_dist
+            partial_tp_done  = (trailing_active
+                                and price_now_sync > 0
+                                and d.reached(price_now_sync, partial_trigger))
+            if partial_tp_done:
+                log(f"[SYNC] {symbol}: prezzo {price_now_sync:.4f} "
+                    f"{'>=' if d.is_long else '<='} trigger {partial_trigger:.4f} "
+                    f"— partial TP già eseguito, skip al restart")
+
+            self.set_position(symbol, {
+                "entry_price":       entry_price,
+                "sl_price":          sl_price,
+                "r_dist":            r_dist,
+                "orig_r_dist":       orig_r_dist,
+                "qty":               qty,
+                "entry_time":        time.time(),
+                "trailing_active":   trailing_active,
+                "breakeven_active":  breakeven_active,
+                "partial_tp_active": partial_tp_done,
+            })
+            self.add_open(symbol)
+            if set_sl_on_bybit:
+                self.set_position_stoploss(symbol, sl_price)
+            log(f"[SYNC] {d.name}: {symbol} qty={qty} entry={entry_price:.4f} "
+                f"SL={sl_price:.4f} ({'impostato' if set_sl_on_bybit else 'da Bybit'}) "
+                f"trail={'SI' if trailing_active else 'NO'} "
+                f"be={'SI' if breakeven_active else 'NO'}")
+            trovate += 1
+
+        if listed:
+            # Chiuse a bot fermo: via dal journal
+            for symbol in set(saved_state) - self.open_positions:
+                log(f"[SYNC] {symbol}: nel journal ma non più aperta su Bybit")
+                self.drop_position(symbol)
+            self.journal.compact()
+        log(f"[SYNC] {trovate} posizioni {d.name} recuperate ({dal_journal} dal journal)")
+
+    # ── CIRCUIT BREAKER ───────────────────────────────────────────────────────
+    def check_circuit_breaker(self) -> bool:
+        """
+        Controlla daily loss limit. Se equity scende > CIRCUIT_BREAKER_PCT%
+        dal valore di inizio giornata: chiude tutto e blocca per 24h.
+        Returns True se il trading è bloccato.
+        """
+        from datetime import datetime, timezone
+        d = self.d
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+        # Reset giornaliero a mezzanotte UTC
+        if today != self._cb_last_day:
+            self._cb_last_day          = today
+            self._cb_equity_day_start  = get_total_equity()
+            self._cb_triggered         = False
+            self._cb_triggered_at      = 0.0
+            log(f"[CB] Reset giornaliero — equity start: {self._cb_equity_day_start:.2f} USDT")
+            return False
+
+        # Cooldown scaduto → riattiva trading
+        if self._cb_triggered:
+            elapsed_h = (time.time() - self._cb_triggered_at) / 3600
+            if elapsed_h >= CIRCUIT_BREAKER_COOLDOWN_H:
+                self._cb_triggered        = False
+                self._cb_equity_day_start = get_total_equity()
+                log("[CB] Cooldown scaduto — circuit breaker resettato, trading riattivato")
+                self.notify(f"✅ Circuit breaker{d.tag} resettato — trading riattivato")
+            return self._cb_triggered
+
+        if self._cb_equity_day_start <= 0:
+            self._cb_equity_day_start = get_total_equity()
+            return False
+
+        current_equity = get_total_equity()
+        if current_equity <= 0:
+            return False
+
+        drawdown_pct = (self._cb_equity_day_start - current_equity) / self._cb_equity_day_start * 100
+
+        if drawdown_pct >= CIRCUIT_BREAKER_PCT:
+            self._cb_triggered    = True
+            self._cb_triggered_at = time.time()
+            log(f"[CB] 🔴 CIRCUIT BREAKER{d.tag} — drawdown={drawdown_pct:.2f}% "
+                f"({self._cb_equity_day_start:.2f} → {current_equity:.2f} USDT)")
+
+            # Chiudi tutte le posizioni aperte
+            closed = []
+            for symbol in list(self.open_positions):
+                pos = self.get_position(symbol)
+                if pos:
+                    qty = float(pos.get("qty", 0))
+                    if qty > 0 and self.market_close(symbol, qty):
+                        self.discard_open(symbol)
+                        closed.append(symbol)
+                        log(f"[CB] {symbol} chiusa")
+                    else:
+                        log(f"[CB] {symbol} ⚠️ FAIL chiusura — verifica manuale!")
+
+            self.notify(
+                f"🚨 CIRCUIT BREAKER{d.tag} ATTIVATO\n"
+                f"Drawdown giornaliero: -{drawdown_pct:.1f}%\n"
+                f"Equity: {self._cb_equity_day_start:.2f} → {current_equity:.2f} USDT\n"
+                f"Chiuse: {', '.join(closed) if closed else 'nessuna'}\n"
+                f"Trading bloccato per {CIRCUIT_BREAKER_COOLDOWN_H}h"
+            )
+            return True
+
+        return False
+
+    # ── VALUTAZIONE SEGNALI IN PARALLELO ──────────────────────────────────────
+    def evaluate_candidates(self, candidates: list, reject_stats: dict) -> dict:
+        """
+        Esegue check_entry_signal su un pool di SCAN_WORKERS thread.
+        `candidates` = [(rank, symbol, chg24h)]; ritorna {rank: signal} per i segnali validi.
+        Solo letture di mercato: gli ordini restano serializzati nel main loop.
+        """
+        d = self.d
+        def run(item):
+            rank_idx, sym, _ = item
+            stats: dict = {}
+            try:
+                return rank_idx, check_entry_signal(d, sym, stats, rank=rank_idx), stats
+            except Exception as e:
+                tlog(f"signal_exc:{d.name}:{sym}", f"[SCAN] {sym} errore valutazione: {e}", 300)
+                return rank_idx, None, {"signal_exc": 1}
+
+        signals = {}
+        if not candidates:
+            return signals
+        with ThreadPoolExecutor(max_workers=max(1, SCAN_WORKERS)) as pool:
+            for rank_idx, signal, stats in pool.map(run, candidates):
+                for reason, n in stats.items():
+                    reject_stats[reason] = reject_stats.get(reason, 0) + n
+                if signal:
+                    signals[rank_idx] = signal
+        return signals
+
+    # ── MAIN LOOP ─────────────────────────────────────────────────────────────
+    def _register_close(self, sym: str) -> None:
+        """Posizione chiusa su Bybit (SL/trail): log, loss streak, pulizia stato."""
+        d = self.d
+        entry = self.get_position(sym)
+        ep    = float(entry.get("entry_price", 0)) if entry else 0
+        # Uscita reale dalle esecuzioni dello stream privato, se disponibile
+        closed = pop_closed_trade(sym, d.position_idx)
+        cur   = closed["price"] if closed else (get_last_price(sym) or 0)
+        pnl   = d.sign * (cur - ep) / ep * 100 if ep else 0
+        pnl_usdt = f" | realizzato {closed['pnl']:+.2f} USDT" if closed else ""
+        log(f"[CLOSE] {sym}{d.tag} chiusa ~{pnl:+.1f}%{pnl_usdt}")
+        if pnl < 0:
+            self._loss_streak += 1
+            if self._loss_streak >= LOSS_STREAK_LIMIT:
+                self._entry_cooldown_until_ts = max(
+                    self._entry_cooldown_until_ts,
+                    time.time() + LOSS_STREAK_COOLDOWN_H * 3600,
+                )
+                log(f"[COOLDOWN]{d.tag} attivato per {LOSS_STREAK_COOLDOWN_H}h "
+                    f"dopo {self._loss_streak} chiusure negative consecutive")
+                self.notify(
+                    f"🧊 Cooldown {d.name} attivato {LOSS_STREAK_COOLDOWN_H}h\n"
+                    f"Motivo: {self._loss_streak} chiusure negative consecutive"
+                )
+        else:
+            self._loss_streak = 0
+        self.notify(
+            f"📊 Chiusa{d.tag} {sym}\n"
+            f"PnL ~{pnl:+.1f}% | Entry: {ep:.4f} | Uscita ~{cur:.4f}{pnl_usdt}"
+        )
+        self.discard_open(sym)
+        self.drop_position(sym)
+
+    def _prepare_entry(self, rank_idx: int, sym: str, chg24h: float, signal: dict,
+                       reject_stats: dict, pending_risk: float = 0.0) -> Optional[dict]:
+        """
+        Sizing a rischio fisso e risk cap di portafoglio (`pending_risk` = rischio
+        degli ingressi già decisi nella stessa scan). Ritorna il piano d'ingresso o None.
+        """
+        d = self.d
+        signal_source = "SIGNAL-ANTI"
+        equity = get_total_equity()
+        if equity <= 0:
+            return None
+        risk_usdt = equity * RISK_PCT
+        open_risk_usdt = portfolio_open_risk_usdt() + pending_risk
+        if (open_risk_usdt + risk_usdt) > equity * MAX_TOTAL_OPEN_RISK_PCT:
+            reject_stats["portfolio_risk_cap"] = reject_stats.get("portfolio_risk_cap", 0) + 1
+            return None
+        r_dist    = signal["r_dist"]
+        entry_px  = signal["entry_price"]
+        usdt_val  = (risk_usdt / r_dist) * entry_px
+        usdt_val  = max(usdt_val, 5.5)  # floor: minimo Bybit è 5 USDT
+
+        chg_1h, chg_4h = signal["chg_1h"], signal["chg_4h"]
+        dist_sign, sl_sign = ("+", "-") if d.is_long else ("-", "+")
+        log(f"[SIGNAL] {sym}{d.tag} rank#{rank_idx} chg24h={chg24h:+.2f}% src={signal_source} | "
+            f"chg1h={chg_1h:+.2f}% chg4h={chg_4h:+.2f}% "
+            f"rvol={signal['rvol']:.2f}/{signal['min_rvol']:.2f} "
+            f"base={signal['base_range']:.2f}%/{signal['base_max']:.2f}% "
+            f"normZ={signal['norm_z']:+.2f} RR={signal['rr_est']:.2f} | "
+            f"EMA20: {signal['ema20_4h']:.4f} | dist: {dist_sign}{signal['dist_ema']:.1f}% | "
+            f"RSI: {signal['rsi']:.0f} | "
+            f"SL: {sl_sign}{signal['sl_pct']:.1f}% | size: {usdt_val:.1f} USDT")
+        return {"rank": rank_idx, "sym": sym, "chg24h": chg24h, "signal": signal,
+                "source": signal_source, "risk_usdt": risk_usdt, "usdt_val": usdt_val}
+
+    def _finalize_entry(self, plan: dict, qty: float, fill: Optional[tuple] = None,
+                        sl_attached: bool = False) -> bool:
+        """
+        Stato e SL dopo il fill. `fill` = (qty, avgPrice) già letti; con
+        `sl_attached` lo SL è partito con l'ordine e trading-stop resta il
+        fallback se la posizione risulta senza SL. True se aperta e protetta.
+        """
+        d = self.d
+        sym, signal = plan["sym"], plan["signal"]
+        entry_px = signal["entry_price"]
+        actual_qty, actual_entry_px = fill if fill is not None else get_open_fill(sym, d.side)
+        if actual_qty > 0:
+            qty = actual_qty
+        if actual_entry_px > 0:
+            entry_px = actual_entry_px
+
+        actual_r_dist = d.sign * (entry_px - signal["sl_price"])
+        if actual_r_dist <= 0:
+            log(f"[ENTRY] {sym}{d.tag} — r_dist non valido dopo fill reale")
+            return False
+
+        # Salva stato e imposta SL
+        sl_price = signal["sl_price"]
+        sl_pct = actual_r_dist / entry_px * 100
+        self.set_position(sym, {
+            "entry_price":       entry_px,
+            "sl_price":          sl_price,
+            "r_dist":            actual_r_dist,
+            "orig_r_dist":       actual_r_dist,   # mai modificato: base per calcolo ratchet
+            "qty":               qty,
+            "entry_time":        time.time(),
+            "trailing_active":   False,
+            "breakeven_active":  False,
+            "partial_tp_active": False,
+        })
+        self.add_open(sym)
+        if sl_attached:
+            # Verifica sulla posizione: se lo SL non risulta (ordine senza SL,
+            # posizione non ancora visibile) si ripiega su trading-stop
+            pos = (get_live_positions(d.side) or {}).get(sym)
+            sl_ok = pos is not None and float(pos.get("stopLoss") or 0) > 0
+            if not sl_ok:
+                log(f"[ENTRY] {sym}{d.tag} SL dell'ordine assente — fallback trading-stop")
+                sl_ok = self.set_position_stoploss(sym, sl_price)
+        else:
+            sl_ok = self.set_position_stoploss(sym, sl_price)
+        if not sl_ok:
+            log(f"[ENTRY] {sym}{d.tag} ⚠️ SL non impostato — chiusura di sicurezza")
+            self.market_close(sym, qty)
+            self.discard_open(sym)
+            self.drop_position(sym)
+            return False
+
+        header = ("📈 ENTRY {sym} — Anticipation Breakout (1h)" if d.is_long
+                  else "📉 ENTRY SHORT {sym} — Anticipation Breakdown (1h)").format(sym=sym)
+        sl_lbl = f"{sl_pct:.1f}%" if d.is_long else f"+{sl_pct:.1f}%"
+        self.notify(
+            f"{header}\n"
+            f"Rank: #{plan['rank']} | 24h: {plan['chg24h']:+.2f}% | Src: {plan['source']}\n"
+            f"1h: {signal['chg_1h']:+.2f}% | 4h: {signal['chg_4h']:+.2f}% | RVOL: {signal['rvol']:.2f}\n"
+            f"Entry: {entry_px:.4f} | SL: {sl_price:.4f} ({sl_lbl})\n"
+            f"EMA20: {signal['ema20_4h']:.4f} | RSI: {signal['rsi']:.0f}\n"
+            f"R-dist: {actual_r_dist:.4f} | Risk: {plan['risk_usdt']:.2f} USDT"
+        )
+        return True
+
+    def _enter(self, plan: dict) -> bool:
+        """Ingresso singolo: leva, ordine con SL (Limit PostOnly → Market)."""
+        sym = plan["sym"]
+        set_leverage(sym)
+        qty = self.market_entry(sym, plan["usdt_val"], plan["signal"]["sl_price"])
+        if not qty or qty <= 0:
+            log(f"[ENTRY] {sym}{self.d.tag} — ordine fallito")
+            return False
+        return self._finalize_entry(plan, qty, sl_attached=True)
+
+    def _enter_batch(self, plans: list) -> int:
+        """
+        Più segnali nella stessa scan: i Limit PostOnly partono insieme via
+        /v5/order/create-batch con lo SL già sull'ordine e i fill si attendono
+        in parallelo. I simboli non eseguiti o rifiutati ripiegano sul market
+        order singolo. Ritorna il numero di ingressi riusciti.
+        """
+        d = self.d
+        avail = get_usdt_balance()
+        orders: list = []      # (plan, sized, body)
+        fallback: list = []    # (plan, sized o None)
+        for plan in plans:
+            sym = plan["sym"]
+            set_leverage(sym)
+            sized = self._size_entry(sym, plan["usdt_val"], avail)
+            if sized is None:
+                log(f"[ENTRY] {sym}{d.tag} — ordine fallito")
+                continue
+            avail = max(0.0, avail - sized["notional"] / DEFAULT_LEVERAGE)
+            info, qty_step = sized["info"], sized["qty_step"]
+            maker = d.maker_price(sym) or 0.0
+            qty_str = format_qty_with_step(float(sized["qty_aligned"]), qty_step)
+            if maker <= 0 or float(qty_str) <= 0:
+                fallback.append((plan, sized))
+                continue
+            price_step = info.get("price_step", 0.01)
+            orders.append((plan, sized, {
+                "symbol": sym, "side": d.side, "orderType": "Limit",
+                "timeInForce": "PostOnly", "qty": qty_str,
+                "price": d.format_price(maker, price_step),
+                "positionIdx": d.position_idx,
+                **self._sl_fields(plan["signal"]["sl_price"], price_step),
+            }))
+
+        placed: list = []      # (plan, sized, order_id)
+        for i in range(0, len(orders), BATCH_ORDER_MAX):
+            chunk = orders[i:i + BATCH_ORDER_MAX]
+            try:
+                data = bybit_signed_post("/v5/order/create-batch", {
+                    "category": "linear", "request": [body for _, _, body in chunk],
+                }).json()
+            except Exception as e:
+                log(f"[ENTRY] create-batch{d.tag} exc: {e}")
+                data = {}
+            results = data.get("result", {}).get("list") or []
+            codes = data.get("retExtInfo", {}).get("list") or []
+            for j, (plan, sized, _) in enumerate(chunk):
+                code = codes[j].get("code") if j < len(codes) else None
+                order_id = results[j].get("orderId", "") if j < len(results) else ""
+                if data.get("retCode") == 0 and code == 0 and order_id:
+                    placed.append((plan, sized, order_id))
+                else:
+                    msg = codes[j].get("msg") if j < len(codes) else data.get("retMsg")
+                    tlog(f"batch_err:{d.name}:{plan['sym']}",
+                         f"[ENTRY] {plan['sym']}{d.tag} batch rifiutato ({code}: {msg}) — market", 300)
+                    fallback.append((plan, sized))
+
+        def await_fill(item):
+            plan, _, order_id = item
+            filled = self._await_limit_fill(plan["sym"], order_id)
+            return filled, (get_open_fill(plan["sym"], d.side) if filled else None)
+
+        entered = 0
+        if placed:
+            log(f"[ENTRY] {len(placed)} ordini{d.tag} in batch, attesa fill in parallelo")
+            with ThreadPoolExecutor(max_workers=len(placed)) as pool:
+                fills = list(pool.map(await_fill, placed))
+            for (plan, sized, _), (filled, fill) in zip(placed, fills):
+                if filled is None:
+                    continue           # Limit ancora aperto: niente Market sopra
+                if filled > 0:
+                    entered += self._finalize_entry(plan, filled, fill, sl_attached=True)
+                else:
+                    fallback.append((plan, sized))
+
+        for plan, sized in sorted(fallback, key=lambda x: x[0]["rank"]):
+            sym = plan["sym"]
+            sl_fields = self._sl_fields(plan["signal"]["sl_price"],
+                                        sized["info"].get("price_step", 0.01))
+            qty = self._market_fill(sym, sized["qty_aligned"], sized["qty_step"], sl_fields)
+            if not qty or qty <= 0:
+                log(f"[ENTRY] {sym}{d.tag} — ordine fallito")
+                continue
+            entered += self._finalize_entry(plan, qty, sl_attached=True)
+        return entered
+
+    def tick(self) -> bool:
+        """
+        Un giro del main loop: gate BTC, chiusure su Bybit, topic WS e, se
+        dovuta, la scan. True se la scan è partita (niente pausa prima del giro dopo).
+        """
+        d = self.d
+        now = time.time()
+
+        # Aggiorna il gate BTC della direzione (al max ogni 60 min)
+        regime.update(d.is_long)
+
+        # Controlla chiusure (SL/trail colpiti su Bybit)
+        try:
+            live = get_live_positions(d.side)
+            if live is not None:
+                for sym in list(self.open_positions):
+                    if sym not in live:
+                        self._register_close(sym)
+        except Exception as e:
+            tlog(f"pos_check_err:{d.name}", f"[MAIN] check pos exc: {e}", 120)
+
+        self.update_stream_subscriptions()
+        tlog("rate_metrics", f"[RATE] {LIMITER.summary()}", METRICS_LOG_SEC)
+        tlog("clock_metrics", f"[TIME] {CLOCK.summary()}", METRICS_LOG_SEC)
+
+        # Attendi tra scan
+        if now - self._last_scan_ts < SCAN_INTERVAL_SEC:
+            return False
+
+        self._last_scan_ts = now
+        self.scan(now)
+        return True
+
+    def scan(self, now: float) -> None:
+        d = self.d
+        n_open = len(self.open_positions)
+        log(f"[SCAN] ─── Avvio scansione{d.tag} ─── open: {n_open}/{MAX_OPEN_POSITIONS}")
+
+        if self.check_circuit_breaker():
+            tlog(f"circuit_breaker:{d.name}", "🚨 Circuit breaker attivo — scan bloccata", 1800)
+            return
+
+        if self._entry_cooldown_until_ts > now:
+            rem_h = (self._entry_cooldown_until_ts - now) / 3600
+            tlog(f"loss_cooldown:{d.name}",
+                 f"🧊 Cooldown {d.name} attivo per {rem_h:.1f}h dopo loss streak",
+                 300)
+            return
+        if self._entry_cooldown_until_ts > 0 and now >= self._entry_cooldown_until_ts:
+            self._entry_cooldown_until_ts = 0.0
+            self._loss_streak = 0
+            log(f"[COOLDOWN] {d.name} scaduto — ingressi riattivati")
+
+        if not regime.is_open(d.is_long):
+            if d.is_long:
+                log("[SCAN] BTC filter attivo — scan sospesa")
+                tlog("btc_bear", "⚠️ BTC filter: scan sospesa", 3600)
+            else:
+                tlog("btc_regime_off",
+                     "⏸️ SHORT BOT IDLE — BTC non in bear regime (sopra EMA50 o slope positiva)",
+                     3600)
+            return
+
+        if n_open >= MAX_OPEN_POSITIONS:
+            tlog(f"max_open:{d.name}",
+                 f"[SCAN] MAX {MAX_OPEN_POSITIONS} posizioni aperte, attendo", 600)
+            return
+
+        equity_scan = get_total_equity()
+        if equity_scan > 0:
+            open_risk_pct = portfolio_open_risk_usdt() / equity_scan
+            if open_risk_pct >= MAX_TOTAL_OPEN_RISK_PCT:
+                tlog(f"risk_cap_open:{d.name}",
+                     f"[RISK-CAP] open risk={open_risk_pct*100:.1f}% >= "
+                     f"{MAX_TOTAL_OPEN_RISK_PCT*100:.1f}% — stop nuovi ingressi",
+                     300)
+                return
+
+        # 1) Universo: top movers nel verso della direzione, per volume
+        universe = self.scan_universe()
+        log(f"[SCAN] {len(universe)} coin nel universo (vol>{MIN_VOL_24H_USDT/1e6:.0f}M USDT)")
+
+        # Diagnostica: mostra top 10 gainers / losers
+        if universe:
+            top10 = universe[:10]
+            top10_str = " | ".join([f"{c['symbol']}:{c['chg24h']:+.1f}%" for c in top10])
+            log(f"[SCAN] Top 10 {'gainers' if d.is_long else 'losers'}: {top10_str}")
+            if not d.is_long:
+                log(f"[SCAN] *** #1 LOSER TARGET: {universe[0]['symbol']} "
+                    f"({universe[0]['chg24h']:+.2f}%) ***")
+
+        if not universe:
+            return
+        self._stream_universe = [c["symbol"] for c in universe[:TRADE_TOP_N]]
+        self.update_stream_subscriptions()
+
+        # 2) Per ogni candidato: ranking 24h → segnale di anticipazione 1h
+        entered = 0
+        checked = 0
+        reject_stats_scan = {}
+        candidates = []
+        for rank_idx, coin in enumerate(universe, start=1):
+            if rank_idx > TRADE_TOP_N:
+                break
+            sym = coin["symbol"]
+            chg24h = float(coin["chg24h"])
+            if sym in self.open_positions:
+                continue
+
+            checked += 1
+
+            move = chg24h if d.is_long else abs(chg24h)
+            if move < MIN_ABS_24H_CHANGE:
+                reject_stats_scan["chg24h_too_low"] = reject_stats_scan.get("chg24h_too_low", 0) + 1
+                continue
+            candidates.append((rank_idx, sym, chg24h))
+
+        # Segnali valutati in parallelo; ingressi serializzati in ordine di ranking
+        # così MAX_OPEN_POSITIONS e il risk cap di portafoglio restano esatti.
+        signals = self.evaluate_candidates(candidates, reject_stats_scan)
+        plans = []
+        pending_risk = 0.0
+        for rank_idx, sym, chg24h in candidates:
+            if len(self.open_positions) + len(plans) >= MAX_OPEN_POSITIONS:
+                break
+            signal = signals.get(rank_idx)
+            if not signal:
+                continue
+            plan = self._prepare_entry(rank_idx, sym, chg24h, signal,
+                                       reject_stats_scan, pending_risk)
+            if plan:
+                plans.append(plan)
+                pending_risk += plan["risk_usdt"]
+        if len(plans) > 1:
+            entered = self._enter_batch(plans)
+        elif plans:
+            entered = int(self._enter(plans[0]))
+
+        log(f"[SCAN] {checked} coin verificate | {entered} ingressi | "
+            f"posizioni: {len(self.open_positions)}")
+        if reject_stats_scan:
+            top_rejects = sorted(reject_stats_scan.items(), key=lambda x: x[1], reverse=True)[:5]
+            reject_msg = ", ".join(f"{k}:{v}" for k, v in top_rejects)
+            log(f"[REJECT] {d.name} top motivi: {reject_msg}")
+
+    def main_loop(self) -> None:
+        while True:
+            if not self.tick():
+                wait_position_event(10)
+
+    # ── AVVIO ─────────────────────────────────────────────────────────────────
+    def log_banner(self) -> None:
+        d = self.d
+        first_trigger, first_floor = RATCHET_TABLE[0]
+        log("=" * 62)
+        if d.is_long:
+            log("  TREND FOLLOWING — 1h ANTICIPATION BREAKOUT BOT")
+        else:
+            log("  TREND FOLLOWING SHORT — 1h ANTICIPATION BREAKDOWN BOT")
+        log("=" * 62)
+        log(f"  Timeframe : Daily {'trend' if d.is_long else 'downtrend'} + 1h segnale | "
+            f"Scan ogni {SCAN_INTERVAL_SEC//60}min")
+        log(f"  Filtri    : {'breakout' if d.is_long else 'breakdown'} base {BASE_LOOKBACK_BARS}h "
+            f"(adaptive p{ADAPTIVE_BASE_WIDTH_PCTL:.2f}) | "
+            f"RSI {RSI_MIN_4H:.0f}-{RSI_MAX_4H:.0f} | RVOL adaptive p{ADAPTIVE_RVOL_PCTL:.2f}")
+        log(f"  Risk      : {RISK_PCT*100:.1f}%/trade | MAX={MAX_OPEN_POSITIONS} pos | "
+            f"Leva {DEFAULT_LEVERAGE}× | Ratchet floor fissi")
+        log(f"  Exits     : Ratchet(≥{first_trigger}%→+{first_floor}% ... ≥150%→+120%) + "
+            f"Partial TP {PARTIAL_TP_PCT*100:.0f}%@{PARTIAL_TP_R:.1f}R")
+        if d.is_long:
+            log("  Regime    : BTC daily EMA50 (slope+) + BTC weekly EMA200")
+        else:
+            log(f"  Regime    : BTC score >= {BTC_SHORT_REGIME_SCORE_MIN:.2f} (EMA-gap + slope)")
+        log("=" * 62)
+
+    def notify_startup(self, equity0: float) -> None:
+        first_trigger, first_floor = RATCHET_TABLE[0]
+        if self.d.is_long:
+            head = ("📈 ANTICIPATION BOT AVVIATO — Trend Following 1h\n"
+                    "Segnale: breakout da base compressa + daily uptrend\n"
+                    "Regime: BTC daily EMA50 (slope+) + BTC weekly EMA200\n"
+                    f"Exit: Ratchet floor fissi ≥{first_trigger}%→+{first_floor}% ... ≥150%→+120% | ")
+        else:
+            head = ("📉 SHORT ANTICIPATION BOT AVVIATO\n"
+                    "Segnale: breakdown da base compressa + daily downtrend\n"
+                    "Regime: BTC daily < EMA50 (slope−) → SHORT attivi\n"
+                    f"Exit: Ratchet ≥{first_trigger}%→+{first_floor}% ... ≥150%→+120% | ")
+        self.notify(
+            f"{head}"
+            f"Partial 50%@{PARTIAL_TP_R:.1f}R\n"
+            f"Scan ogni {SCAN_INTERVAL_SEC//60}min | Leva {DEFAULT_LEVERAGE}× | "
+            f"Risk {RISK_PCT*100:.1f}%\n"
+            f"Equity: {equity0:.2f} USDT"
+        )
+
+    def start(self) -> None:
+        """Self-check, banner, sync posizioni e thread di gestione (senza main loop)."""
+        run_startup_self_checks(self.d)
+        self.log_banner()
+        CLOCK.start()
+        start_instruments()
+
+        equity0 = get_total_equity()
+        log(f"[AVVIO] Equity: {equity0:.2f} USDT")
+        self.notify_startup(equity0)
+
+        self.sync_positions_from_wallet()
+        regime.update(self.d.is_long)
+
+        if start_market_stream():
+            self.update_stream_subscriptions()
+        start_private_stream()
+
+        threading.Thread(target=self.trailing_worker, daemon=True).start()
+        threading.Thread(target=self.sl_watchdog,     daemon=True).start()
+
+    def run(self) -> None:
+        self.start()
+        self.main_loop()
+
+
+def run(d: Direction) -> None:
+    """Entry point del bot per una direzione (LONG / SHORT)."""
+    Bot(d).run()
+
+
+def run_all(directions: list) -> None:
+    """
+    Più direzioni in un solo processo (runner dual LONG + SHORT).
+    Condivisi: sessione HTTP, snapshot tickers/posizioni/wallet, kline e ATR,
+    feed WS e budget di pacing della scan. Per direzione: posizioni, circuit
+    breaker e cooldown; il cap MAX_TOTAL_OPEN_RISK_PCT è sul totale.
+    I main loop girano in sequenza nello stesso thread: a ogni scan la seconda
+    direzione trova già in cache tickers e kline scaricati dalla prima.
+    """
+    bots = [Bot(d) for d in directions]
+    for bot in bots:
+        bot.start()
+    while True:
+        scanned = [bot.tick() for bot in bots]
+        if not any(scanned):
+            wait_position_event(10)
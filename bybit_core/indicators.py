@@ -0,0 +1,237 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# INDICATORS — EMA / RSI / ATR incrementali, una barra alla volta
+#
+# Stesse ricorrenze di pandas/ta usate finora nei segnali:
+#   EMA:  Series.ewm(span=N, adjust=False).mean()
+#   RSI:  ta.momentum.RSIIndicator (ewm alpha=1/N, min_periods=N, adjust=False
+#         su guadagni/perdite; 100 se la media perdite è 0)
+#   ATR:  ta.volatility.AverageTrueRange (media dei primi N true range, poi
+#         Wilder: (atr·(N−1) + tr) / N; 0 durante il warm-up)
+# Gli stessi passaggi in virgola mobile (compreso alpha ricavato dal center of
+# mass come fa pandas): partendo dalla stessa barra i valori coincidono bit per
+# bit con ta ricalcolato sulla serie.
+#
+# IndicatorTrack tiene lo stato per una chiave (symbol, interval, limit) del
+# KlineStore seminato sulla PRIMA barra della finestra, come faceva il
+# ricalcolo con ta su ogni finestra: i valori restano identici a quelli di
+# allora. Finché le barre chiuse già applicate restano identiche (scan nella stessa
+# ora, finestra che si allunga) applica solo quelle nuove e calcola
+# la barra in formazione senza consolidarla; quando la finestra scorre riparte
+# da capo, una volta per barra.
+#
+# Parità con ta sulla finestra: tests/test_indicators.py
+# Benchmark: python -m bybit_core.indicators
+# ─────────────────────────────────────────────────────────────────────────────
+
+from typing import Optional
+
+import numpy as np
+
+_NAN = float("nan")
+
+
+def _ewm_alpha(span: Optional[float] = None, alpha: Optional[float] = None) -> float:
+    """alpha effettivo di pandas: passa sempre dal center of mass."""
+    com = (span - 1) / 2 if span is not None else (1 - alpha) / alpha
+    return 1.0 / (1.0 + float(com))
+
+
+class _Ewm:
+    """ewm(adjust=False).mean() di pandas su una serie senza NaN."""
+
+    __slots__ = ("_old_factor", "_new_wt", "value", "nobs")
+
+    def __init__(self, alpha: float):
+        self._old_factor = 1.0 - alpha
+        self._new_wt = alpha
+        self.value = _NAN
+        self.nobs = 0
+
+    def step(self, x: float) -> float:
+        return self._next(self.value, x)
+
+    def _next(self, w: float, x: float) -> float:
+        if self.nobs == 0:
+            return x
+        if w != x:
+            old = self._old_factor
+            w = old * w + self._new_wt * x
+            w /= old + self._new_wt
+        return w
+
+    def push(self, x: float) -> float:
+        self.value = self._next(self.value, x)
+        self.nobs += 1
+        return self.value
+
+
+class IndicatorState:
+    """EMA(close), RSI e ATR dopo l'ultima barra applicata."""
+
+    __slots__ = ("ema_span", "rsi_window", "atr_window", "_ema", "_up", "_down",
+                 "_atr", "_tr_seed", "prev_close", "bars")
+
+    def __init__(self, ema_span: int = 20, rsi_window: int = 14, atr_window: int = 14):
+        self.ema_span = ema_span
+        self.rsi_window = rsi_window
+        self.atr_window = atr_window
+        self._ema = _Ewm(_ewm_alpha(span=ema_span))
+        rsi_alpha = _ewm_alpha(alpha=1 / rsi_window)
+        self._up = _Ewm(rsi_alpha)
+        self._down = _Ewm(rsi_alpha)
+        self._atr = 0.0
+        self._tr_seed: list = []     # true range del warm-up ATR
+        self.prev_close = _NAN
+        self.bars = 0
+
+    # ── calcolo ───────────────────────────────────────────────────────────────
+    def _terms(self, high: float, low: float, close: float) -> tuple:
+        """(guadagno, perdita, true range) della barra rispetto alla chiusura precedente."""
+        if self.bars == 0:
+            return 0.0, 0.0, high - low
+        diff = close - self.prev_close
+        up = diff if diff > 0 else 0.0
+        down = -diff if diff < 0 else 0.0
+        tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        return up, down, tr
+
+    def _rsi(self, up: float, down: float, nobs: int) -> float:
+        if nobs < self.rsi_window:
+            return _NAN
+        if down == 0:
+            return 100.0
+        return 100 - (100 / (1 + up / down))
+
+    def _next_atr(self, tr: float) -> float:
+        n = self.atr_window
+        if self.bars < n - 1:
+            return 0.0
+        if self.bars == n - 1:
+            return float(np.array(self._tr_seed + [tr]).sum() / n)
+        return (self._atr * (n - 1) + tr) / float(n)
+
+    def peek(self, high: float, low: float, close: float) -> tuple:
+        """(ema, rsi, atr) che avrebbe la barra, senza applicarla (barra in formazione)."""
+        up, down, tr = self._terms(high, low, close)
+        nobs = self.bars + 1
+        return (self._ema.step(close),
+                self._rsi(self._up.step(up), self._down.step(down), nobs),
+                self._next_atr(tr))
+
+    def push(self, high: float, low: float, close: float) -> tuple:
+        """Applica una barra chiusa e ritorna (ema, rsi, atr)."""
+        up, down, tr = self._terms(high, low, close)
+        atr = self._next_atr(tr)
+        if self.bars < self.atr_window - 1:
+            self._tr_seed.append(tr)
+        elif self.bars == self.atr_window - 1:
+            self._tr_seed = []
+        self._atr = atr
+        ema = self._ema.push(close)
+        rsi = self._rsi(self._up.push(up), self._down.push(down), self.bars + 1)
+        self.prev_close = close
+        self.bars += 1
+        return ema, rsi, atr
+
+
+# Colonne dei valori KlineStore: Open, High, Low, Close, Volume, Turnover
+_H, _L, _C = 1, 2, 3
+
+
+class IndicatorTrack:
+    """
+    Indicatori della finestra di una chiave (symbol, interval, limit) del
+    KlineStore, con lo stato seminato sulla prima barra della finestra.
+    """
+
+    __slots__ = ("_params", "state", "_ts", "_hlc", "_closed", "reseeds")
+
+    def __init__(self, ema_span: int = 20, rsi_window: int = 14, atr_window: int = 14):
+        self._params = (ema_span, rsi_window, atr_window)
+        self.state: Optional[IndicatorState] = None
+        self._ts = np.empty(0, dtype=np.int64)   # barre chiuse applicate: ts
+        self._hlc = np.empty((0, 3))             # ... e high/low/close
+        self._closed = np.empty((0, 3))          # (ema, rsi, atr) per barra chiusa applicata
+        self.reseeds = 0
+
+    def _reseed(self) -> None:
+        self.state = IndicatorState(*self._params)
+        self._ts = np.empty(0, dtype=np.int64)
+        self._hlc = np.empty((0, 3))
+        self._closed = np.empty((0, 3))
+        self.reseeds += 1
+
+    def sync(self, ts: np.ndarray, vals: np.ndarray) -> np.ndarray:
+        """
+        Indicatori (n × 3: ema, rsi, atr) allineati a `ts`/`vals` (crescenti,
+        ultima barra in formazione), identici a ta ricalcolato sulla finestra.
+        Se le barre chiuse già applicate aprono ancora la finestra, identiche,
+        applica solo quelle nuove; altrimenti riparte dalla prima barra.
+        """
+        n = len(ts)
+        closed = n - 1
+        if n == 0:
+            return np.empty((0, 3))
+        applied = len(self._ts)
+        if not (self.state is not None and 0 < applied <= closed
+                and np.array_equal(ts[:applied], self._ts)
+                and np.array_equal(vals[:applied, _H:_C + 1], self._hlc)):
+            self._reseed()
+            applied = 0
+
+        if applied < closed:
+            push = self.state.push
+            rows = [push(float(vals[i, _H]), float(vals[i, _L]), float(vals[i, _C]))
+                    for i in range(applied, closed)]
+            self._closed = np.concatenate([self._closed, np.array(rows, dtype=float)])
+            self._ts = ts[:closed].copy()
+            self._hlc = vals[:closed, _H:_C + 1].copy()
+
+        out = np.empty((n, 3))
+        out[:closed] = self._closed
+        out[-1] = self.state.peek(float(vals[-1, _H]), float(vals[-1, _L]),
+                                  float(vals[-1, _C]))
+        return out
+
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
+def _bench(n: int = 500, window: int = 80) -> None:
+    import timeit
+
+    import pandas as pd
+    from ta.momentum import RSIIndicator
+    from ta.volatility import AverageTrueRange
+
+    rnd = np.random.default_rng(3)
+    c = np.cumprod(1 + rnd.normal(0, 0.01, window + n)) * 100
+    bars = np.column_stack([c, c * 1.005, c * 0.995, c, c, c])
+    ts = np.arange(window + n, dtype=np.int64) * 3_600_000
+    track = IndicatorTrack()
+    pos = [window]
+
+    def new_bar():
+        pos[0] += 1
+        e = pos[0]
+        track.sync(ts[e - window:e], bars[e - window:e])
+
+    def forming_bar():
+        e = pos[0]
+        track.sync(ts[e - window:e], bars[e - window:e])
+
+    def ta_window():
+        w = bars[:window]
+        h, l, cl = pd.Series(w[:, _H]), pd.Series(w[:, _L]), pd.Series(w[:, _C])
+        cl.ewm(span=20, adjust=False).mean()
+        RSIIndicator(close=cl, window=14).rsi()
+        AverageTrueRange(high=h, low=l, close=cl, window=14).average_true_range()
+
+    ful = min(timeit.repeat(ta_window, number=50, repeat=5)) / 50 * 1e6
+    nb = timeit.timeit(new_bar, number=n - 1) / (n - 1) * 1e6
+    fb = min(timeit.repeat(forming_bar, number=2000, repeat=5)) / 2000 * 1e6
+    print(f"ta su {window} barre                 {ful:8.1f} µs")
+    print(f"track, nuova barra (ricalcolo)   {nb:8.1f} µs")
+    print(f"track, solo barra in formazione  {fb:8.1f} µs")
+
+
+if __name__ == "__main__":
+    _bench()
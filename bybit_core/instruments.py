@@ -0,0 +1,191 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# INSTRUMENTS — indice in memoria di /v5/market/instruments-info (linear)
+#
+# All'avvio l'intera lista linear si scarica con poche chiamate paginate
+# (limit=1000 + nextPageCursor) invece di una richiesta per simbolo. L'indice
+# viene salvato su disco: al riavvio si parte dal file (nessuna latenza) e un
+# thread lo riscarica in background. Un simbolo mancante o segnalato da Bybit
+# come cambiato (retCode 170137) si aggiorna con una chiamata mirata.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+PAGE_LIMIT          = 1000
+DEFAULT_REFRESH_SEC = 3600.0
+DISK_MAX_AGE_SEC    = 86400.0   # oltre, il file su disco non si usa nemmeno come partenza
+
+
+def parse_instrument(info: dict) -> dict:
+    """Voce instruments-info → dict usato da sizing e formattazione prezzi."""
+    lot = info.get("lotSizeFilter", {})
+    pf  = info.get("priceFilter", {})
+    return {
+        "min_qty":       float(lot.get("minOrderQty",      0.01) or 0.01),
+        "qty_step":      float(lot.get("qtyStep",         "0.01") or "0.01"),
+        "precision":     int(info.get("priceScale",           4)  or 4),
+        "price_step":    float(pf.get("tickSize",         "0.01") or "0.01"),
+        "min_order_amt": float(lot.get("minNotionalValue",   "5") or "5"),
+    }
+
+
+class InstrumentStore:
+    """Indice symbol → instrument info, persistito su disco. Thread-safe."""
+
+    def __init__(self, session, base_url: str, path: Optional[str] = None,
+                 refresh_sec: float = DEFAULT_REFRESH_SEC, timeout: float = 10.0,
+                 log: Callable[[str], None] = print):
+        self._session = session
+        self._base_url = base_url
+        self._path = path
+        self._refresh_sec = refresh_sec
+        self._timeout = timeout
+        self._log = log
+        self._lock = threading.Lock()
+        self._index: dict = {}
+        self._loaded_at = 0.0
+        self.version = 0        # cambia a ogni sostituzione dell'indice
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"pages": 0, "preloads": 0, "targeted": 0, "disk_loads": 0}
+
+    # ── Lettura ───────────────────────────────────────────────────────────────
+    def get(self, symbol: str) -> Optional[dict]:
+        return self._index.get(symbol)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def symbols(self) -> tuple:
+        """(versione, simboli) dell'indice corrente."""
+        with self._lock:
+            return self.version, tuple(self._index)
+
+    # ── Download ──────────────────────────────────────────────────────────────
+    def _request(self, params: dict) -> Optional[dict]:
+        resp = self._session.get(f"{self._base_url}/v5/market/instruments-info",
+                                 params={"category": "linear", **params},
+                                 timeout=self._timeout)
+        data = resp.json()
+        if data.get("retCode") != 0:
+            return None
+        return data.get("result") or {}
+
+    def preload(self) -> bool:
+        """Scarica tutta la lista linear (paginata) e sostituisce l'indice."""
+        index: dict = {}
+        cursor = ""
+        try:
+            while True:
+                params = {"limit": PAGE_LIMIT}
+                if cursor:
+                    params["cursor"] = cursor
+                result = self._request(params)
+                if result is None:
+                    return False
+                self.stats["pages"] += 1
+                for info in result.get("list") or []:
+                    index[info["symbol"]] = parse_instrument(info)
+                cursor = result.get("nextPageCursor") or ""
+                if not cursor:
+                    break
+        except Exception as e:
+            self._log(f"[INSTR] preload fallito: {e}")
+            return False
+        if not index:
+            return False
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.time()
+            self.version += 1
+            self.stats["preloads"] += 1
+        self._save()
+        return True
+
+    def refresh(self, symbol: str) -> Optional[dict]:
+        """Aggiornamento mirato di un simbolo (nuovo listing o qty step cambiato)."""
+        try:
+            result = self._request({"symbol": symbol})
+        except Exception:
+            return None
+        rows = (result or {}).get("list") or []
+        if not rows:
+            return None
+        parsed = parse_instrument(rows[0])
+        with self._lock:
+            # copy-on-write: i lettori senza lock vedono sempre un dict coerente
+            index = dict(self._index)
+            index[symbol] = parsed
+            self._index = index
+            self.version += 1
+            self.stats["targeted"] += 1
+        self._save()
+        return parsed
+
+    # ── Disco ─────────────────────────────────────────────────────────────────
+    def load_disk(self) -> bool:
+        """Carica l'indice salvato se abbastanza recente; False se assente/vecchio."""
+        if not self._path:
+            return False
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                saved = json.load(f)
+            saved_at = float(saved["saved_at"])
+            index = saved["instruments"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        if not index or time.time() - saved_at > DISK_MAX_AGE_SEC:
+            return False
+        with self._lock:
+            self._index = index
+            self._loaded_at = saved_at
+            self.version += 1
+            self.stats["disk_loads"] += 1
+        return True
+
+    def _save(self) -> None:
+        if not self._path:
+            return
+        with self._lock:
+            payload = {"saved_at": self._loaded_at or time.time(), "instruments": self._index}
+            tmp = f"{self._path}.tmp"
+            try:
+                d = os.path.dirname(self._path)
+                if d:
+                    os.makedirs(d, exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, separators=(",", ":"))
+                os.replace(tmp, self._path)
+            except OSError as e:
+                self._log(f"[INSTR] salvataggio {self._path} fallito: {e}")
+
+    # ── Avvio ─────────────────────────────────────────────────────────────────
+    def start(self) -> bool:
+        """
+        Idempotente. Con un file recente su disco l'indice è pronto subito e il
+        download completo avviene in background; altrimenti è sincrono.
+        False se non c'è nessun indice disponibile.
+        """
+        if self._thread is not None:
+            return bool(self._index)
+        warm = self.load_disk()
+        if warm:
+            self._log(f"[INSTR] {len(self._index)} strumenti da {self._path} (refresh in background)")
+        elif self.preload():
+            self._log(f"[INSTR] {len(self._index)} strumenti scaricati "
+                      f"in {self.stats['pages']} pagine")
+        else:
+            self._log("[INSTR] ⚠️ preload fallito: fallback per simbolo")
+        self._thread = threading.Thread(target=self._run, args=(warm,), daemon=True,
+                                        name="instruments")
+        self._thread.start()
+        return bool(self._index)
+
+    def _run(self, refresh_now: bool) -> None:
+        if refresh_now:
+            self.preload()
+        while True:
+            time.sleep(self._refresh_sec)
+            self.preload()
@@ -0,0 +1,109 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# JOURNAL — stato posizioni persistito (JSONL append-only) tra i riavvii
+#
+# Ogni transizione di position_data (entry, spostamento SL, partial TP, water
+# mark, chiusura) aggiunge una riga {"ts", "sym", "state"} con lo stato
+# completo del simbolo (state null = posizione chiusa). Scrittura + fsync per
+# riga: un crash perde al massimo la riga in corso, che al replay viene
+# scartata. Il replay tiene l'ultimo stato per simbolo; compact() riscrive il
+# file con i soli stati vivi (tmp + os.replace) per non farlo crescere.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+
+class PositionJournal:
+    """Journal di una direzione: symbol → ultimo stato registrato."""
+
+    def __init__(self, path: Optional[str], log: Callable[[str], None] = print):
+        self._path = path or None
+        self._log = log
+        self._lock = threading.Lock()
+        self._state: dict = {}
+        self._fh = None
+
+    def replay(self) -> dict:
+        """Rilegge il file; ritorna {symbol: stato} delle posizioni non chiuse."""
+        state: dict = {}
+        skipped = 0
+        if self._path:
+            try:
+                with open(self._path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            rec = json.loads(line)
+                            sym = rec["sym"]
+                        except (ValueError, KeyError, TypeError):
+                            skipped += 1   # riga troncata da un crash
+                            continue
+                        if rec.get("state") is None:
+                            state.pop(sym, None)
+                        else:
+                            state[sym] = rec["state"]
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self._log(f"[JOURNAL] lettura {self._path} fallita: {e}")
+        if skipped:
+            self._log(f"[JOURNAL] {skipped} righe non valide ignorate in {self._path}")
+        with self._lock:
+            self._state = {sym: dict(st) for sym, st in state.items()}
+        return state
+
+    def record(self, symbol: str, state: Optional[dict]) -> None:
+        """Registra lo stato corrente del simbolo (None = posizione chiusa)."""
+        snap = dict(state) if state is not None else None
+        line = json.dumps({"ts": round(time.time(), 3), "sym": symbol, "state": snap},
+                          separators=(",", ":")) + "\n"
+        with self._lock:
+            if snap is None:
+                if self._state.pop(symbol, None) is None:
+                    return
+            else:
+                self._state[symbol] = snap
+            if not self._path:
+                return
+            try:
+                if self._fh is None:
+                    d = os.path.dirname(self._path)
+                    if d:
+                        os.makedirs(d, exist_ok=True)
+                    self._fh = open(self._path, "a+", encoding="utf-8")
+                    if self._fh.tell() > 0:
+                        # riga troncata da un crash: chiudila prima di accodare
+                        self._fh.seek(self._fh.tell() - 1)
+                        if self._fh.read(1) != "\n":
+                            self._fh.write("\n")
+                self._fh.write(line)
+                self._fh.flush()
+                os.fsync(self._fh.fileno())
+            except OSError as e:
+                self._log(f"[JOURNAL] scrittura {self._path} fallita: {e}")
+
+    def compact(self) -> None:
+        """Riscrive il file con una riga per posizione viva."""
+        if not self._path:
+            return
+        with self._lock:
+            tmp = f"{self._path}.tmp"
+            now = round(time.time(), 3)
+            try:
+                d = os.path.dirname(self._path)
+                if d:
+                    os.makedirs(d, exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    for sym, st in self._state.items():
+                        f.write(json.dumps({"ts": now, "sym": sym, "state": st},
+                                           separators=(",", ":")) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                if self._fh is not None:
+                    self._fh.close()
+                    self._fh = None
+                os.replace(tmp, self._path)
+            except OSError as e:
+                self._log(f"[JOURNAL] compattazione {self._path} fallita: {e}")
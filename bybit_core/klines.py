@@ -0,0 +1,214 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# KLINE STORE — cache incrementale in-process per (symbol, interval)
+#
+# Ogni scan chiede le stesse 80 candele 1h: tra uno scan e l'altro cambiano
+# solo 1-2 barre. Lo store tiene una finestra mobile già parsata in float e,
+# alle chiamate successive, scarica solo le barre dall'ultima candela in cache
+# (quella ancora in formazione) in avanti, fondendole con lo storico.
+# Per le finestre richieste con get_indicators lo store tiene anche EMA/RSI/ATR
+# (bybit_core.indicators), identici a ta sulla finestra: si ricalcolano solo
+# quando la finestra scorre, tra una barra e l'altra cambia la sola barra in
+# formazione.
+#
+# Fusione incrementale e ripiego sul caricamento completo: tests/test_klines.py
+# ─────────────────────────────────────────────────────────────────────────────
+
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from bybit_core.indicators import IndicatorTrack
+
+KLINE_COLUMNS = ["timestamp", "Open", "High", "Low", "Close", "Volume", "Turnover"]
+
+# Durata barra in ms per gli intervalli Bybit a durata fissa ("M" escluso:
+# per il mensile si ricarica sempre tutta la finestra).
+INTERVAL_MS = {
+    "1": 60_000, "3": 180_000, "5": 300_000, "15": 900_000, "30": 1_800_000,
+    "60": 3_600_000, "120": 7_200_000, "240": 14_400_000, "360": 21_600_000,
+    "720": 43_200_000, "D": 86_400_000, "W": 604_800_000,
+}
+
+MAX_KLINE_LIMIT = 1000   # limite massimo per singola richiesta /v5/market/kline
+INCREMENTAL_MAX_BARS = 200  # oltre questo gap conviene ricaricare tutto
+
+
+def _parse_rows(rows: list) -> tuple[np.ndarray, np.ndarray]:
+    """Lista Bybit (più recente prima) → (timestamp int64, OHLCV+turnover float64) crescenti."""
+    rows = rows[::-1]
+    ts = np.fromiter((int(r[0]) for r in rows), dtype=np.int64, count=len(rows))
+    vals = np.array([r[1:7] for r in rows], dtype=float).reshape(len(rows), 6)
+    return ts, vals
+
+
+class KlineStore:
+    """
+    Finestra mobile di candele per (symbol, interval).
+    Thread-safe: più thread (scan, trailing) possono leggere in parallelo.
+    """
+
+    def __init__(self, session, base_url: str, timeout: float = 10.0,
+                 live_max_age: float = 30.0, indicator_params: tuple = (20, 14, 14)):
+        self._session = session
+        self._base_url = base_url
+        self._timeout = timeout
+        # Se una chiave riceve barre dal WebSocket entro live_max_age secondi,
+        # viene servita dalla memoria senza alcuna chiamata REST.
+        self._live_max_age = live_max_age
+        self._lock = threading.RLock()
+        self._data: dict = {}   # (symbol, interval) -> {"ts", "vals", "window", "pushed_at"}
+        # (ema_span, rsi_window, atr_window) e stato indicatori per (symbol, interval, limit)
+        self._indicator_params = indicator_params
+        self._tracks: dict = {}
+        self._tracks_lock = threading.Lock()
+        self.stats = {"full": 0, "incremental": 0, "live": 0, "bars_downloaded": 0}
+
+    def _request(self, symbol: str, interval: str, limit: int,
+                 start: Optional[int] = None) -> Optional[list]:
+        params = {"category": "linear", "symbol": symbol,
+                  "interval": interval, "limit": limit}
+        if start is not None:
+            params["start"] = start
+        resp = self._session.get(f"{self._base_url}/v5/market/kline",
+                                 params=params, timeout=self._timeout)
+        data = resp.json()
+        if data.get("retCode") != 0:
+            return None
+        return data.get("result", {}).get("list") or []
+
+    def _full_load(self, symbol: str, interval: str, window: int) -> Optional[dict]:
+        rows = self._request(symbol, interval, min(window, MAX_KLINE_LIMIT))
+        if not rows:
+            return None
+        ts, vals = _parse_rows(rows)
+        self.stats["full"] += 1
+        self.stats["bars_downloaded"] += len(ts)
+        return {"ts": ts, "vals": vals, "window": window}
+
+    def _incremental(self, symbol: str, interval: str, entry: dict) -> Optional[dict]:
+        """Scarica le barre dall'ultima in cache (ancora aperta) e le fonde."""
+        step = INTERVAL_MS.get(interval)
+        if step is None or len(entry["ts"]) == 0:
+            return None
+        last_ts = int(entry["ts"][-1])
+        now_ms = int(time.time() * 1000)
+        n_new = (now_ms - last_ts) // step + 2
+        if n_new > INCREMENTAL_MAX_BARS:
+            return None
+        rows = self._request(symbol, interval, INCREMENTAL_MAX_BARS, start=last_ts)
+        if not rows:
+            return None
+        new_ts, new_vals = _parse_rows(rows)
+        # Il primo bar ricevuto deve sovrapporsi all'ultimo in cache: altrimenti
+        # c'è un buco e la finestra non è più contigua.
+        if int(new_ts[0]) != last_ts or len(new_ts) >= INCREMENTAL_MAX_BARS:
+            return None
+        keep = entry["ts"] < new_ts[0]
+        ts = np.concatenate([entry["ts"][keep], new_ts])[-entry["window"]:]
+        vals = np.concatenate([entry["vals"][keep], new_vals])[-entry["window"]:]
+        self.stats["incremental"] += 1
+        self.stats["bars_downloaded"] += len(new_ts)
+        return {"ts": ts, "vals": vals, "window": entry["window"]}
+
+    def _is_live(self, interval: str, entry: dict) -> bool:
+        """True se lo stream ha aggiornato la chiave di recente e la barra corrente è presente."""
+        pushed_at = entry.get("pushed_at", 0.0)
+        step = INTERVAL_MS.get(interval)
+        if step is None or time.time() - pushed_at > self._live_max_age:
+            return False
+        cur_bar_ts = int(time.time() * 1000) // step * step
+        return int(entry["ts"][-1]) >= cur_bar_ts
+
+    def apply_bar(self, symbol: str, interval, ts: int, vals) -> bool:
+        """
+        Aggiorna la finestra con una barra ricevuta dallo stream (kline.<interval>.<symbol>).
+        Accetta solo l'aggiornamento dell'ultima barra o la barra immediatamente
+        successiva: un buco verrà colmato dalla prossima richiesta REST.
+        """
+        interval = str(interval)
+        key = (symbol, interval)
+        step = INTERVAL_MS.get(interval)
+        row = np.asarray(vals, dtype=float).reshape(1, 6)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or step is None or len(entry["ts"]) == 0:
+                return False
+            last_ts = int(entry["ts"][-1])
+            if ts == last_ts:
+                ts_arr = entry["ts"]
+                vals_arr = np.concatenate([entry["vals"][:-1], row])
+            elif ts == last_ts + step:
+                ts_arr = np.append(entry["ts"], np.int64(ts))[-entry["window"]:]
+                vals_arr = np.concatenate([entry["vals"], row])[-entry["window"]:]
+            else:
+                return False
+            self._data[key] = {"ts": ts_arr, "vals": vals_arr,
+                               "window": entry["window"], "pushed_at": time.time()}
+        return True
+
+    def get_arrays(self, symbol: str, interval, limit: int) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """Ritorna (timestamp, valori) delle ultime `limit` barre, in ordine crescente."""
+        interval = str(interval)
+        key = (symbol, interval)
+        with self._lock:
+            entry = self._data.get(key)
+        updated = None
+        if entry is not None and entry["window"] >= limit:
+            if self._is_live(interval, entry):
+                self.stats["live"] += 1
+                return entry["ts"][-limit:], entry["vals"][-limit:]
+            updated = self._incremental(symbol, interval, entry)
+        if updated is None:
+            window = max(limit, entry["window"] if entry else 0)
+            updated = self._full_load(symbol, interval, window)
+            if updated is None:
+                return None
+        with self._lock:
+            self._data[key] = updated
+        return updated["ts"][-limit:], updated["vals"][-limit:]
+
+    def get(self, symbol: str, interval, limit: int) -> Optional[pd.DataFrame]:
+        """Stessa forma del vecchio fetch_klines: DataFrame con colonne KLINE_COLUMNS."""
+        arrays = self.get_arrays(symbol, interval, limit)
+        if arrays is None:
+            return None
+        ts, vals = arrays
+        df = pd.DataFrame(vals, columns=KLINE_COLUMNS[1:])
+        df.insert(0, "timestamp", ts)
+        return df
+
+    def get_indicators(self, symbol: str, interval, limit: int) -> Optional[tuple]:
+        """
+        (timestamp, valori OHLCV+turnover, indicatori n × 3: ema, rsi, atr)
+        sulle ultime `limit` barre, tutti array NumPy senza DataFrame; l'ultima
+        riga è la barra in formazione.
+        """
+        interval = str(interval)
+        arrays = self.get_arrays(symbol, interval, limit)
+        if arrays is None:
+            return None
+        ts, vals = arrays
+        key = (symbol, interval, limit)
+        with self._tracks_lock:
+            track = self._tracks.get(key)
+            if track is None:
+                track = self._tracks[key] = IndicatorTrack(*self._indicator_params)
+            ind = track.sync(ts, vals)
+        return ts, vals, ind
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        with self._lock:
+            if symbol is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if k[0] == symbol]:
+                    self._data.pop(key, None)
+        with self._tracks_lock:
+            if symbol is None:
+                self._tracks.clear()
+            else:
+                for key in [k for k in self._tracks if k[0] == symbol]:
+                    self._tracks.pop(key, None)
@@ -0,0 +1,260 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# MARKET — dati di mercato condivisi: instrument info, prezzi, kline, ATR 4h
+#
+# Cache a livello di modulo: con più direzioni nello stesso processo un
+# simbolo viene scaricato una sola volta. Il feed WebSocket (opzionale) si
+# avvia con start_market_stream(); senza, tutto resta su REST.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+from bybit_core.client import SESSION, log, signed_ts_ms, tlog
+from bybit_core.config import (
+    ATR_WINDOW, BYBIT_BASE_URL, BYBIT_WS_PUBLIC_URL, INSTRUMENTS_CACHE_PATH,
+    INSTRUMENTS_REFRESH_SEC, MARKET_STREAM, TICKERS_PRICE_SEC, TICKERS_TTL_SEC,
+)
+from bybit_core.instruments import InstrumentStore
+from bybit_core.klines import KlineStore
+from bybit_core.quantize import quantizer
+from bybit_core.stream import MarketStream
+from bybit_core.tickers import TickerSnapshot
+
+ATR_BAR_MS = 4 * 60 * 60 * 1000   # barra 4h dell'ATR di trailing
+
+_price_cache:     dict  = {}
+_price_lock             = threading.RLock()
+_market_stream: Optional[MarketStream] = None
+_atr_cache:      dict  = {}   # symbol -> (open ts ultima 4h chiusa, ATR)
+_atr_lock               = threading.Lock()
+_tickers_cache: Optional[TickerSnapshot] = None   # ultimo /v5/market/tickers linear
+_tickers_lock           = threading.Lock()
+
+# Cache incrementale delle candele: ogni scan scarica solo le barre nuove.
+# Indicatori incrementali dei segnali: EMA20, RSI14, ATR(ATR_WINDOW)
+_kline_store = KlineStore(SESSION, BYBIT_BASE_URL, indicator_params=(20, 14, ATR_WINDOW))
+
+# Indice instruments-info completo, persistito su disco tra i riavvii
+_instruments = InstrumentStore(SESSION, BYBIT_BASE_URL, path=INSTRUMENTS_CACHE_PATH,
+                               refresh_sec=INSTRUMENTS_REFRESH_SEC, log=log)
+_INSTRUMENT_FALLBACK = {"min_qty": 0.01, "qty_step": 0.01, "precision": 4,
+                        "price_step": 0.01, "min_order_amt": 5.0, "fallback": True}
+
+
+# ── INSTRUMENT INFO ───────────────────────────────────────────────────────────
+def start_instruments() -> bool:
+    """Preload (o caricamento da disco) dell'indice strumenti; idempotente."""
+    return _instruments.start()
+
+
+def get_instrument_info(symbol: str) -> dict:
+    """
+    Info strumento dall'indice precaricato; un simbolo assente viene scaricato
+    singolarmente. Se anche questo fallisce ritorna valori di default marcati
+    "fallback": True (le entry li rifiutano, le chiusure reduce-only li usano).
+    """
+    info = _instruments.get(symbol) or _instruments.refresh(symbol)
+    if info is not None:
+        return info
+    tlog(f"instr_fallback:{symbol}",
+         f"[INSTR] ⚠️ {symbol}: instrument info non disponibile, uso default", 300)
+    return dict(_INSTRUMENT_FALLBACK)
+
+
+def instrument_symbols() -> tuple:
+    """(versione, simboli linear) dell'indice strumenti; la versione cambia a ogni aggiornamento."""
+    return _instruments.symbols()
+
+
+def refresh_instrument_info(symbol: str) -> dict:
+    """Riscarica il simbolo (es. retCode 170137: qty step cambiato) e ritorna l'info aggiornata."""
+    return _instruments.refresh(symbol) or get_instrument_info(symbol)
+
+
+def format_price_floor(price: float, tick_size: float) -> str:
+    """Arrotonda al tick inferiore (entry e SL long)."""
+    return quantizer(tick_size).floor_str(price)
+
+
+def format_price_ceil(price: float, tick_size: float) -> str:
+    """Arrotonda al tick superiore (entry e SL short: lo SL deve stare SOPRA il prezzo)."""
+    return quantizer(tick_size).ceil_str(price)
+
+
+def format_qty_with_step(qty: float, step: float) -> str:
+    return quantizer(step).floor_str(qty)
+
+
+# ── PREZZO ────────────────────────────────────────────────────────────────────
+def get_last_price(symbol: str) -> Optional[float]:
+    now = time.time()
+    if _market_stream is not None:
+        t = _market_stream.get_ticker(symbol)
+        if t:
+            price = t["price"]
+            with _price_lock:
+                _price_cache[symbol] = {"price": price,
+                                        "bid1": t.get("bid1") or price,
+                                        "ask1": t.get("ask1") or price, "ts": now}
+            return price
+    snap = _tickers_cache
+    if snap is not None and snap.age(now) <= TICKERS_PRICE_SEC:
+        q = snap.quote(symbol)
+        if q:
+            with _price_lock:
+                _price_cache[symbol] = {"price": q["price"], "bid1": q["bid1"],
+                                        "ask1": q["ask1"], "ts": snap.ts}
+            return q["price"]
+    with _price_lock:
+        c = _price_cache.get(symbol)
+        if c and now - c["ts"] <= 2:
+            return c["price"]
+    try:
+        resp = SESSION.get(f"{BYBIT_BASE_URL}/v5/market/tickers",
+                           params={"category": "linear", "symbol": symbol},
+                           timeout=10)
+        data = resp.json()
+        if data.get("retCode") == 0:
+            item  = data["result"]["list"][0]
+            price = float(item["lastPrice"])
+            bid1  = float(item.get("bid1Price") or price)
+            ask1  = float(item.get("ask1Price") or price)
+            with _price_lock:
+                _price_cache[symbol] = {"price": price, "bid1": bid1,
+                                        "ask1": ask1, "ts": now}
+            return price
+    except Exception:
+        pass
+    return None
+
+
+def get_bid_price(symbol: str) -> Optional[float]:
+    """Prezzo bid (entry long PostOnly: compra al bid = maker)."""
+    get_last_price(symbol)
+    with _price_lock:
+        c = _price_cache.get(symbol, {})
+        return c.get("bid1") or c.get("price")
+
+
+def get_ask_price(symbol: str) -> Optional[float]:
+    """Prezzo ask (entry short PostOnly: vendi all'ask = maker)."""
+    get_last_price(symbol)
+    with _price_lock:
+        c = _price_cache.get(symbol, {})
+        return c.get("ask1") or c.get("price")
+
+
+def get_tickers_snapshot() -> Optional[TickerSnapshot]:
+    """
+    Snapshot /v5/market/tickers (linear) condiviso: LONG e SHORT nello stesso
+    processo rankano l'universo sullo stesso snapshot entro TICKERS_TTL_SEC,
+    e get_last_price lo usa per i prezzi entro TICKERS_PRICE_SEC.
+    None se la chiamata fallisce (l'errore non va in cache).
+    """
+    global _tickers_cache
+    with _tickers_lock:
+        if _tickers_cache is not None and _tickers_cache.age() <= TICKERS_TTL_SEC:
+            return _tickers_cache
+        try:
+            resp = SESSION.get(f"{BYBIT_BASE_URL}/v5/market/tickers",
+                               params={"category": "linear"}, timeout=15)
+            data = resp.json()
+            if data.get("retCode") != 0:
+                return None
+            tickers = data["result"]["list"]
+        except Exception as e:
+            log(f"[SCAN] Errore fetch tickers: {e}")
+            return None
+        _tickers_cache = TickerSnapshot(tickers)
+        return _tickers_cache
+
+
+# ── MARKET STREAM ─────────────────────────────────────────────────────────────
+def start_market_stream() -> bool:
+    """Avvia il feed WebSocket pubblico se MARKET_STREAM è attivo; False se resta su REST."""
+    global _market_stream
+    if not MARKET_STREAM:
+        return False
+    if _market_stream is not None:
+        return True   # già avviato da un'altra direzione
+    stream = MarketStream(BYBIT_WS_PUBLIC_URL, _kline_store, log=log)
+    if not stream.start():
+        return False
+    _market_stream = stream
+    return True
+
+
+def add_price_listener(fn: Callable[[str, dict], None]) -> bool:
+    """Callback(symbol, ticker) a ogni update ticker dello stream; False se lo stream non c'è."""
+    if _market_stream is None:
+        return False
+    _market_stream.add_listener(fn)
+    return True
+
+
+def market_stream_fresh() -> bool:
+    return _market_stream is not None and _market_stream.is_fresh()
+
+
+def update_stream_subscriptions(scan_syms: Iterable[str], held: Iterable[str]) -> None:
+    """Topic WS: ticker per universo + posizioni, kline 1h per l'universo, 4h per le posizioni."""
+    if _market_stream is None:
+        return
+    scan_syms = set(scan_syms)
+    held = set(held)
+    _market_stream.set_subscriptions(scan_syms | held, {"60": scan_syms, "240": held})
+
+
+# ── KLINES ────────────────────────────────────────────────────────────────────
+def fetch_klines(symbol: str, interval, limit: int = 60) -> Optional[pd.DataFrame]:
+    """Ultime `limit` candele (crescenti) servite dal KlineStore incrementale."""
+    try:
+        return _kline_store.get(symbol, interval, limit)
+    except Exception:
+        return None
+
+
+# Colonne di fetch_klines_ind: valori (come KLINE_COLUMNS[1:]) e indicatori
+K_OPEN, K_HIGH, K_LOW, K_CLOSE, K_VOLUME = 0, 1, 2, 3, 4
+IND_EMA20, IND_RSI, IND_ATR = 0, 1, 2
+
+
+def fetch_klines_ind(symbol: str, interval, limit: int = 60) -> Optional[tuple]:
+    """
+    (timestamp, valori n × 6, indicatori n × 3) come array NumPy crescenti:
+    niente DataFrame nel percorso dei segnali. Indicatori EMA20/RSI14/ATR per
+    barra, aggiornati in modo incrementale (stesse formule di ta).
+    """
+    try:
+        return _kline_store.get_indicators(symbol, interval, limit)
+    except Exception:
+        return None
+
+
+def get_atr_4h(symbol: str) -> Optional[float]:
+    """
+    ATR(14) sull'ultima candela 4h chiusa.
+    Il valore cambia solo alla chiusura di una nuova barra: è in cache per
+    (symbol, open time dell'ultima 4h chiusa) e si ricalcola al cambio barra.
+    """
+    last_closed = (signed_ts_ms() // ATR_BAR_MS - 1) * ATR_BAR_MS
+    with _atr_lock:
+        cached = _atr_cache.get(symbol)
+    if cached and cached[0] >= last_closed:
+        return cached[1]
+    fetched = fetch_klines_ind(symbol, interval="240", limit=30)
+    if fetched is None or len(fetched[0]) < ATR_WINDOW + 2:
+        return None
+    ts, _, ind = fetched
+    try:
+        val = float(ind[-2, IND_ATR])
+        if pd.isna(val) or val <= 0:
+            return None
+        with _atr_lock:
+            _atr_cache[symbol] = (int(ts[-2]), val)
+        return val
+    except Exception:
+        return None
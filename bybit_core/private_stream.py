@@ -0,0 +1,315 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# PRIVATE STREAM — feed WebSocket privato Bybit (order, execution, position, wallet)
+#
+# Thread in background autenticato con la API key. Mantiene in memoria:
+#   - ordini:    stato e qty eseguita per orderId → conferma fill PostOnly
+#                senza polling di /v5/position/list
+#   - posizioni: snapshot per (symbol, positionIdx), seminato via REST a ogni
+#                (ri)connessione e poi aggiornato dai push → chiusure SL/trail
+#                viste in meno di un secondo
+#   - esecuzioni di chiusura: prezzo medio di uscita e PnL realizzato
+#   - wallet:    ogni push va ai listener (aggiorna lo snapshot equity/saldo)
+# Se lo stream non è connesso e autenticato i bot tornano al polling REST.
+# L'URL è configurabile: nei test il server locale tests/fake_bybit_ws.py
+# sostituisce Bybit (auth compresa).
+# ─────────────────────────────────────────────────────────────────────────────
+
+import hashlib
+import hmac
+import json
+import threading
+import time
+from typing import Callable, Optional
+
+WS_PRIVATE_URL         = "wss://stream.bybit.com/v5/private"
+WS_PRIVATE_URL_TESTNET = "wss://stream-testnet.bybit.com/v5/private"
+
+TOPICS              = ["order", "execution", "position", "wallet"]
+PING_INTERVAL_SEC   = 20
+RECONNECT_DELAY_SEC = 5
+AUTH_EXPIRES_MS     = 10_000
+
+_ORDER_DONE = {"Filled", "Cancelled", "Rejected", "Deactivated", "PartiallyFilledCanceled"}
+_IDX_SIDE   = {1: "Buy", 2: "Sell"}   # hedge mode
+
+
+def auth_args(key: str, secret: str, now_ms: Optional[int] = None) -> list:
+    """Argomenti di {"op": "auth"}: firma HMAC-SHA256 di "GET/realtime{expires}"."""
+    expires = (now_ms if now_ms is not None else int(time.time() * 1000)) + AUTH_EXPIRES_MS
+    sig = hmac.new(secret.encode(), f"GET/realtime{expires}".encode(),
+                   hashlib.sha256).hexdigest()
+    return [key, expires, sig]
+
+
+def _f(val) -> float:
+    try:
+        return float(val or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class PrivateStream:
+    """Stato ordini/posizioni/wallet alimentato dal WebSocket privato."""
+
+    def __init__(self, url: str, key: str, secret: str,
+                 seed_positions: Optional[Callable[[], Optional[list]]] = None,
+                 log: Callable[[str], None] = print,
+                 now_ms: Optional[Callable[[], int]] = None):
+        self.url = url
+        self._key = key
+        self._secret = secret
+        self._now_ms = now_ms         # orologio allineato al server per `expires` dell'auth
+        self._seed = seed_positions
+        self._log = log
+        self._cond = threading.Condition(threading.RLock())
+        self._orders: dict = {}       # orderId -> {"status", "cum_qty", "avg_price", "symbol", "idx"}
+        self._positions: dict = {}    # (symbol, positionIdx) -> record stile REST
+        self._exits: dict = {}        # (symbol, positionIdx) -> {"qty", "value", "pnl"}
+        self._wallet_listeners: list = []
+        self._ready = False           # connesso + autenticato + posizioni seminate
+        self._connected = False
+        self._seq = 0                 # incrementato a ogni push order/position/execution
+        self._ws = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ── API pubblica ──────────────────────────────────────────────────────────
+    def start(self) -> bool:
+        try:
+            import websocket  # noqa: F401  (websocket-client)
+        except ImportError:
+            self._log("[PRIV-STREAM] websocket-client non installato — resto su REST")
+            return False
+        if not self._key or not self._secret:
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="private-stream")
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def add_wallet_listener(self, fn: Callable[[dict], None]) -> None:
+        self._wallet_listeners.append(fn)
+
+    def is_ready(self) -> bool:
+        return self._ready
+
+    def positions(self, side: str) -> Optional[dict]:
+        """{symbol: posizione aperta sul lato `side`} come get_positions_snapshot; None se non pronto."""
+        with self._cond:
+            if not self._ready:
+                return None
+            return {
+                sym: dict(p) for (sym, idx), p in self._positions.items()
+                if _IDX_SIDE.get(idx, p.get("side")) == side and _f(p.get("size")) > 0
+            }
+
+    def wait_fill(self, order_id: str, position_idx: int, timeout: float) -> Optional[float]:
+        """
+        Attende il primo fill (o uno stato terminale) dell'ordine.
+        Ritorna la qty eseguita (0.0 se non eseguito), None se lo stream non è pronto.
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                if not self._ready:
+                    return None
+                o = self._orders.get(order_id)
+                if o and (o["cum_qty"] > 0 or o["status"] in _ORDER_DONE):
+                    if o["cum_qty"] > 0:
+                        self._ensure_position(o, position_idx)
+                    return o["cum_qty"]
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return 0.0
+                self._cond.wait(remaining)
+
+    def _ensure_position(self, o: dict, position_idx: int) -> None:
+        # Il push position può seguire quello order: senza record provvisorio il
+        # main loop leggerebbe la posizione appena aperta come già chiusa.
+        idx = o["idx"] or position_idx
+        self._put_position({"symbol": o["symbol"], "positionIdx": idx,
+                            "side": _IDX_SIDE.get(idx, ""), "size": str(o["cum_qty"]),
+                            "avgPrice": str(o["avg_price"])}, only_if_flat=True)
+
+    def wait_event(self, timeout: float) -> bool:
+        """Attende fino a `timeout` un push order/position/execution. False se scaduto o non pronto."""
+        with self._cond:
+            if not self._ready:
+                return False
+            seq = self._seq
+            self._cond.wait_for(lambda: self._seq != seq or not self._ready, timeout)
+            return self._seq != seq
+
+    def pop_exit(self, symbol: str, position_idx: int) -> Optional[dict]:
+        """Uscita registrata dalle esecuzioni reduce: {"price", "qty", "pnl"}; None se assente."""
+        with self._cond:
+            e = self._exits.pop((symbol, position_idx), None)
+        if not e or e["qty"] <= 0:
+            return None
+        return {"price": e["value"] / e["qty"], "qty": e["qty"], "pnl": e["pnl"]}
+
+    # ── Connessione ───────────────────────────────────────────────────────────
+    def _run(self) -> None:
+        import websocket
+        while not self._stop.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=lambda _ws, err: self._log(f"[PRIV-STREAM] errore: {err}"),
+                on_close=self._on_close,
+            )
+            try:
+                self._ws.run_forever()
+            except Exception as e:
+                self._log(f"[PRIV-STREAM] exc: {e}")
+            self._set_ready(False)
+            self._connected = False
+            if self._stop.wait(RECONNECT_DELAY_SEC):
+                break
+
+    def _on_open(self, ws) -> None:
+        self._connected = True
+        now = self._now_ms() if self._now_ms is not None else None
+        self._send(ws, {"op": "auth", "args": auth_args(self._key, self._secret, now_ms=now)})
+        threading.Thread(target=self._heartbeat, args=(ws,), daemon=True).start()
+
+    def _on_close(self, _ws, *_args) -> None:
+        self._connected = False
+        self._set_ready(False)
+        self._log("[PRIV-STREAM] disconnesso")
+
+    def _heartbeat(self, ws) -> None:
+        while self._connected and self._ws is ws and not self._stop.wait(PING_INTERVAL_SEC):
+            try:
+                ws.send(json.dumps({"op": "ping"}))
+            except Exception:
+                return
+
+    def _send(self, ws, obj: dict) -> None:
+        try:
+            ws.send(json.dumps(obj))
+        except Exception as e:
+            self._log(f"[PRIV-STREAM] {obj.get('op')} fallita: {e}")
+
+    def _set_ready(self, ready: bool) -> None:
+        with self._cond:
+            self._ready = ready
+            self._cond.notify_all()
+
+    def _on_subscribed(self) -> None:
+        # I push persi durante la disconnessione non tornano: riparte da uno snapshot REST.
+        rows = None
+        if self._seed is not None:
+            try:
+                rows = self._seed()
+            except Exception as e:
+                self._log(f"[PRIV-STREAM] seed posizioni exc: {e}")
+        if rows is None:
+            self._log("[PRIV-STREAM] seed posizioni fallito — resto su REST")
+            return
+        with self._cond:
+            self._positions = {}
+            for p in rows:
+                key = (p.get("symbol", ""), int(p.get("positionIdx", 0) or 0))
+                self._positions[key] = self._normalize(p)
+        self._set_ready(True)
+        self._log(f"[PRIV-STREAM] pronto — {len(rows)} posizioni, topic {','.join(TOPICS)}")
+
+    # ── Messaggi ──────────────────────────────────────────────────────────────
+    def _on_message(self, ws, raw: str) -> None:
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            return
+        op = msg.get("op")
+        if op == "auth":
+            if msg.get("success"):
+                self._send(ws, {"op": "subscribe", "args": TOPICS})
+            else:
+                self._log(f"[PRIV-STREAM] auth rifiutata: {msg.get('ret_msg')}")
+            return
+        if op == "subscribe":
+            if msg.get("success"):
+                self._on_subscribed()
+            else:
+                self._log(f"[PRIV-STREAM] subscribe rifiutata: {msg.get('ret_msg')}")
+            return
+        topic = msg.get("topic") or ""
+        data = msg.get("data") or []
+        if topic == "wallet":
+            for acct in data:
+                for fn in self._wallet_listeners:
+                    try:
+                        fn(acct)
+                    except Exception as e:
+                        self._log(f"[PRIV-STREAM] listener exc: {e}")
+            return
+        handler = {"order": self._handle_order, "execution": self._handle_execution,
+                   "position": self._put_position}.get(topic)
+        if handler is None:
+            return
+        with self._cond:
+            for rec in data:
+                handler(rec)
+            self._seq += 1
+            self._cond.notify_all()
+
+    @staticmethod
+    def _normalize(p: dict) -> dict:
+        rec = dict(p)
+        if not rec.get("avgPrice") and rec.get("entryPrice"):
+            rec["avgPrice"] = rec["entryPrice"]
+        return rec
+
+    def _put_position(self, p: dict, only_if_flat: bool = False) -> None:
+        key = (p.get("symbol", ""), int(p.get("positionIdx", 0) or 0))
+        prev = self._positions.get(key)
+        was_flat = prev is None or _f(prev.get("size")) <= 0
+        if only_if_flat and not was_flat:
+            return
+        if was_flat and _f(p.get("size")) > 0:
+            self._exits.pop(key, None)   # nuovo trade: le uscite precedenti non contano
+        self._positions[key] = self._normalize(p)
+
+    def _handle_order(self, o: dict) -> None:
+        oid = o.get("orderId")
+        if not oid:
+            return
+        cur = self._orders.setdefault(oid, {"status": "", "cum_qty": 0.0, "avg_price": 0.0,
+                                            "symbol": o.get("symbol", ""), "idx": 0})
+        cur["idx"] = int(o.get("positionIdx", 0) or 0) or cur["idx"]
+        cur["status"] = o.get("orderStatus", cur["status"])
+        cur["cum_qty"] = max(cur["cum_qty"], _f(o.get("cumExecQty")))
+        cur["avg_price"] = _f(o.get("avgPrice")) or cur["avg_price"]
+
+    def _handle_execution(self, e: dict) -> None:
+        if e.get("execType", "Trade") != "Trade":
+            return   # funding, ADL, ecc.
+        oid = e.get("orderId")
+        qty = _f(e.get("execQty"))
+        if oid:
+            cur = self._orders.setdefault(oid, {"status": "", "cum_qty": 0.0, "avg_price": 0.0,
+                                                "symbol": e.get("symbol", ""), "idx": 0})
+            # L'execution può arrivare prima del push order: qty eseguita = ordinata − residua.
+            if e.get("orderQty"):
+                done = _f(e.get("orderQty")) - _f(e.get("leavesQty"))
+            else:
+                done = cur["cum_qty"] + qty
+            cur["cum_qty"] = max(cur["cum_qty"], done)
+        if _f(e.get("closedSize")) <= 0:
+            return
+        # Esecuzione di chiusura: side opposto a quello della posizione
+        idx = 2 if e.get("side") == "Buy" else 1
+        ex = self._exits.setdefault((e.get("symbol", ""), idx), {"qty": 0.0, "value": 0.0, "pnl": 0.0})
+        ex["qty"] += qty
+        ex["value"] += qty * _f(e.get("execPrice"))
+        ex["pnl"] += _f(e.get("execPnl")) - _f(e.get("execFee"))
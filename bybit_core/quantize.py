@@ -0,0 +1,109 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# QUANTIZE — arrotondamento di prezzi e qty al tick/step senza Decimal
+#
+# Un Quantizer per step (tick size o qty step) precalcola una volta sola
+# decimali e step intero scalato (step = m / 10^dec). Ogni chiamata lavora poi
+# su interi: indice k del tick stimato in float e corretto con un confronto
+# esatto sul valore k·m / 10^dec (divisione tra interi < 2^53, arrotondata
+# correttamente da Python). Il risultato è identico alla vecchia versione
+# Decimal(str(x)) // step * step; i casi fuori dominio (x ≤ 0, non finito,
+# indici oltre 10^15) passano dalla versione Decimal.
+#
+# Parità con la versione Decimal: tests/test_quantize.py
+# Benchmark: python -m bybit_core.quantize
+# ─────────────────────────────────────────────────────────────────────────────
+
+import math
+from decimal import Decimal, ROUND_UP
+from functools import lru_cache
+
+_MAX_UNITS = 10 ** 15   # k·m < 10^15: valore decimale con ≤ 15 cifre, esatto in float
+
+
+def _decimal_floor(x: float, step: Decimal, dec: int) -> str:
+    floored = (Decimal(str(x)) // step) * step
+    return f"{floored:.{dec}f}"
+
+
+def _decimal_ceil(x: float, step: Decimal, dec: int) -> str:
+    ceiled = (Decimal(str(x)) / step).to_integral_value(rounding=ROUND_UP) * step
+    return f"{ceiled:.{dec}f}"
+
+
+class Quantizer:
+    """Arrotondamento floor/ceil a multipli di `step`, con formattazione a `dec` decimali."""
+
+    __slots__ = ("step", "dec", "_step_dec", "_m", "_scale", "_step_f")
+
+    def __init__(self, step: float):
+        step_dec = Decimal(str(step))
+        exp = step_dec.as_tuple().exponent
+        self.dec = -exp if exp < 0 else 0
+        self.step = step
+        self._step_dec = step_dec
+        self._m = int(step_dec.scaleb(self.dec))   # step intero alla scala 10^dec
+        self._scale = 10 ** self.dec
+        self._step_f = float(step_dec)
+
+    def _index(self, x: float) -> tuple:
+        """(k vicino a x/step, confronto esatto x vs k·step: -1, 0, 1) oppure None."""
+        if not (x > 0.0) or math.isinf(x):
+            return None
+        k = round(x / self._step_f)
+        if (k + 1) * self._m >= _MAX_UNITS:
+            return None
+        on_grid = k * self._m / self._scale
+        if x == on_grid:
+            return k, 0
+        return k, (-1 if x < on_grid else 1)
+
+    def _fmt(self, k: int) -> str:
+        v = k * self._m
+        if not self.dec:
+            return str(v)
+        s = str(v).rjust(self.dec + 1, "0")
+        return f"{s[:-self.dec]}.{s[-self.dec:]}"
+
+    def floor_str(self, x: float) -> str:
+        idx = self._index(x)
+        if idx is None:
+            return _decimal_floor(x, self._step_dec, self.dec)
+        k, cmp = idx
+        return self._fmt(k - 1 if cmp < 0 else k)
+
+    def ceil_str(self, x: float) -> str:
+        idx = self._index(x)
+        if idx is None:
+            return _decimal_ceil(x, self._step_dec, self.dec)
+        k, cmp = idx
+        return self._fmt(k + 1 if cmp > 0 else k)
+
+
+@lru_cache(maxsize=4096, typed=True)   # 1 e 1.0 formattano diversamente
+def quantizer(step: float) -> Quantizer:
+    """Quantizer condiviso per step: costruito una volta, poi solo lookup."""
+    return Quantizer(step)
+
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
+def _bench(n: int = 50_000) -> None:
+    import timeit
+    from bybit_core.market import format_qty_with_step
+    step, price = 0.0001, 1.23456789
+
+    def old_floor():
+        step_dec = Decimal(str(step))
+        p = Decimal(str(price))
+        floored = (p // step_dec) * step_dec
+        d = -step_dec.as_tuple().exponent if step_dec.as_tuple().exponent < 0 else 0
+        return f"{floored:.{d}f}"
+
+    for name, fn in (("floor Decimal", old_floor),
+                     ("floor Quantizer", lambda: quantizer(step).floor_str(price)),
+                     ("qty  format_qty_with_step", lambda: format_qty_with_step(123.456, 0.01))):
+        best = min(timeit.repeat(fn, number=n, repeat=5)) / n * 1e6
+        print(f"{name:28s} {best:6.2f} µs")
+
+
+if __name__ == "__main__":
+    _bench()
@@ -0,0 +1,181 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# RATE LIMIT — token bucket per i limiti Bybit, applicato a livello di SESSION
+#
+# Bucket:
+#   - public:         /v5/market/*  (limite per IP: 600 req / 5s)
+#   - <path privato>: un bucket per endpoint firmato (limiti per UID, es.
+#                     order/create 10/s, position/list 50/s)
+# Ogni richiesta che passa da SESSION attende un token (back-pressure sul
+# chiamante invece di sleep fissi). Su HTTP 429 / retCode 10006 o header
+# X-Bapi-Limit-Status a zero il bucket viene svuotato: le richieste successive
+# rallentano subito invece di finire nel backoff esponenziale di urllib3.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+PUBLIC_BUCKET = "public"
+
+# Limiti per secondo per UID (Bybit v5, linear); i path non elencati usano il default.
+PRIVATE_RATES = {
+    "/v5/order/create":           10.0,
+    "/v5/order/create-batch":     10.0,
+    "/v5/order/amend":            10.0,
+    "/v5/order/cancel":           10.0,
+    "/v5/order/cancel-all":       10.0,
+    "/v5/position/trading-stop":  10.0,
+    "/v5/position/set-leverage":  10.0,
+    "/v5/position/list":          50.0,
+    "/v5/account/wallet-balance": 50.0,
+    "/v5/order/realtime":          50.0,
+    "/v5/execution/list":         50.0,
+}
+PRIVATE_DEFAULT_RATE = 10.0
+PUBLIC_RATE          = 100.0      # 600 / 5s = 120/s per IP: margine del ~15%
+_THROTTLED_MARKER    = b'"retCode":10006'
+
+
+class TokenBucket:
+    """Bucket a ricarica continua: `rate` token/s, al massimo `capacity` accumulati."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Prenota `tokens` e ritorna i secondi da attendere (0 se disponibili subito)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+            self._ts = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Blocca finché il token è disponibile; ritorna i secondi attesi."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def drain(self) -> None:
+        """Azzera i token (limite raggiunto lato server)."""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+            self._ts = time.monotonic()
+
+
+class _Stats:
+    __slots__ = ("requests", "waited", "wait_sec", "max_wait", "throttled")
+
+    def __init__(self):
+        self.requests = 0
+        self.waited = 0
+        self.wait_sec = 0.0
+        self.max_wait = 0.0
+        self.throttled = 0
+
+
+class RateLimiter:
+    """Insieme dei bucket Bybit con metriche per bucket."""
+
+    def __init__(self, public_rate: float = PUBLIC_RATE,
+                 private_default_rate: float = PRIVATE_DEFAULT_RATE,
+                 private_rates: Optional[dict] = None, scale: float = 1.0):
+        self._scale = scale
+        self._private_default = private_default_rate
+        self._private_rates = dict(PRIVATE_RATES if private_rates is None else private_rates)
+        self._buckets = {PUBLIC_BUCKET: TokenBucket(public_rate * scale)}
+        self._stats: dict = {}
+        self._lock = threading.Lock()
+
+    def bucket_name(self, path: str) -> str:
+        return PUBLIC_BUCKET if path.startswith("/v5/market/") else path
+
+    def _bucket(self, name: str) -> TokenBucket:
+        with self._lock:
+            b = self._buckets.get(name)
+            if b is None:
+                rate = self._private_rates.get(name, self._private_default) * self._scale
+                b = self._buckets[name] = TokenBucket(rate)
+            return b
+
+    def acquire(self, path: str) -> str:
+        """Attende il token per `path`; ritorna il nome del bucket usato."""
+        name = self.bucket_name(path)
+        waited = self._bucket(name).acquire()
+        with self._lock:
+            st = self._stats.setdefault(name, _Stats())
+            st.requests += 1
+            if waited > 0:
+                st.waited += 1
+                st.wait_sec += waited
+                st.max_wait = max(st.max_wait, waited)
+        return name
+
+    def throttled(self, name: str) -> None:
+        """Il server ha segnalato limite raggiunto: svuota il bucket."""
+        self._bucket(name).drain()
+        with self._lock:
+            self._stats.setdefault(name, _Stats()).throttled += 1
+
+    def metrics(self) -> dict:
+        """{bucket: {"requests", "waited", "wait_sec", "max_wait_ms", "throttled", "rate"}}."""
+        with self._lock:
+            return {
+                name: {"requests": st.requests, "waited": st.waited,
+                       "wait_sec": round(st.wait_sec, 3),
+                       "max_wait_ms": round(st.max_wait * 1000, 1),
+                       "throttled": st.throttled,
+                       "rate": self._buckets[name].rate}
+                for name, st in self._stats.items()
+            }
+
+    def summary(self) -> str:
+        """Riga di log compatta: i bucket più usati per primi."""
+        m = sorted(self.metrics().items(), key=lambda kv: kv[1]["requests"], reverse=True)
+        return " | ".join(
+            f"{name}: req={v['requests']} wait={v['waited']}/{v['wait_sec']:.1f}s "
+            f"max={v['max_wait_ms']:.0f}ms 429={v['throttled']}"
+            for name, v in m
+        )
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter che fa passare ogni richiesta dal RateLimiter."""
+
+    def __init__(self, limiter: RateLimiter, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        name = self.limiter.acquire(urlsplit(request.url).path)
+        resp = super().send(request, **kwargs)
+        if self._is_throttled(resp):
+            # Una sola ripetizione dopo aver atteso un token "pulito" del bucket
+            self.limiter.throttled(name)
+            self.limiter.acquire(urlsplit(request.url).path)
+            resp = super().send(request, **kwargs)
+            if self._is_throttled(resp):
+                self.limiter.throttled(name)
+        elif resp.headers.get("X-Bapi-Limit-Status") == "0":
+            self.limiter.throttled(name)
+        return resp
+
+    @staticmethod
+    def _is_throttled(resp) -> bool:
+        if resp.status_code == 429:
+            return True
+        try:
+            return _THROTTLED_MARKER in resp.content
+        except Exception:
+            return False
@@ -0,0 +1,124 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# REGIME BTC — gate di mercato per direzione
+#
+#   LONG:  BTC daily close > EMA200 daily (disattivato: BTC_BULL_CHECK=False)
+#   SHORT: score [0..1] da distanza sotto EMA50 daily e slope EMA50 negativa;
+#          attivo con score >= BTC_SHORT_REGIME_SCORE_MIN, altrimenti idle.
+# Ciascun gate si aggiorna al massimo una volta l'ora.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import time
+
+from bybit_core.client import tlog
+from bybit_core.config import (
+    BTC_BULL_CHECK, BTC_SHORT_REGIME_CHECK, BTC_SHORT_REGIME_SCORE_MIN,
+)
+from bybit_core.market import fetch_klines
+
+_btc_ok:          bool  = True
+_btc_ts:          float = 0.0
+_btc_short_ok: bool  = True   # True = BTC in bear regime → short attivi
+_btc_short_ts:  float = 0.0
+_btc_short_score: float = 1.0
+
+
+def _clamp(value: float, min_value: float, max_value: float) -> float:
+    return max(min_value, min(max_value, value))
+
+
+def update_btc_filter() -> None:
+    """
+    Filtro regime LONG semplificato:
+      BTC daily close (ultima candela chiusa) > EMA200 daily.
+      EMA200 rappresenta il trend strutturale di lungo periodo.
+      Nessun check di slope: la slope EMA200 è quasi sempre positiva in bull,
+      negativa in bear — non serve calcolarla esplicitamente.
+    """
+    global _btc_ok, _btc_ts
+    if time.time() - _btc_ts < 3600:
+        return
+    if not BTC_BULL_CHECK:
+        _btc_ok = True
+        _btc_ts = time.time()
+        return
+    try:
+        df_d = fetch_klines("BTCUSDT", interval="D", limit=210)
+        if df_d is not None and len(df_d) >= 201:
+            close_d    = df_d["Close"]
+            ema200_d   = close_d.ewm(span=200, adjust=False).mean()
+            btc_d      = float(close_d.iloc[-2])   # ultima candela CHIUSA
+            ema200_now = float(ema200_d.iloc[-2])
+            _btc_ok    = btc_d >= ema200_now
+            gap_pct    = (btc_d - ema200_now) / ema200_now * 100
+            tlog("btc_filter",
+                 f"[BTC] EMA200d={ema200_now:,.0f} | BTC={btc_d:,.0f} "
+                 f"({gap_pct:+.1f}%) | "
+                 f"gate={'OK ✅' if _btc_ok else 'CHIUSO 🚫 (sotto EMA200d)'}", 3600)
+        else:
+            _btc_ok = True  # dati insufficienti: non bloccare
+    except Exception:
+        pass
+    _btc_ts = time.time()
+
+
+def update_btc_regime() -> None:
+    """
+    Controlla il regime di mercato per gli short.
+    SHORT regime ATTIVO quando:
+      - BTC daily close < EMA50 daily (prezzo strutturalmente sotto la media)
+      - EMA50 slope negativa (EMA50 oggi < EMA50 di 5 giorni fa)
+    Se una delle due condizioni manca (BTC rimbalza sopra EMA50 o slope torna
+    positiva), il bot va in idle: nessun nuovo short fino a regime ristabilito.
+    """
+    global _btc_short_ok, _btc_short_ts, _btc_short_score
+    if time.time() - _btc_short_ts < 3600:
+        return
+    if not BTC_SHORT_REGIME_CHECK:
+        _btc_short_ok = True
+        _btc_short_score = 1.0
+        _btc_short_ts = time.time()
+        return
+    try:
+        df_d = fetch_klines("BTCUSDT", interval="D", limit=60)
+        if df_d is not None and len(df_d) >= 52:
+            close_d   = df_d["Close"]
+            ema50_d   = close_d.ewm(span=50, adjust=False).mean()
+            btc_d     = float(close_d.iloc[-2])   # ultima candela CHIUSA
+            ema50_now = float(ema50_d.iloc[-2])
+            ema50_5d  = float(ema50_d.iloc[-7])
+            below_ema = btc_d < ema50_now
+            slope_neg = ema50_now < ema50_5d
+            gap_pct   = (btc_d - ema50_now) / ema50_now * 100
+            slope_pct = (ema50_now - ema50_5d) / ema50_5d * 100
+
+            # Regime score continuo [0..1]: combina distanza sotto EMA50 e slope negativa.
+            gap_score = _clamp((-gap_pct) / 2.0, 0.0, 1.0)
+            slope_score = _clamp((-slope_pct) / 0.50, 0.0, 1.0)
+            _btc_short_score = (gap_score + slope_score) / 2.0
+            _btc_short_ok = _btc_short_score >= BTC_SHORT_REGIME_SCORE_MIN
+
+            tlog("btc_regime",
+                 f"[REGIME] BTC={btc_d:,.0f} EMA50d={ema50_now:,.0f} "
+                 f"({gap_pct:+.1f}%) slope={slope_pct:+.3f}%/5gg | "
+                 f"score={_btc_short_score:.2f} | "
+                 f"SHORT={'✅ ON' if _btc_short_ok else '⏸️ OFF (score basso)'} | "
+                 f"gate_raw={'ON' if (below_ema and slope_neg) else 'OFF'}",
+                 3600)
+        else:
+            _btc_short_ok = False  # dati insufficienti: non shortare
+            _btc_short_score = 0.0
+    except Exception:
+        pass
+    _btc_short_ts = time.time()
+
+
+def update(is_long: bool) -> None:
+    if is_long:
+        update_btc_filter()
+    else:
+        update_btc_regime()
+
+
+def is_open(is_long: bool) -> bool:
+    """True se il gate BTC consente nuovi ingressi nella direzione."""
+    return _btc_ok if is_long else _btc_short_ok
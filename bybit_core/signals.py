@@ -0,0 +1,360 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# SEGNALI — anticipazione breakout (LONG) / breakdown (SHORT) su 1h
+#
+# Una sola implementazione per le due direzioni: le formule speculari usano
+# d.sign, le soglie e i motivi di scarto restano quelli originali di ciascun
+# bot (es. chg1h_too_low vs chg1h_not_negative_enough).
+#
+# check_entry_signal lavora su array NumPy (viste sulle colonne del KlineStore)
+# senza DataFrame né .iloc; quantili, media e deviazione standard replicano le
+# operazioni di pandas: soglie, motivi di scarto e segnale restano identici.
+#
+# Finestre registrate dal percorso DataFrame: tests/test_signals.py
+# Benchmark a confronto: python bench/bench_signals.py --baseline 223a66c
+# ─────────────────────────────────────────────────────────────────────────────
+
+from typing import Optional
+
+import numpy as np
+
+from bybit_core.adaptive import adaptive_histories
+from bybit_core.client import log
+from bybit_core.config import (
+    ADAPTIVE_BASE_MAX_PCT, ADAPTIVE_BASE_MIN_PCT, ADAPTIVE_BASE_WIDTH_PCTL,
+    ADAPTIVE_LOOKBACK_BARS, ADAPTIVE_MIN_NORM_Z_LONG, ADAPTIVE_MIN_NORM_Z_SHORT,
+    ADAPTIVE_MOM_PCTL_LONG, ADAPTIVE_MOM_PCTL_SHORT, ADAPTIVE_RVOL_MAX,
+    ADAPTIVE_RVOL_MIN, ADAPTIVE_RVOL_PCTL, BASE_LOOKBACK_BARS,
+    BREAK_CONFIRM_ATR_TOL, BREAK_CONFIRM_PCT_TOL, FALLBACK_TP_ATR_MULT,
+    MAX_CHG_1H_PCT, MAX_CHG_1H_PCT_CEIL, MAX_CHG_1H_PCT_FLOOR, MAX_CHG_4H_PCT,
+    MAX_CHG_4H_PCT_CEIL, MAX_CHG_4H_PCT_FLOOR, MAX_DIST_EMA, MAX_DIST_EMA50_D,
+    MAX_SL_PCT, MIN_BODY_PCT, MIN_CHG_1H_PCT, MIN_CHG_1H_PCT_FLOOR,
+    MIN_CHG_4H_PCT, MIN_CHG_4H_PCT_FLOOR, MIN_RR_EST, MIN_VOL_RATIO,
+    REQUIRE_SLOPE_CONFIRMATION, RR_SWING_LOOKBACK, RSI_MAX_4H, RSI_MIN_4H,
+    SL_BASE_ATR_BUFFER, TOP_MOVER_MAX_CHG1H_PCT, TOP_MOVER_MAX_CHG4H_PCT,
+    TOP_MOVER_MAX_DIST_EMA_PCT, TOP_MOVER_MIN_CHG1H_PCT, TOP_MOVER_MIN_CHG4H_PCT,
+    TOP_MOVER_RSI_MAX_LONG, TOP_MOVER_RSI_MIN_SHORT, TOP_MOVER_SL_ATR_MULT,
+)
+from bybit_core.direction import Direction
+from bybit_core.market import (
+    IND_ATR, IND_EMA20, IND_RSI, K_CLOSE, K_HIGH, K_LOW, K_OPEN, K_VOLUME,
+    fetch_klines, fetch_klines_ind,
+)
+
+
+# ── FILTRO TREND DAILY ────────────────────────────────────────────────────────
+def is_daily_trend(d: Direction, symbol: str) -> bool:
+    """
+    True se la coin è in trend strutturale nella direzione `d`:
+    - Last daily close oltre EMA50 daily (sopra per LONG, sotto per SHORT)
+    - EMA50 daily con slope concorde (oggi vs 5 barre fa)
+    - Trend non overesteso: close entro MAX_DIST_EMA50_D% da EMA50
+    Non usato nel ciclo di scan (il ranking 24h seleziona già il trend).
+    """
+    df = fetch_klines(symbol, interval="D", limit=60)
+    if df is None or len(df) < 52:
+        return False
+    close     = df["Close"]
+    ema50     = close.ewm(span=50, adjust=False).mean()
+    last_c    = float(close.iloc[-2])
+    ema50_now = float(ema50.iloc[-2])
+    ema50_5d  = float(ema50.iloc[-7])
+    s = d.sign
+    if s * (last_c - ema50_now) <= 0 or s * (ema50_now - ema50_5d) <= 0:
+        return False
+    dist_ema50 = s * (last_c - ema50_now) / ema50_now * 100
+    if dist_ema50 > MAX_DIST_EMA50_D:
+        return False
+    return True
+
+
+def _clamp(value: float, min_value: float, max_value: float) -> float:
+    return max(min_value, min(max_value, value))
+
+
+def _dropna(values) -> np.ndarray:
+    a = np.asarray(values, dtype=float)
+    return a[~np.isnan(a)]
+
+
+def _safe_quantile(values, q: float, fallback: float) -> float:
+    """Series(values).dropna().quantile(q): stessa np.quantile lineare usata da pandas."""
+    a = _dropna(values)
+    if a.size == 0:
+        return fallback
+    return float(np.quantile(a, q))
+
+
+def compute_adaptive_thresholds(
+    d: Direction,
+    c: np.ndarray,
+    h: np.ndarray,
+    l: np.ndarray,
+    v: np.ndarray,
+    atr_series: np.ndarray,
+    last_idx: int,
+) -> dict:
+    """
+    Soglie adattive da percentili storici. Momentum: LONG min_chg_1h/min_chg_4h
+    (soglie minime positive), SHORT max_chg_1h/max_chg_4h (soglie massime negative).
+    """
+    hist = adaptive_histories(c, h, l, v, atr_series, last_idx,
+                              BASE_LOOKBACK_BARS, ADAPTIVE_LOOKBACK_BARS, direction=d.sign)
+    base_hist = hist["base"]
+    rvol_hist = hist["rvol"]
+    chg1h_vals = hist["chg1h"]
+    chg4h_vals = hist["chg4h"]
+    norm_hist = hist["norm"]
+
+    base_thr = _clamp(
+        _safe_quantile(base_hist, ADAPTIVE_BASE_WIDTH_PCTL, MAX_DIST_EMA),
+        ADAPTIVE_BASE_MIN_PCT,
+        ADAPTIVE_BASE_MAX_PCT,
+    )
+    rvol_thr = _clamp(
+        _safe_quantile(rvol_hist, ADAPTIVE_RVOL_PCTL, MIN_VOL_RATIO),
+        ADAPTIVE_RVOL_MIN,
+        ADAPTIVE_RVOL_MAX,
+    )
+
+    # Media e std(ddof=0) a due passate come pandas (somma / n, poi scarti²)
+    norm_vals = _dropna(norm_hist)
+    n_norm = norm_vals.size
+    norm_mu = float(norm_vals.sum() / n_norm) if n_norm else 0.0
+    norm_std = (float(np.sqrt(((norm_mu - norm_vals) ** 2).sum() / n_norm))
+                if n_norm > 1 else 0.0)
+
+    out = {
+        "base_max_pct": base_thr,
+        "min_rvol": rvol_thr,
+        "norm_mu": norm_mu,
+        "norm_std": norm_std,
+    }
+    if d.is_long:
+        min_chg_1h = max(
+            MIN_CHG_1H_PCT_FLOOR,
+            _safe_quantile(chg1h_vals, ADAPTIVE_MOM_PCTL_LONG, MIN_CHG_1H_PCT),
+        )
+        min_chg_4h = max(
+            MIN_CHG_4H_PCT_FLOOR,
+            _safe_quantile(chg4h_vals, ADAPTIVE_MOM_PCTL_LONG, MIN_CHG_4H_PCT),
+        )
+        out["min_chg_1h"] = min_chg_1h
+        out["min_chg_4h"] = max(min_chg_4h, min_chg_1h)
+    else:
+        max_chg_1h = _clamp(
+            _safe_quantile(chg1h_vals, ADAPTIVE_MOM_PCTL_SHORT, MAX_CHG_1H_PCT),
+            MAX_CHG_1H_PCT_FLOOR,
+            MAX_CHG_1H_PCT_CEIL,
+        )
+        max_chg_4h = _clamp(
+            _safe_quantile(chg4h_vals, ADAPTIVE_MOM_PCTL_SHORT, MAX_CHG_4H_PCT),
+            MAX_CHG_4H_PCT_FLOOR,
+            MAX_CHG_4H_PCT_CEIL,
+        )
+        out["max_chg_1h"] = max_chg_1h
+        out["max_chg_4h"] = min(max_chg_4h, max_chg_1h)
+    return out
+
+
+# ── SIGNAL CHECK 1h (ANTICIPAZIONE BREAKOUT / BREAKDOWN) ─────────────────────
+def check_entry_signal(d: Direction, symbol: str, reject_stats: Optional[dict] = None,
+                       rank: int = 99) -> Optional[dict]:
+    """Entry di anticipazione con soglie adattive su breakout (LONG) / breakdown (SHORT) 1h."""
+    top_mover = rank <= 3
+    is_long = d.is_long
+    s = d.sign
+    def reject(reason: str) -> Optional[dict]:
+        if reject_stats is not None:
+            reject_stats[reason] = reject_stats.get(reason, 0) + 1
+        return None
+
+    fetched = fetch_klines_ind(symbol, interval="60", limit=80)
+    if fetched is None or len(fetched[0]) < 40:
+        return reject("kline_insufficient")
+    _, vals, ind = fetched
+
+    c = vals[:, K_CLOSE]
+    h = vals[:, K_HIGH]
+    l = vals[:, K_LOW]
+    o = vals[:, K_OPEN]
+    v = vals[:, K_VOLUME]
+
+    # EMA20 / ATR / RSI14 incrementali dal KlineStore (stesse formule di ta)
+    ema20      = ind[:, IND_EMA20]
+    atr_series = ind[:, IND_ATR]
+    rsi_series = ind[:, IND_RSI]
+
+    # Ultima candela CHIUSA su 1h
+    last_close = float(c[-2])
+    last_open  = float(o[-2])
+    last_ema20 = float(ema20[-2])
+    last_rsi   = float(rsi_series[-2])
+    last_atr   = float(atr_series[-2])
+
+    if np.isnan(last_rsi) or np.isnan(last_atr) or last_atr <= 0:
+        return reject("invalid_rsi_or_atr")
+    if last_ema20 <= 0:
+        return reject("invalid_ema20")
+
+    last_idx = len(c) - 2
+    if last_idx - BASE_LOOKBACK_BARS < 0 or last_idx - 6 < 0:
+        return reject("kline_window_too_short")
+
+    adaptive = compute_adaptive_thresholds(d, c, h, l, v, atr_series, last_idx)
+
+    base_high = float(h[last_idx - BASE_LOOKBACK_BARS:last_idx].max())
+    base_low = float(l[last_idx - BASE_LOOKBACK_BARS:last_idx].min())
+    base_range_pct = (base_high - base_low) / last_close * 100 if last_close > 0 else 0.0
+    if base_range_pct > adaptive["base_max_pct"] and not top_mover:
+        return reject("base_too_wide")
+
+    # Candela di conferma: verde per LONG, rossa per SHORT.
+    wrong_candle = last_close <= last_open if is_long else last_close >= last_open
+    wrong_candle_reason = "not_green_candle" if is_long else "not_red_candle"
+    wrong_side_reason = "below_ema20" if is_long else "above_ema20"
+
+    if top_mover:
+        # Top 3 mover: entrata trend-following (già oltre la base da ore).
+        # Richiediamo trend ma evitiamo condizioni estreme di euforia / panic selling.
+        if s * (last_close - last_ema20) < 0:
+            return reject(wrong_side_reason)
+        if (last_rsi >= TOP_MOVER_RSI_MAX_LONG) if is_long else (last_rsi <= TOP_MOVER_RSI_MIN_SHORT):
+            return reject("rsi_out_of_range")
+        if wrong_candle:
+            return reject(wrong_candle_reason)
+    else:
+        # Rottura confermata: tolleranza minima su close se c'e' wick oltre la base.
+        close_tol = max(last_atr * BREAK_CONFIRM_ATR_TOL, last_close * BREAK_CONFIRM_PCT_TOL / 100.0)
+        if is_long:
+            broke_with_wick = float(h[last_idx]) > base_high
+            if not (last_close >= (base_high - close_tol) and broke_with_wick):
+                return reject("breakout_not_confirmed")
+        else:
+            broke_with_wick = float(l[last_idx]) < base_low
+            if not (last_close <= (base_low + close_tol) and broke_with_wick):
+                return reject("breakdown_not_confirmed")
+
+        if wrong_candle:
+            return reject(wrong_candle_reason)
+
+        # RSI in area costruttiva, evita inseguimento estremo.
+        if not (RSI_MIN_4H <= last_rsi <= RSI_MAX_4H):
+            return reject("rsi_out_of_range")
+
+    # Anti-chase: la rottura non deve essere troppo distante da EMA20.
+    dist_pct = s * (last_close - last_ema20) / last_ema20 * 100
+    if top_mover and dist_pct > TOP_MOVER_MAX_DIST_EMA_PCT:
+        return reject("top_mover_too_extended")
+    if not top_mover:
+        if dist_pct < 0:
+            return reject(wrong_side_reason)
+        if dist_pct > MAX_DIST_EMA:
+            return reject("distance_from_ema_too_high")
+
+    # Corpo minimo per evitare false rotture su candele deboli.
+    candle_range = float(h[-2]) - float(l[-2])
+    if candle_range > 0 and not top_mover:
+        body_pct = abs(last_close - last_open) / candle_range * 100
+        if body_pct < MIN_BODY_PCT:
+            return reject("body_too_small")
+
+    vol_avg = float(v[-22:-2].sum() / 20)      # Series.mean(): somma / n
+    vol_sig = float(v[-2])
+    rvol = (vol_sig / vol_avg) if vol_avg > 0 else 0.0
+    if rvol < adaptive["min_rvol"]:
+        return reject("volume_too_low")
+
+    chg_1h_pct = (last_close / float(c[-3]) - 1.0) * 100.0
+    chg_4h_pct = (last_close / float(c[-6]) - 1.0) * 100.0
+    if is_long:
+        if top_mover and chg_1h_pct > TOP_MOVER_MAX_CHG1H_PCT:
+            return reject("top_mover_momo_exhausted")
+        if top_mover and chg_4h_pct > TOP_MOVER_MAX_CHG4H_PCT:
+            return reject("top_mover_momo_exhausted")
+        if chg_1h_pct < adaptive["min_chg_1h"]:
+            return reject("chg1h_too_low")
+        if chg_4h_pct < adaptive["min_chg_4h"]:
+            return reject("chg4h_too_low")
+    else:
+        if top_mover and chg_1h_pct < TOP_MOVER_MIN_CHG1H_PCT:
+            return reject("top_mover_momo_exhausted")
+        if top_mover and chg_4h_pct < TOP_MOVER_MIN_CHG4H_PCT:
+            return reject("top_mover_momo_exhausted")
+        if chg_1h_pct > adaptive["max_chg_1h"]:
+            return reject("chg1h_not_negative_enough")
+        if chg_4h_pct > adaptive["max_chg_4h"]:
+            return reject("chg4h_not_negative_enough")
+
+    atr_pct = (last_atr / last_close * 100.0) if last_close > 0 else 0.0
+    if atr_pct <= 0:
+        return reject("invalid_atr_pct")
+    norm_move = (s * chg_1h_pct) / atr_pct
+    norm_std = adaptive["norm_std"]
+    norm_z = ((norm_move - adaptive["norm_mu"]) / norm_std) if norm_std > 1e-9 else 0.0
+    if norm_z < (ADAPTIVE_MIN_NORM_Z_LONG if is_long else ADAPTIVE_MIN_NORM_Z_SHORT):
+        return reject("norm_move_z_too_low")
+
+    # Slope EMA20: vogliamo trend locale già in accelerazione nel verso del trade.
+    ema20_3ago = float(ema20[last_idx - 3])
+    slope_pct = (last_ema20 - ema20_3ago) / ema20_3ago * 100 if ema20_3ago > 0 else 0.0
+    if REQUIRE_SLOPE_CONFIRMATION and s * slope_pct <= 0 and not top_mover:
+        return reject("ema20_slope_not_up" if is_long else "ema20_slope_not_down")
+
+    # SL: top mover usa ATR stretto oltre entry; altri usano l'estremo opposto della base.
+    if top_mover:
+        sl_price = last_close - s * TOP_MOVER_SL_ATR_MULT * last_atr
+    else:
+        base_ref = base_low if is_long else base_high
+        sl_price = base_ref - s * SL_BASE_ATR_BUFFER * last_atr
+    r_dist    = s * (last_close - sl_price)
+    sl_pct = r_dist / last_close * 100
+    if not top_mover and (sl_pct > MAX_SL_PCT or r_dist <= 0):
+        return reject("sl_too_wide_or_invalid")
+    if top_mover and r_dist <= 0:
+        return reject("sl_too_wide_or_invalid")
+
+    # Filtro qualità: richiede un reward/risk minimo già stimabile all'ingresso.
+    swing_start = max(0, last_idx - RR_SWING_LOOKBACK)
+    if is_long:
+        tp_ref = float(h[swing_start:last_idx].max()) if last_idx > swing_start else 0.0
+        tp_est = tp_ref if tp_ref > last_close else (last_close + FALLBACK_TP_ATR_MULT * last_atr)
+        reward_dist = tp_est - last_close
+    else:
+        tp_ref = float(l[swing_start:last_idx].min()) if last_idx > swing_start else 0.0
+        tp_est = tp_ref if (tp_ref > 0 and tp_ref < last_close) else (last_close - FALLBACK_TP_ATR_MULT * last_atr)
+        reward_dist = last_close - tp_est
+    if reward_dist <= 0:
+        return reject("rr_too_low")
+    rr_est = reward_dist / r_dist
+    if rr_est < MIN_RR_EST:
+        return reject("rr_too_low")
+
+    log(f"[SETUP-ANTI] {symbol}{d.tag} | base={base_range_pct:.2f}%<=<{adaptive['base_max_pct']:.2f}% "
+        f"rvol={rvol:.2f}>=<{adaptive['min_rvol']:.2f} "
+        f"chg1h={chg_1h_pct:+.2f}% chg4h={chg_4h_pct:+.2f}% "
+        f"normZ={norm_z:+.2f} RR={rr_est:.2f} dist={dist_pct:.2f}% RSI={last_rsi:.1f} slope={slope_pct:+.3f}%")
+
+    chg_keys = ("min_chg_1h", "min_chg_4h") if is_long else ("max_chg_1h", "max_chg_4h")
+    signal = {
+        "entry_price": last_close,
+        "sl_price":    sl_price,
+        "r_dist":      r_dist,
+        "atr":         last_atr,
+        "rsi":         last_rsi,
+        "ema20_4h":    last_ema20,
+        "dist_ema":    dist_pct,
+        "sl_pct":      sl_pct,
+        "ema20_slope": slope_pct,
+        "chg_1h":      chg_1h_pct,
+        "chg_4h":      chg_4h_pct,
+        "rvol":        rvol,
+        "base_range":  base_range_pct,
+        "min_rvol":    adaptive["min_rvol"],
+        "base_max":    adaptive["base_max_pct"],
+        "norm_z":      norm_z,
+        "rr_est":      rr_est,
+        "tp_est":      tp_est,
+    }
+    for key in chg_keys:
+        signal[key] = adaptive[key]
+    return signal
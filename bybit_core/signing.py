@@ -0,0 +1,117 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# SIGNING — firma HMAC-SHA256 delle richieste private Bybit v5
+#
+# Il contesto HMAC viene inizializzato una volta con la SECRET e copiato per
+# ogni richiesta (hmac.copy() evita di rielaborare la chiave); gli header
+# statici sono costruiti una volta sola. La query/il body si serializzano una
+# volta per richiesta logica: i retry su timestamp rifirmano soltanto. Il body
+# passa da un JSONEncoder costruito una volta: json.dumps con `separators` ne
+# crea uno nuovo a ogni chiamata.
+#
+# Benchmark: python -m bybit_core.signing (vecchio e nuovo alternati, minimo
+# su più ripetizioni)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import hashlib
+import hmac
+import json
+from urllib.parse import urlencode
+
+RECV_WINDOW = "30000"
+
+_BODY_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+def encode_query(params: dict) -> str:
+    """Query string canonica (chiavi ordinate), identica a quella firmata."""
+    return urlencode(sorted(params.items()))
+
+
+def encode_body(body: dict) -> bytes:
+    """Body JSON compatto: gli stessi byte vengono firmati e inviati."""
+    return _BODY_ENCODER.encode(body).encode()
+
+
+class Signer:
+    """Contesto di firma pre-chiavato per una coppia KEY/SECRET."""
+
+    def __init__(self, key: str, secret: str, recv_window: str = RECV_WINDOW):
+        self._base = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+        self._key_rw = f"{key}{recv_window}".encode()
+        self._get_headers = {"X-BAPI-API-KEY": key, "X-BAPI-RECV-WINDOW": recv_window}
+        self._post_headers = {**self._get_headers, "X-BAPI-SIGN-TYPE": "2",
+                              "Content-Type": "application/json"}
+
+    def sign(self, ts: str, payload: bytes) -> str:
+        mac = self._base.copy()
+        mac.update(ts.encode() + self._key_rw + payload)
+        return mac.hexdigest()
+
+    def get_headers(self, ts: str, query: bytes) -> dict:
+        headers = self._get_headers.copy()
+        headers["X-BAPI-SIGN"] = self.sign(ts, query)
+        headers["X-BAPI-TIMESTAMP"] = ts
+        return headers
+
+    def post_headers(self, ts: str, body: bytes) -> dict:
+        headers = self._post_headers.copy()
+        headers["X-BAPI-SIGN"] = self.sign(ts, body)
+        headers["X-BAPI-TIMESTAMP"] = ts
+        return headers
+
+
+def _bench(n: int = 20000, repeat: int = 15) -> None:
+    import timeit
+    key, secret = "K" * 18, "S" * 36
+    params = {"category": "linear", "settleCoin": "USDT", "limit": 200}
+    body = {"category": "linear", "symbol": "BTCUSDT", "side": "Buy",
+            "orderType": "Market", "qty": "0.001", "positionIdx": 1}
+    ts = "1700000000000"
+
+    def old_get():
+        qs = urlencode(sorted(params.items()))
+        sign = hmac.new(secret.encode(), f"{ts}{key}{RECV_WINDOW}{qs}".encode(),
+                        hashlib.sha256).hexdigest()
+        return {"X-BAPI-API-KEY": key, "X-BAPI-SIGN": sign,
+                "X-BAPI-TIMESTAMP": ts, "X-BAPI-RECV-WINDOW": RECV_WINDOW}
+
+    def old_post():
+        body_json = json.dumps(body, separators=(",", ":"))
+        sign = hmac.new(secret.encode(), f"{ts}{key}{RECV_WINDOW}{body_json}".encode(),
+                        hashlib.sha256).hexdigest()
+        return {"X-BAPI-API-KEY": key, "X-BAPI-SIGN": sign,
+                "X-BAPI-TIMESTAMP": ts, "X-BAPI-RECV-WINDOW": RECV_WINDOW,
+                "X-BAPI-SIGN-TYPE": "2", "Content-Type": "application/json"}
+
+    signer = Signer(key, secret)
+
+    def new_get():
+        return signer.get_headers(ts, encode_query(params).encode())
+
+    def new_post():
+        return signer.post_headers(ts, encode_body(body))
+
+    query_b, body_b = encode_query(params).encode(), encode_body(body)
+
+    def new_resign():
+        return signer.post_headers(ts, body_b), signer.get_headers(ts, query_b)
+
+    assert old_get() == new_get()
+    assert old_post() == new_post()
+    cases = (("GET  old", old_get), ("GET  new", new_get),
+             ("POST old", old_post), ("POST new", new_post),
+             ("retry new (GET+POST, payload già serializzato)", new_resign))
+    # Ripetizioni alternate: il rumore della macchina pesa allo stesso modo su tutte
+    best = {name: float("inf") for name, _ in cases}
+    for _ in range(repeat):
+        for name, fn in cases:
+            best[name] = min(best[name], timeit.timeit(fn, number=n) / n * 1e6)
+    for name, _ in cases:
+        print(f"{name:48s} {best[name]:6.2f} µs/req")
+    for op in ("GET ", "POST"):
+        old, new = best[f"{op} old"], best[f"{op} new"]
+        print(f"{op} nuovo/vecchio {new / old:5.2f}")
+
+
+if __name__ == "__main__":
+    _bench()
@@ -0,0 +1,200 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# MARKET STREAM — feed WebSocket pubblico Bybit (tickers + kline)
+#
+# Thread in background che sottoscrive tickers.<SYM> e kline.<INT>.<SYM> per
+# l'universo attivo e le posizioni aperte, e mantiene uno snapshot in memoria:
+#   - ticker: last/bid1/ask1/mark letti da get_last_price senza rete
+#   - kline:  le barre vengono spinte nel KlineStore (fetch_klines non fa REST)
+# Se lo stream è giù o non aggiornato, i bot tornano automaticamente al REST.
+# L'URL è configurabile: nei test il server locale tests/fake_bybit_ws.py
+# sostituisce Bybit.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+WS_PUBLIC_LINEAR_URL         = "wss://stream.bybit.com/v5/public/linear"
+WS_PUBLIC_LINEAR_URL_TESTNET = "wss://stream-testnet.bybit.com/v5/public/linear"
+
+PING_INTERVAL_SEC   = 20    # Bybit chiude la connessione senza heartbeat
+RECONNECT_DELAY_SEC = 5
+SUBSCRIBE_CHUNK     = 10    # topic per singolo messaggio di subscribe
+
+_TICKER_FIELDS = {"lastPrice": "price", "bid1Price": "bid1", "ask1Price": "ask1",
+                  "markPrice": "mark", "turnover24h": "turnover24h",
+                  "price24hPcnt": "price24hPcnt"}
+
+
+class MarketStream:
+    """Snapshot in memoria alimentato dal WebSocket pubblico linear."""
+
+    def __init__(self, url: str, kline_store=None,
+                 log: Callable[[str], None] = print, stale_sec: float = 30.0):
+        self.url = url
+        self._kline_store = kline_store
+        self._log = log
+        self._stale_sec = stale_sec
+        self._lock = threading.RLock()
+        self._tickers: dict = {}        # symbol -> {"price", "bid1", "ask1", "mark", ..., "ts"}
+        self._topics: set = set()       # topic desiderati
+        self._listeners: list = []      # callback(symbol, ticker) ad ogni update ticker
+        self._ws = None
+        self._connected = False
+        self._last_msg_ts = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ── API pubblica ──────────────────────────────────────────────────────────
+    def start(self) -> bool:
+        try:
+            import websocket  # noqa: F401  (websocket-client)
+        except ImportError:
+            self._log("[STREAM] websocket-client non installato — resto su REST")
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="market-stream")
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def add_listener(self, fn: Callable[[str, dict], None]) -> None:
+        self._listeners.append(fn)
+
+    def is_fresh(self) -> bool:
+        return self._connected and time.time() - self._last_msg_ts <= self._stale_sec
+
+    def get_ticker(self, symbol: str) -> Optional[dict]:
+        """Ticker dallo snapshot se aggiornato entro stale_sec, altrimenti None."""
+        with self._lock:
+            t = self._tickers.get(symbol)
+            if not t or not self._connected:
+                return None
+            if time.time() - t["ts"] > self._stale_sec or not t.get("price"):
+                return None
+            return dict(t)
+
+    def set_subscriptions(self, tickers: Iterable[str],
+                          klines: Optional[dict] = None) -> None:
+        """
+        Imposta l'insieme dei topic: tickers.<SYM> per `tickers`,
+        kline.<INT>.<SYM> per ogni {interval: symbols} in `klines`.
+        Invia solo le differenze rispetto alle sottoscrizioni correnti.
+        """
+        wanted = {f"tickers.{s}" for s in tickers}
+        for interval, symbols in (klines or {}).items():
+            wanted |= {f"kline.{interval}.{s}" for s in symbols}
+        with self._lock:
+            added   = sorted(wanted - self._topics)
+            removed = sorted(self._topics - wanted)
+            self._topics = wanted
+            for topic in removed:
+                if topic.startswith("tickers."):
+                    self._tickers.pop(topic.split(".", 1)[1], None)
+        if self._connected:
+            self._send_op("unsubscribe", removed)
+            self._send_op("subscribe", added)
+
+    # ── Connessione ───────────────────────────────────────────────────────────
+    def _run(self) -> None:
+        import websocket
+        while not self._stop.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=lambda _ws, err: self._log(f"[STREAM] errore: {err}"),
+                on_close=self._on_close,
+            )
+            try:
+                self._ws.run_forever()
+            except Exception as e:
+                self._log(f"[STREAM] exc: {e}")
+            self._connected = False
+            if self._stop.wait(RECONNECT_DELAY_SEC):
+                break
+
+    def _on_open(self, _ws) -> None:
+        self._connected = True
+        self._last_msg_ts = time.time()
+        with self._lock:
+            topics = sorted(self._topics)
+        self._log(f"[STREAM] connesso {self.url} — {len(topics)} topic")
+        self._send_op("subscribe", topics)
+        threading.Thread(target=self._heartbeat, args=(_ws,), daemon=True).start()
+
+    def _on_close(self, _ws, *_args) -> None:
+        self._connected = False
+        self._log("[STREAM] disconnesso")
+
+    def _heartbeat(self, ws) -> None:
+        while self._connected and self._ws is ws and not self._stop.wait(PING_INTERVAL_SEC):
+            try:
+                ws.send(json.dumps({"op": "ping"}))
+            except Exception:
+                return
+
+    def _send_op(self, op: str, topics: list) -> None:
+        ws = self._ws
+        if not topics or ws is None:
+            return
+        for i in range(0, len(topics), SUBSCRIBE_CHUNK):
+            try:
+                ws.send(json.dumps({"op": op, "args": topics[i:i + SUBSCRIBE_CHUNK]}))
+            except Exception as e:
+                self._log(f"[STREAM] {op} fallita: {e}")
+                return
+
+    # ── Messaggi ──────────────────────────────────────────────────────────────
+    def _on_message(self, _ws, raw: str) -> None:
+        self._last_msg_ts = time.time()
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            return
+        topic = msg.get("topic") or ""
+        if topic.startswith("tickers."):
+            self._handle_ticker(topic.split(".", 1)[1], msg.get("data") or {})
+        elif topic.startswith("kline."):
+            _, interval, symbol = topic.split(".", 2)
+            self._handle_kline(symbol, interval, msg.get("data") or [])
+        elif msg.get("op") == "subscribe" and msg.get("success") is False:
+            self._log(f"[STREAM] subscribe rifiutata: {msg.get('ret_msg')}")
+
+    def _handle_ticker(self, symbol: str, data: dict) -> None:
+        # Il primo messaggio è uno snapshot, i successivi delta con i soli campi cambiati.
+        with self._lock:
+            t = self._tickers.setdefault(symbol, {})
+            for src, dst in _TICKER_FIELDS.items():
+                val = data.get(src)
+                if val not in (None, ""):
+                    try:
+                        t[dst] = float(val)
+                    except (TypeError, ValueError):
+                        pass
+            t["ts"] = time.time()
+            snap = dict(t)
+        for fn in self._listeners:
+            try:
+                fn(symbol, snap)
+            except Exception as e:
+                self._log(f"[STREAM] listener exc: {e}")
+
+    def _handle_kline(self, symbol: str, interval: str, bars: list) -> None:
+        if self._kline_store is None:
+            return
+        for b in bars:
+            try:
+                vals = [float(b["open"]), float(b["high"]), float(b["low"]),
+                        float(b["close"]), float(b["volume"]), float(b["turnover"])]
+                self._kline_store.apply_bar(symbol, interval, int(b["start"]), vals)
+            except (KeyError, TypeError, ValueError):
+                continue
@@ -0,0 +1,123 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# TICKERS — snapshot colonnare di /v5/market/tickers (linear)
+#
+# Una sola chiamata per l'intero universo: la lista diventa un indice
+# symbol → riga con colonne float (array 'd'). Lo stesso snapshot
+# alimenta la scan (ranking gainers/losers) e, finché è recente, i lookup di
+# prezzo/bid/ask di get_last_price senza ulteriori richieste per simbolo.
+# I numeri di una riga si convertono solo quando servono: la scan legge i soli
+# simboli ammessi (bybit_core.universe), i lookup di prezzo la riga richiesta.
+# movers() seleziona top gainers e top losers con heapq (O(n log k), nessun
+# ordinamento completo) e li tiene per snapshot: con LONG e SHORT attivi la
+# selezione si fa una volta per entrambi.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import heapq
+import time
+from array import array
+from typing import Optional
+
+_NAN = float("nan")
+
+# colonna → campo Bybit
+_COLUMNS = (
+    ("last",        "lastPrice"),
+    ("bid1",        "bid1Price"),
+    ("ask1",        "ask1Price"),
+    ("mark",        "markPrice"),
+    ("turnover24h", "turnover24h"),
+    ("pcnt24h",     "price24hPcnt"),
+)
+
+
+def _f(v) -> float:
+    """Campo numerico Bybit: "" / None → 0.0 (come `or 0`), non numerico → NaN."""
+    try:
+        return float(v or 0)
+    except (TypeError, ValueError):
+        return _NAN
+
+
+class TickerSnapshot:
+    """Ticker linear in colonne: `symbols[i]` e `last[i]`, `bid1[i]`, ... della stessa riga."""
+
+    __slots__ = ("ts", "symbols", "index", "last", "bid1", "ask1", "mark",
+                 "turnover24h", "pcnt24h", "_rows", "_parsed", "_selected", "_movers")
+
+    def __init__(self, rows: list, ts: Optional[float] = None):
+        self.ts = time.time() if ts is None else ts
+        self.symbols = [t.get("symbol", "") for t in rows]
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        n = len(rows)
+        for col, _ in _COLUMNS:
+            setattr(self, col, array("d", [_NAN]) * n)
+        self._rows = rows
+        self._parsed = bytearray(n)
+        self._selected: dict = {}
+        self._movers: dict = {}
+
+    def _parse(self, i: int) -> None:
+        """Converte la riga i nelle colonne (una volta sola)."""
+        if self._parsed[i]:
+            return
+        t = self._rows[i]
+        for col, field in _COLUMNS:
+            getattr(self, col)[i] = _f(t.get(field))
+        self._parsed[i] = 1
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.time() if now is None else now) - self.ts
+
+    def row(self, symbol: str) -> Optional[int]:
+        return self.index.get(symbol)
+
+    def quote(self, symbol: str) -> Optional[dict]:
+        """{"price", "bid1", "ask1", "mark"} del simbolo; None se assente o senza prezzo."""
+        i = self.index.get(symbol)
+        if i is None:
+            return None
+        self._parse(i)
+        price = self.last[i]
+        if not price > 0:
+            return None
+        bid1, ask1 = self.bid1[i], self.ask1[i]
+        return {"price": price,
+                "bid1": bid1 if bid1 > 0 else price,
+                "ask1": ask1 if ask1 > 0 else price,
+                "mark": self.mark[i] if self.mark[i] > 0 else price}
+
+    def rows_in(self, symbols: frozenset) -> tuple:
+        """
+        Righe (in ordine di snapshot) dei simboli in `symbols`, con i numeri
+        già convertiti. Calcolate una volta per snapshot e insieme di simboli.
+        """
+        rows = self._selected.get(symbols)
+        if rows is None:
+            rows = tuple(i for i, sym in enumerate(self.symbols) if sym in symbols)
+            for i in rows:
+                self._parse(i)
+            self._selected[symbols] = rows
+        return rows
+
+    def movers(self, symbols: frozenset, k: int, min_turnover: float) -> tuple:
+        """
+        (gainers, losers): le prime `k` righe per variazione 24h tra i simboli
+        ammessi con turnover ≥ `min_turnover` e prezzo valido. Gainers: chg24h
+        decrescente, poi volume; losers: chg24h crescente, poi volume.
+        Stesso ordine (anche sui pari-merito) di un sort completo.
+        """
+        key = (symbols, k, min_turnover)
+        hit = self._movers.get(key)
+        if hit is not None:
+            return hit
+        last, turnover, pcnt = self.last, self.turnover24h, self.pcnt24h
+        # NaN (campo non numerico) non supera nessun confronto
+        rows = [i for i in self.rows_in(symbols)
+                if turnover[i] >= min_turnover and last[i] > 0 and pcnt[i] == pcnt[i]]
+        gainers = heapq.nlargest(k, rows, key=lambda i: (pcnt[i] * 100.0, turnover[i]))
+        losers = heapq.nsmallest(k, rows, key=lambda i: (pcnt[i] * 100.0, -turnover[i]))
+        self._movers[key] = (gainers, losers)
+        return gainers, losers
@@ -0,0 +1,165 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# TRAILING — logica pura di gestione SL/uscite di una posizione
+#
+# Nessun I/O: (stato posizione, prezzo, ATR) → decisioni. Il driver nel bot
+# (Bot.trailing_worker) le applica: sposta lo SL su Bybit, chiude, notifica.
+# La stessa logica gira su ogni update di prezzo dello stream, sul timer di
+# fallback e nelle verifiche offline.
+#
+#   plan_stop:  water mark + miglior SL tra ratchet floor e ATR trail
+#   plan_exit:  time stop o partial TP (dopo aver applicato il piano SL)
+#
+# La RATCHET_TABLE diventa, per ogni entry, una scala di prezzi assoluti
+# (RatchetLadder): trigger e floor si calcolano una volta all'apertura e a ogni
+# tick basta un bisect sul prezzo. La scala dipende solo da entry e verso,
+# quindi un drift dell'avgPrice ne crea una nuova. La stessa scala simula il
+# ratchet nei backtest.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Optional
+
+from bybit_core.config import (
+    DEFAULT_LEVERAGE, PARTIAL_TP_R, RATCHET_TABLE, TIME_STOP_DAYS,
+    TIME_STOP_MIN_LEV, TRAIL_ATR_MULT,
+)
+
+TIME_STOP    = "time_stop"
+PARTIAL_TP   = "partial_tp"
+
+
+class StopPlan:
+    """Esito di plan_stop: water mark aggiornato e, se migliora, il nuovo SL."""
+
+    __slots__ = ("pnl_lev", "water", "new_sl", "floor_lev", "floor_price",
+                 "trail_price", "atr", "check_exits")
+
+    def __init__(self, pnl_lev: float, water: float, new_sl: Optional[float],
+                 floor_lev: Optional[float], floor_price: float,
+                 trail_price: float, atr: float, check_exits: bool = True):
+        self.pnl_lev = pnl_lev
+        self.water = water
+        self.new_sl = new_sl            # None: SL invariato
+        self.floor_lev = floor_lev      # floor ratchet raggiunto (None: nessuno)
+        self.floor_price = floor_price
+        self.trail_price = trail_price
+        self.atr = atr
+        # SHORT senza ratchet né ATR trail: time stop e partial TP non si valutano
+        # (comportamento storico del bot SHORT, mantenuto)
+        self.check_exits = check_exits
+
+    def atr_tighter(self, sign: int) -> bool:
+        """True se lo SL proposto viene dall'ATR trail (più stretto del ratchet)."""
+        return sign * (self.trail_price - self.floor_price) > 0
+
+
+def pnl_lev(d, entry_price: float, price: float) -> float:
+    """P&L leveraged (%) positivo nel verso del trade."""
+    return d.sign * (price - entry_price) / entry_price * 100.0 * DEFAULT_LEVERAGE
+
+
+class RatchetLadder:
+    """RATCHET_TABLE in prezzi assoluti per una entry: trigger e floor per livello."""
+
+    __slots__ = ("entry_price", "sign", "trigger_prices", "floor_prices",
+                 "floor_levs", "_keys", "_no_level")
+
+    def __init__(self, entry_price: float, sign: int,
+                 table=RATCHET_TABLE, leverage: float = DEFAULT_LEVERAGE):
+        self.entry_price = entry_price
+        self.sign = sign
+        self.trigger_prices = [entry_price * (1.0 + sign * t / 100.0 / leverage)
+                               for t, _ in table]
+        self.floor_prices = [entry_price * (1.0 + sign * f / 100.0 / leverage)
+                             for _, f in table]
+        self.floor_levs = [f for _, f in table]
+        # Chiavi crescenti per il bisect: prezzo (LONG) o −prezzo (SHORT)
+        self._keys = [sign * p for p in self.trigger_prices]
+        self._no_level = 0.0 if sign > 0 else float("inf")
+
+    def level(self, price: float) -> int:
+        """Indice dell'ultimo trigger raggiunto da `price` (−1: nessuno)."""
+        return bisect_right(self._keys, self.sign * price) - 1
+
+    def floor(self, price: float) -> tuple:
+        """(floor_lev, floor_price) dell'ultimo trigger raggiunto; (None, nessun livello) sotto il primo."""
+        i = self.level(price)
+        if i < 0:
+            return None, self._no_level
+        return self.floor_levs[i], self.floor_prices[i]
+
+
+@lru_cache(maxsize=512)
+def ladder_for(entry_price: float, sign: int) -> RatchetLadder:
+    """Scala della posizione: costruita una volta per (entry, verso), poi solo lookup."""
+    return RatchetLadder(entry_price, sign)
+
+
+def plan_stop(d, entry: dict, price: float, atr: Optional[float]) -> StopPlan:
+    """
+    Ratchet floor garantito: entry × (1 ± floor_lev/100/lev); ATR trail:
+    water ∓ TRAIL_ATR_MULT×ATR(4h), solo con trailing_active. Lo SL proposto è
+    il migliore dei due e solo se migliora quello corrente nel verso del profitto.
+    """
+    s = d.sign
+    entry_price = float(entry.get("entry_price", 0))
+    pnl = pnl_lev(d, entry_price, price)
+    water = (max if d.is_long else min)(price, float(entry.get(d.water_key, price)))
+    no_level = 0.0 if d.is_long else float("inf")
+
+    floor_lev, floor_price = ladder_for(entry_price, s).floor(price)
+
+    trail_price = no_level
+    atr_val = 0.0
+    if entry.get("trailing_active") and atr and atr > 0:
+        atr_val = atr
+        trail_price = water - s * TRAIL_ATR_MULT * atr
+
+    if d.is_long:
+        cand = max(floor_price, trail_price)
+        current_sl = float(entry.get("sl_price", 0))
+        improves = cand > current_sl * 1.0005
+    else:
+        if floor_price == no_level and trail_price == no_level:
+            # Entrambi infiniti → niente da fare (pnl sotto il primo trigger)
+            return StopPlan(pnl, water, None, floor_lev, floor_price, trail_price, atr_val,
+                            check_exits=False)
+        cand = min(floor_price, trail_price)
+        current_sl = float(entry.get("sl_price", float("inf")))
+        # SL scende e rimane almeno 0.1% sopra il prezzo
+        improves = cand < current_sl * 0.9995 and cand > price * 1.001
+    return StopPlan(pnl, water, cand if improves else None,
+                    floor_lev, floor_price, trail_price, atr_val)
+
+
+def apply_stop(entry: dict, plan: StopPlan) -> None:
+    """Stato dopo uno spostamento SL riuscito su Bybit."""
+    entry["sl_price"] = plan.new_sl
+    entry["breakeven_active"] = True
+    if plan.floor_lev is not None:
+        entry["trailing_active"] = True   # abilita partial TP
+
+
+def plan_exit(d, entry: dict, price: float, pnl: float,
+              now: Optional[float] = None) -> Optional[str]:
+    """
+    TIME_STOP: trade coricato dopo TIME_STOP_DAYS, sotto TIME_STOP_MIN_LEV e
+    attorno al breakeven. PARTIAL_TP: trailing attivo e prezzo a PARTIAL_TP_R × R
+    originale. None se non c'è nulla da fare.
+    """
+    now = time.time() if now is None else now
+    entry_price = float(entry.get("entry_price", 0))
+    days_open = (now - float(entry.get("entry_time", now))) / 86400
+    at_breakeven = (price >= entry_price * 0.999 if d.is_long
+                    else price <= entry_price * 1.001)
+    if days_open >= TIME_STOP_DAYS and pnl < TIME_STOP_MIN_LEV and at_breakeven:
+        return TIME_STOP
+    if entry.get("trailing_active") and not entry.get("partial_tp_active"):
+        orig_r_dist = float(entry.get("orig_r_dist") or entry.get("r_dist", 0))
+        if orig_r_dist > 0:
+            trigger = entry_price + d.sign * PARTIAL_TP_R * orig_r_dist
+            if d.reached(price, trigger):
+                return PARTIAL_TP
+    return None
@@ -0,0 +1,151 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# UNIVERSE — simboli ammessi alla scan
+#
+# L'idoneità di un simbolo (quote USDT, EXCLUDE_SUBSTRINGS, EXCLUDE_SYMBOLS,
+# simboli rifiutati da Bybit) cambia di rado: si calcola una volta sulla lista
+# strumenti e si ricalcola solo quando cambia la lista, il filtro o la
+# blocklist. La scan legge i ticker solo dei simboli ammessi.
+#
+# La blocklist (retCode 110125/110126) è persistita su disco con il timestamp
+# del rifiuto: al riavvio non si ritenta subito lo stesso simbolo e dopo
+# `ttl_sec` il blocco scade (il simbolo può tornare negoziabile). Anche la
+# scadenza cambia la versione: il simbolo rientra nell'universo alla scan dopo.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+_INF = float("inf")
+
+
+class SymbolFilter:
+    """Esclusioni precompilate: quote richiesta, sottostringhe (una regex), simboli."""
+
+    __slots__ = ("quote", "_substr_re", "_symbols")
+
+    def __init__(self, quote: str = "USDT", substrings: Iterable[str] = (),
+                 symbols: Iterable[str] = ()):
+        self.quote = quote
+        subs = [s for s in substrings if s]
+        self._substr_re = re.compile("|".join(map(re.escape, subs))) if subs else None
+        self._symbols = frozenset(symbols)
+
+    def accepts(self, symbol: str) -> bool:
+        if not symbol.endswith(self.quote) or symbol in self._symbols:
+            return False
+        return self._substr_re is None or self._substr_re.search(symbol) is None
+
+
+class Blocklist:
+    """Simboli rifiutati da Bybit per una direzione: symbol → ts del blocco, su disco."""
+
+    def __init__(self, path: Optional[str], ttl_sec: float,
+                 log: Callable[[str], None] = print,
+                 clock: Callable[[], float] = time.time):
+        self._path = path or None
+        self._ttl_sec = ttl_sec
+        self._log = log
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._blocked: dict = {}
+        self._next_expiry = _INF   # prima scadenza tra i blocchi presenti
+        self.version = 0        # cambia a ogni modifica o scadenza: invalida le cache dell'universo
+
+    def load(self) -> int:
+        """Rilegge il file scartando i blocchi scaduti; ritorna quanti restano."""
+        if not self._path:
+            return 0
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                saved = json.load(f)
+            blocked = {str(sym): float(ts) for sym, ts in saved.items()}
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self._log(f"[BLOCK] lettura {self._path} fallita: {e}")
+            return 0
+        cutoff = self._clock() - self._ttl_sec
+        with self._lock:
+            self._blocked = {sym: ts for sym, ts in blocked.items() if ts > cutoff}
+            self._next_expiry = min(self._blocked.values(), default=_INF) + self._ttl_sec
+            self.version += 1
+            return len(self._blocked)
+
+    def add(self, symbol: str) -> None:
+        with self._lock:
+            now = self._clock()
+            self._blocked[symbol] = now
+            self._next_expiry = min(self._next_expiry, now + self._ttl_sec)
+            self.version += 1
+        self._save()
+
+    def revision(self) -> int:
+        """Versione corrente, dopo aver scartato i blocchi scaduti (che la incrementano)."""
+        now = self._clock()
+        with self._lock:
+            if now >= self._next_expiry:
+                cutoff = now - self._ttl_sec
+                self._blocked = {sym: ts for sym, ts in self._blocked.items() if ts > cutoff}
+                self._next_expiry = min(self._blocked.values(), default=_INF) + self._ttl_sec
+                self.version += 1
+            return self.version
+
+    def __contains__(self, symbol: str) -> bool:
+        ts = self._blocked.get(symbol)
+        return ts is not None and self._clock() - ts < self._ttl_sec
+
+    def __len__(self) -> int:
+        return len(self._blocked)
+
+    def active(self) -> frozenset:
+        """Simboli con blocco non scaduto."""
+        cutoff = self._clock() - self._ttl_sec
+        with self._lock:
+            return frozenset(sym for sym, ts in self._blocked.items() if ts > cutoff)
+
+    def _save(self) -> None:
+        if not self._path:
+            return
+        with self._lock:
+            payload = dict(self._blocked)
+            tmp = f"{self._path}.tmp"
+            try:
+                d = os.path.dirname(self._path)
+                if d:
+                    os.makedirs(d, exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, separators=(",", ":"))
+                os.replace(tmp, self._path)
+            except OSError as e:
+                self._log(f"[BLOCK] salvataggio {self._path} fallito: {e}")
+
+
+class EligibleUniverse:
+    """Cache dei simboli ammessi: si ricalcola solo se cambia lista, filtro o blocklist."""
+
+    def __init__(self, flt: SymbolFilter, blocklist: Blocklist):
+        self.filter = flt
+        self.blocklist = blocklist
+        self._key: Optional[tuple] = None
+        self._eligible: frozenset = frozenset()
+        self.rebuilds = 0
+
+    def get(self, source_version, symbols: Iterable[str]) -> frozenset:
+        """
+        Simboli di `symbols` ammessi. `source_version` identifica la lista
+        (versione dell'indice strumenti): finché non cambia, e non cambiano
+        filtro e blocklist, ritorna lo stesso frozenset senza ricalcolare.
+        """
+        key = (source_version, id(self.filter), self.blocklist.revision())
+        if key != self._key:
+            flt = self.filter
+            blocked = self.blocklist.active()
+            self._eligible = frozenset(sym for sym in symbols
+                                       if flt.accepts(sym) and sym not in blocked)
+            self._key = key
+            self.rebuilds += 1
+        return self._eligible
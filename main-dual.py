@@ -0,0 +1,17 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# RUNNER DUAL: bot LONG (main-pullback.py) + bot SHORT (main-short-pullback.py)
+# in un solo processo
+#
+# Alternativa ai due servizi Railway separati:
+#   - un solo snapshot /v5/market/tickers per scan e una sola cache kline/ATR
+#   - un solo snapshot posizioni e wallet, un solo feed WS, un solo budget
+#     di rate limit per la API key
+#   - posizioni, circuit breaker e cooldown restano per direzione
+#   - MAX_TOTAL_OPEN_RISK_PCT vale sul rischio aperto LONG + SHORT
+# Non va avviato insieme ai due servizi singoli (gestirebbero le stesse posizioni).
+# ─────────────────────────────────────────────────────────────────────────────
+
+from bybit_core.engine import LONG, SHORT, run_all
+
+if __name__ == "__main__":
+    run_all([LONG, SHORT])
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# I test importano bybit_core dalla radice del repo (nessun pacchetto installato).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class KlineSession:
+    """
+    Sessione HTTP minima per KlineStore: /v5/market/kline da barre in memoria
+    (`rows` come Bybit, più recente prima). Onora `start` come Bybit: solo le
+    barre con open time ≥ start, le `limit` più recenti.
+    """
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.requests: list = []   # params di ogni chiamata
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append(dict(params))
+        rows = self.rows
+        if "start" in params:
+            rows = [r for r in rows if int(r[0]) >= params["start"]]
+        rows = rows[:params["limit"]]
+        return type("Resp", (), {"json": lambda _self: {"retCode": 0, "result": {"list": rows}}})()
+
+
+@pytest.fixture
+def kline_session():
+    """Costruttore di KlineSession: kline_session(rows)."""
+    return KlineSession
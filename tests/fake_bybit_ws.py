@@ -0,0 +1,244 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# FAKE BYBIT WS — server WebSocket locale che sostituisce stream.bybit.com
+#
+# Solo libreria standard (socket + thread): handshake RFC 6455, frame testo
+# lato server, frame mascherati lato client, ping/pong e close. Risponde come
+# Bybit a {"op": "ping"}, {"op": "subscribe"/"unsubscribe"} e, se ha una
+# SECRET, verifica {"op": "auth"} (firma di "GET/realtime{expires}" e expires
+# non scaduto rispetto al proprio orologio `clock_ms`).
+#
+# I test spingono i messaggi con push(), leggono quelli ricevuti con
+# wait_for() e simulano una disconnessione con drop().
+# ─────────────────────────────────────────────────────────────────────────────
+
+import base64
+import hashlib
+import hmac
+import json
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Optional
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _recv_exact(conn: socket.socket, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = conn.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connessione chiusa")
+        buf += chunk
+    return buf
+
+
+def _frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return head + payload
+
+
+def _read_frame(conn: socket.socket) -> tuple:
+    b0, b1 = _recv_exact(conn, 2)
+    opcode, n = b0 & 0x0F, b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", _recv_exact(conn, 2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", _recv_exact(conn, 8))[0]
+    mask = _recv_exact(conn, 4) if b1 & 0x80 else b"\0\0\0\0"
+    data = _recv_exact(conn, n)
+    return opcode, bytes(c ^ mask[i % 4] for i, c in enumerate(data))
+
+
+class _Conn:
+    """Una connessione client accettata."""
+
+    def __init__(self, sock: socket.socket, n: int):
+        self.sock = sock
+        self.n = n                   # progressivo della connessione (1, 2, ...)
+        self.authed = False
+        self._send_lock = threading.Lock()
+
+    def send(self, obj) -> None:
+        raw = obj if isinstance(obj, str) else json.dumps(obj)
+        with self._send_lock:
+            self.sock.sendall(_frame(0x1, raw.encode()))
+
+    def close(self) -> None:
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class FakeBybitWS:
+    """Server WebSocket locale con il protocollo op/topic di Bybit v5."""
+
+    def __init__(self, secret: Optional[str] = None,
+                 clock_ms: Callable[[], int] = lambda: int(time.time() * 1000)):
+        self.secret = secret
+        self.clock_ms = clock_ms
+        self.received: list = []     # (n connessione, messaggio JSON) in ordine di arrivo
+        self.connections = 0
+        self._conns: list = []
+        self._cond = threading.Condition()
+        self._sock = socket.create_server(("127.0.0.1", 0))
+        self.url = f"ws://127.0.0.1:{self._sock.getsockname()[1]}"
+        self._stop = False
+        threading.Thread(target=self._accept, daemon=True, name="fake-bybit-ws").start()
+
+    # ── API per i test ────────────────────────────────────────────────────────
+    def close(self) -> None:
+        self._stop = True
+        self._sock.close()
+        self.drop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.close()
+
+    def push(self, obj) -> None:
+        """Invia `obj` all'ultima connessione aperta."""
+        with self._cond:
+            conn = self._conns[-1]
+        conn.send(obj)
+
+    def drop(self) -> None:
+        """Chiude bruscamente le connessioni aperte (il client vede una disconnessione)."""
+        with self._cond:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+
+    def wait_for(self, pred: Callable[[dict], bool], timeout: float = 5.0,
+                 since: int = 0) -> dict:
+        """Primo messaggio ricevuto (dall'indice `since`) che soddisfa `pred`."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                for _, msg in self.received[since:]:
+                    if pred(msg):
+                        return msg
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError("messaggio atteso non ricevuto")
+                self._cond.wait(remaining)
+
+    def wait_connections(self, n: int, timeout: float = 5.0) -> None:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.connections >= n, timeout):
+                raise TimeoutError(f"{n} connessioni attese, {self.connections} ricevute")
+
+    def ops(self, op: str) -> list:
+        """Messaggi ricevuti con {"op": op}."""
+        with self._cond:
+            return [m for _, m in self.received if m.get("op") == op]
+
+    # ── Server ────────────────────────────────────────────────────────────────
+    def _accept(self) -> None:
+        while not self._stop:
+            try:
+                sock, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _handshake(self, sock: socket.socket) -> None:
+        req = b""
+        while b"\r\n\r\n" not in req:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("handshake interrotto")
+            req += chunk
+        headers = {}
+        for line in req.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        accept = base64.b64encode(
+            hashlib.sha1((headers["sec-websocket-key"] + _GUID).encode()).digest()).decode()
+        sock.sendall(("HTTP/1.1 101 Switching Protocols\r\n"
+                      "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+    def _serve(self, sock: socket.socket) -> None:
+        try:
+            self._handshake(sock)
+        except (OSError, ConnectionError, KeyError):
+            sock.close()
+            return
+        with self._cond:
+            self.connections += 1
+            conn = _Conn(sock, self.connections)
+            self._conns.append(conn)
+            self._cond.notify_all()
+        try:
+            while True:
+                opcode, data = _read_frame(sock)
+                if opcode == 0x8:                       # close
+                    with conn._send_lock:
+                        sock.sendall(_frame(0x8, data[:2]))
+                    break
+                if opcode == 0x9:                       # ping di controllo
+                    with conn._send_lock:
+                        sock.sendall(_frame(0xA, data))
+                    continue
+                if opcode != 0x1:
+                    continue
+                msg = json.loads(data.decode())
+                with self._cond:
+                    self.received.append((conn.n, msg))
+                    self._cond.notify_all()
+                self._reply(conn, msg)
+        except (OSError, ConnectionError, ValueError):
+            pass
+        finally:
+            with self._cond:
+                if conn in self._conns:
+                    self._conns.remove(conn)
+            conn.close()
+
+    def _reply(self, conn: _Conn, msg: dict) -> None:
+        op = msg.get("op")
+        if op == "ping":
+            conn.send({"success": True, "ret_msg": "pong", "op": "ping"})
+        elif op == "auth":
+            ok, err = self._check_auth(msg.get("args") or [])
+            conn.authed = ok
+            conn.send({"success": ok, "ret_msg": err, "op": "auth", "conn_id": str(conn.n)})
+        elif op in ("subscribe", "unsubscribe"):
+            if self.secret is not None and not conn.authed:
+                conn.send({"success": False, "ret_msg": "Request not authorized", "op": op})
+            else:
+                conn.send({"success": True, "ret_msg": "", "op": op, "conn_id": str(conn.n)})
+
+    def _check_auth(self, args: list) -> tuple:
+        if self.secret is None or len(args) != 3:
+            return False, "Params Error"
+        _key, expires, sig = args
+        want = hmac.new(self.secret.encode(), f"GET/realtime{expires}".encode(),
+                        hashlib.sha256).hexdigest()
+        if int(expires) <= self.clock_ms():
+            return False, "Params Error: expires is smaller than current time"
+        if not hmac.compare_digest(want, str(sig)):
+            return False, "Error sign"
+        return True, ""
+
+
+def wait_until(pred: Callable[[], bool], timeout: float = 5.0, step: float = 0.01) -> None:
+    """Attende che `pred()` diventi vera (stato aggiornato dal thread del client)."""
+    deadline = time.time() + timeout
+    while not pred():
+        if time.time() > deadline:
+            raise TimeoutError("condizione non raggiunta")
+        time.sleep(step)
@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bybit_core.adaptive import adaptive_histories
+from bybit_core.config import (
+    ADAPTIVE_BASE_MAX_PCT, ADAPTIVE_BASE_MIN_PCT, ADAPTIVE_BASE_WIDTH_PCTL,
+    ADAPTIVE_LOOKBACK_BARS, ADAPTIVE_MOM_PCTL_LONG, ADAPTIVE_MOM_PCTL_SHORT,
+    ADAPTIVE_RVOL_MAX, ADAPTIVE_RVOL_MIN, ADAPTIVE_RVOL_PCTL, BASE_LOOKBACK_BARS,
+    MAX_CHG_1H_PCT, MAX_CHG_1H_PCT_CEIL, MAX_CHG_1H_PCT_FLOOR, MAX_CHG_4H_PCT,
+    MAX_CHG_4H_PCT_CEIL, MAX_CHG_4H_PCT_FLOOR, MAX_DIST_EMA, MIN_CHG_1H_PCT,
+    MIN_CHG_1H_PCT_FLOOR, MIN_CHG_4H_PCT, MIN_CHG_4H_PCT_FLOOR, MIN_VOL_RATIO,
+)
+from bybit_core.direction import LONG, SHORT
+from bybit_core.signals import compute_adaptive_thresholds
+
+
+# ── Riferimento: implementazione a cicli dei bot prima della vettorizzazione ──
+def _ref_histories(c, h, l, v, atr_series, last_idx, sign):
+    lookback = max(24, min(ADAPTIVE_LOOKBACK_BARS, last_idx - 6))
+
+    base_hist = []
+    base_start_j = max(BASE_LOOKBACK_BARS, last_idx - lookback + 1)
+    for j in range(base_start_j, last_idx + 1):
+        close_j = float(c.iloc[j])
+        if close_j <= 0:
+            continue
+        bh = float(h.iloc[j - BASE_LOOKBACK_BARS:j].max())
+        bl = float(l.iloc[j - BASE_LOOKBACK_BARS:j].min())
+        base_hist.append((bh - bl) / close_j * 100.0)
+
+    rvol_hist = []
+    rvol_start_j = max(22, last_idx - lookback + 1)
+    for j in range(rvol_start_j, last_idx + 1):
+        vol_avg = float(v.iloc[j - 20:j].mean())
+        if vol_avg <= 0:
+            continue
+        rvol_hist.append(float(v.iloc[j]) / vol_avg)
+
+    chg1h_hist = (c.pct_change(1) * 100.0).iloc[max(1, last_idx - lookback + 1):last_idx + 1]
+    chg4h_hist = (c.pct_change(4) * 100.0).iloc[max(4, last_idx - lookback + 1):last_idx + 1]
+    chg1h_vals = [float(x) for x in chg1h_hist.dropna().tolist()]
+    chg4h_vals = [float(x) for x in chg4h_hist.dropna().tolist()]
+
+    norm_hist = []
+    norm_start_j = max(1, last_idx - lookback + 1)
+    for j in range(norm_start_j, last_idx + 1):
+        close_j = float(c.iloc[j])
+        atr_j = float(atr_series.iloc[j])
+        prev_j = float(c.iloc[j - 1])
+        if close_j <= 0 or prev_j <= 0 or atr_j <= 0:
+            continue
+        atr_pct = atr_j / close_j * 100.0
+        if atr_pct <= 0:
+            continue
+        ret_1h = (close_j / prev_j - 1.0) * 100.0
+        norm_hist.append((ret_1h if sign > 0 else -ret_1h) / atr_pct)
+
+    return {"base": base_hist, "rvol": rvol_hist, "chg1h": chg1h_vals,
+            "chg4h": chg4h_vals, "norm": norm_hist}
+
+
+def _ref_clamp(value, min_value, max_value):
+    return max(min_value, min(max_value, value))
+
+
+def _ref_quantile(values, q, fallback):
+    if not values:
+        return fallback
+    s = pd.Series(values).dropna()
+    if s.empty:
+        return fallback
+    return float(s.quantile(q))
+
+
+def _ref_thresholds(sign, c, h, l, v, atr_series, last_idx):
+    hist = _ref_histories(c, h, l, v, atr_series, last_idx, sign)
+    out = {
+        "base_max_pct": _ref_clamp(
+            _ref_quantile(hist["base"], ADAPTIVE_BASE_WIDTH_PCTL, MAX_DIST_EMA),
+            ADAPTIVE_BASE_MIN_PCT, ADAPTIVE_BASE_MAX_PCT),
+        "min_rvol": _ref_clamp(
+            _ref_quantile(hist["rvol"], ADAPTIVE_RVOL_PCTL, MIN_VOL_RATIO),
+            ADAPTIVE_RVOL_MIN, ADAPTIVE_RVOL_MAX),
+    }
+    if sign > 0:
+        min_chg_1h = max(MIN_CHG_1H_PCT_FLOOR,
+                         _ref_quantile(hist["chg1h"], ADAPTIVE_MOM_PCTL_LONG, MIN_CHG_1H_PCT))
+        min_chg_4h = max(MIN_CHG_4H_PCT_FLOOR,
+                         _ref_quantile(hist["chg4h"], ADAPTIVE_MOM_PCTL_LONG, MIN_CHG_4H_PCT))
+        out["min_chg_1h"] = min_chg_1h
+        out["min_chg_4h"] = max(min_chg_4h, min_chg_1h)
+    else:
+        max_chg_1h = _ref_clamp(
+            _ref_quantile(hist["chg1h"], ADAPTIVE_MOM_PCTL_SHORT, MAX_CHG_1H_PCT),
+            MAX_CHG_1H_PCT_FLOOR, MAX_CHG_1H_PCT_CEIL)
+        max_chg_4h = _ref_clamp(
+            _ref_quantile(hist["chg4h"], ADAPTIVE_MOM_PCTL_SHORT, MAX_CHG_4H_PCT),
+            MAX_CHG_4H_PCT_FLOOR, MAX_CHG_4H_PCT_CEIL)
+        out["max_chg_1h"] = max_chg_1h
+        out["max_chg_4h"] = min(max_chg_4h, max_chg_1h)
+    norm_series = pd.Series(hist["norm"]).dropna()
+    out["norm_mu"] = float(norm_series.mean()) if not norm_series.empty else 0.0
+    out["norm_std"] = float(norm_series.std(ddof=0)) if len(norm_series) > 1 else 0.0
+    return out
+
+
+# ── Finestre di prova ─────────────────────────────────────────────────────────
+def _random_window(rnd, n):
+    c = np.cumprod(1 + rnd.normal(0, 0.02, n)) * 10 ** rnd.uniform(-4, 4)
+    h = c * (1 + rnd.uniform(0, 0.02, n))
+    l = c * (1 - rnd.uniform(0, 0.02, n))
+    v = rnd.lognormal(3, 1, n)
+    atr = c * rnd.uniform(0.001, 0.03, n)
+    atr[:13] = 0.0                       # warm-up ATR di ta
+    return c, h, l, v, atr
+
+
+def _with_nan_rows(rnd, n):
+    c, h, l, v, atr = _random_window(rnd, n)
+    for arr in (c, h, l, v, atr):
+        arr[rnd.integers(0, n, max(1, n // 10))] = np.nan
+    return c, h, l, v, atr
+
+
+def _with_zeros(rnd, n):
+    c, h, l, v, atr = _random_window(rnd, n)
+    c[rnd.integers(0, n, 3)] = 0.0
+    v[rnd.integers(0, n, n // 4)] = 0.0
+    v[10:35] = 0.0                       # media volume nulla su intere finestre
+    return c, h, l, v, atr
+
+
+def _constant_volume(rnd, n):
+    c, h, l, v, atr = _random_window(rnd, n)
+    v[:] = 42.0
+    return c, h, l, v, atr
+
+
+def _flat_price(rnd, n):
+    c, h, l, v, atr = _random_window(rnd, n)
+    c[:] = h[:] = l[:] = 3.5
+    atr[:] = 0.0
+    return c, h, l, v, atr
+
+
+CASES = {
+    "random": (_random_window, (40, 80, 200)),
+    "nan_rows": (_with_nan_rows, (40, 80)),
+    "zeros": (_with_zeros, (40, 80)),
+    "constant_volume": (_constant_volume, (40, 80)),
+    "flat_price": (_flat_price, (40, 80)),
+    "short_history": (_random_window, (8, 12, 22, 26, 30)),
+}
+
+
+def _windows(kind, seed=3, per_size=20):
+    make, sizes = CASES[kind]
+    rnd = np.random.default_rng(seed)
+    for n in sizes:
+        for _ in range(per_size):
+            arrays = make(rnd, n)
+            yield arrays, n - 2
+            # anche su una barra chiusa precedente della stessa finestra
+            last_idx = int(rnd.integers(max(BASE_LOOKBACK_BARS, 6), n - 1))
+            yield arrays, last_idx
+
+
+def _same(a: float, b: float) -> bool:
+    return a == b or (np.isnan(a) and np.isnan(b))
+
+
+@pytest.mark.parametrize("kind", sorted(CASES))
+@pytest.mark.parametrize("d", [LONG, SHORT], ids=["LONG", "SHORT"])
+def test_thresholds_match_loop_reference(kind, d):
+    for (c, h, l, v, atr), last_idx in _windows(kind):
+        series = [pd.Series(a) for a in (c, h, l, v, atr)]
+        want = _ref_thresholds(d.sign, *series, last_idx)
+        got = compute_adaptive_thresholds(d, c, h, l, v, atr, last_idx)
+        assert got.keys() == want.keys()
+        for k in want:
+            assert _same(got[k], want[k]), (kind, d.name, last_idx, k, got[k], want[k])
+
+
+@pytest.mark.parametrize("kind", sorted(CASES))
+@pytest.mark.parametrize("d", [LONG, SHORT], ids=["LONG", "SHORT"])
+def test_histories_match_loop_reference(kind, d):
+    for (c, h, l, v, atr), last_idx in _windows(kind, seed=5, per_size=10):
+        series = [pd.Series(a) for a in (c, h, l, v, atr)]
+        want = _ref_histories(*series, last_idx, d.sign)
+        got = adaptive_histories(c, h, l, v, atr, last_idx, BASE_LOOKBACK_BARS,
+                                 ADAPTIVE_LOOKBACK_BARS, direction=d.sign)
+        for k in want:
+            np.testing.assert_array_equal(got[k], np.asarray(want[k], dtype=float),
+                                          err_msg=f"{kind} {d.name} {last_idx} {k}")
@@ -0,0 +1,86 @@
+import pytest
+
+from bybit_core import engine
+from bybit_core.direction import LONG
+
+
+class _Resp:
+    def __init__(self, data: dict):
+        self._data = data
+
+    def json(self) -> dict:
+        return self._data
+
+
+class _OrderApi:
+    """/v5/order/cancel e /v5/order/realtime su un solo ordine, con fill durante la cancel."""
+
+    def __init__(self, fill_on_cancel: float = 0.0, cancel_ok: bool = True):
+        self.fill_on_cancel = fill_on_cancel
+        self.cancel_ok = cancel_ok
+        self.cum_qty = 0.0
+        self.status = "New"
+        self.calls: list = []
+
+    def post(self, path, body):
+        self.calls.append(path)
+        assert path == "/v5/order/cancel"
+        if self.fill_on_cancel:
+            # Il fill arriva prima della cancel: Bybit risponde "order not exists"
+            self.cum_qty, self.status = self.fill_on_cancel, "Filled"
+            return _Resp({"retCode": 110001, "retMsg": "order not exists or too late to cancel"})
+        if self.cancel_ok:
+            self.status = "Cancelled"
+            return _Resp({"retCode": 0, "result": {"orderId": body["orderId"]}})
+        return _Resp({"retCode": 10006, "retMsg": "Too many visits"})
+
+    def get(self, path, params):
+        self.calls.append(path)
+        assert path == "/v5/order/realtime"
+        return _Resp({"retCode": 0, "result": {"list": [
+            {"orderId": params["orderId"], "cumExecQty": str(self.cum_qty),
+             "orderStatus": self.status}]}})
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    monkeypatch.setattr(engine, "wait_order_fill", lambda *_a: 0.0)   # stream: nessun fill in 3 s
+    monkeypatch.setattr(engine, "_invalidate_account_state", lambda: None)
+    monkeypatch.setattr(engine, "log", lambda _m: None)
+    b = engine.Bot.__new__(engine.Bot)
+    b.d = LONG
+    return b
+
+
+def _use(monkeypatch, api: _OrderApi) -> None:
+    monkeypatch.setattr(engine, "bybit_signed_post", api.post)
+    monkeypatch.setattr(engine, "bybit_signed_get", api.get)
+
+
+def test_fill_between_timeout_and_cancel_is_returned(monkeypatch, bot):
+    api = _OrderApi(fill_on_cancel=12.5)
+    _use(monkeypatch, api)
+    assert bot._await_limit_fill("BTCUSDT", "oid-1") == 12.5
+
+
+def test_cancelled_without_fill_allows_market_fallback(monkeypatch, bot):
+    api = _OrderApi()
+    _use(monkeypatch, api)
+    assert bot._await_limit_fill("BTCUSDT", "oid-1") == 0.0
+    assert api.calls == ["/v5/order/cancel", "/v5/order/realtime"]
+
+
+def test_order_still_live_after_cancel_blocks_market(monkeypatch, bot):
+    api = _OrderApi(cancel_ok=False)
+    _use(monkeypatch, api)
+    assert bot._await_limit_fill("BTCUSDT", "oid-1") is None
+    assert api.calls.count("/v5/order/cancel") == 2
+
+
+def test_unreadable_order_falls_back_to_position_qty(monkeypatch, bot):
+    api = _OrderApi()
+    _use(monkeypatch, api)
+    monkeypatch.setattr(engine, "bybit_signed_get",
+                        lambda *_a: _Resp({"retCode": 10002, "retMsg": "timeout"}))
+    monkeypatch.setattr(engine, "get_open_qty", lambda _s, _side: 3.0)
+    assert bot._await_limit_fill("BTCUSDT", "oid-1") == 3.0
@@ -0,0 +1,131 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator
+from ta.volatility import AverageTrueRange
+
+from bybit_core.indicators import IndicatorTrack
+from bybit_core.klines import KlineStore
+
+HOUR_MS = 3_600_000
+
+
+# ── Riferimento: ta ricalcolato su ogni finestra, come prima dello stato incrementale ──
+def _ta_window(vals: np.ndarray, ema_span=20, rsi_window=14, atr_window=14) -> np.ndarray:
+    h, l, c = (pd.Series(vals[:, i]) for i in (1, 2, 3))
+    return np.column_stack([
+        c.ewm(span=ema_span, adjust=False).mean().to_numpy(),
+        RSIIndicator(close=c, window=rsi_window).rsi().to_numpy(),
+        AverageTrueRange(high=h, low=l, close=c, window=atr_window).average_true_range().to_numpy(),
+    ])
+
+
+def _random_bars(rnd, n: int) -> np.ndarray:
+    c = np.cumprod(1 + rnd.normal(0, 0.01, n)) * 10 ** rnd.uniform(-4, 4)
+    if rnd.random() < 0.3:
+        c[rnd.integers(0, n, n // 5)] = c[0]          # chiusure ripetute
+    o = np.roll(c, 1)
+    o[0] = c[0]
+    h = np.maximum(o, c) * (1 + rnd.uniform(0, 0.01, n))
+    l = np.minimum(o, c) * (1 - rnd.uniform(0, 0.01, n))
+    return np.column_stack([o, h, l, c, rnd.uniform(1, 100, n), rnd.uniform(1, 100, n)])
+
+
+def _forming(rnd, bar: np.ndarray) -> np.ndarray:
+    """La barra in formazione cambia tra una scan e l'altra."""
+    b = bar.copy()
+    b[3] *= 1 + rnd.normal(0, 0.003)
+    b[1] = max(b[1], b[3])
+    b[2] = min(b[2], b[3])
+    return b
+
+
+@pytest.mark.parametrize("window,params", [(80, (20, 14, 14)), (30, (20, 14, 14)),
+                                           (60, (50, 9, 21))])
+def test_track_matches_ta_on_every_window(window, params):
+    rnd = np.random.default_rng(window)
+    checked = 0
+    for _ in range(40):
+        total = int(rnd.integers(window + 20, window + 200))
+        bars = _random_bars(rnd, total)
+        ts = np.arange(total, dtype=np.int64) * HOUR_MS
+        track = IndicatorTrack(*params)
+        # Simbolo appena listato: la finestra parte corta e si allunga
+        # (ta richiede almeno atr_window barre)
+        end = int(rnd.integers(params[2], window))
+        while end <= total:
+            lo = max(0, end - window)
+            w_ts, w_vals = ts[lo:end], bars[lo:end].copy()
+            for _scan in range(int(rnd.integers(1, 4))):
+                w_vals[-1] = _forming(rnd, bars[end - 1])
+                got = track.sync(w_ts, w_vals)
+                want = _ta_window(w_vals, *params)
+                assert np.array_equal(got, want, equal_nan=True), (window, total, end)
+                checked += 1
+            end += 1
+            if rnd.random() < 0.05:
+                end += int(rnd.integers(2, window))      # buco: scan saltate
+    assert checked > 1000
+
+
+def test_track_reuses_state_while_window_start_is_unchanged():
+    rnd = np.random.default_rng(1)
+    bars = _random_bars(rnd, 120)
+    ts = np.arange(120, dtype=np.int64) * HOUR_MS
+    track = IndicatorTrack()
+    track.sync(ts[:80], bars[:80])
+    assert track.reseeds == 1
+    for _ in range(5):                       # stessa ora: solo la barra in formazione
+        w = bars[:80].copy()
+        w[-1] = _forming(rnd, w[-1])
+        track.sync(ts[:80], w)
+    assert track.reseeds == 1
+    track.sync(ts[1:81], bars[1:81])         # la finestra scorre: ricalcolo
+    assert track.reseeds == 2
+    changed = bars[1:81].copy()
+    changed[40, 3] *= 1.01                   # barra chiusa rivista
+    got = track.sync(ts[1:81], changed)
+    assert track.reseeds == 3
+    assert np.array_equal(got, _ta_window(changed), equal_nan=True)
+
+
+def test_window_shorter_than_warm_up():
+    # ta solleva IndexError sotto atr_window barre: la track non si rompe,
+    # l'EMA resta quella di pandas e a 14 barre si torna alla parità piena
+    rnd = np.random.default_rng(2)
+    bars = _random_bars(rnd, 14)
+    track = IndicatorTrack()
+    for n in range(1, 15):
+        got = track.sync(np.arange(n, dtype=np.int64) * HOUR_MS, bars[:n])
+        assert got.shape == (n, 3)
+        ema = pd.Series(bars[:n, 3]).ewm(span=20, adjust=False).mean().to_numpy()
+        assert np.array_equal(got[:, 0], ema)
+    assert np.array_equal(got, _ta_window(bars), equal_nan=True)
+
+
+# ── KlineStore.get_indicators ─────────────────────────────────────────────────
+def test_kline_store_indicators_match_ta_as_bars_arrive(kline_session):
+    rnd = np.random.default_rng(7)
+    bars = _random_bars(rnd, 200)
+    cur = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+    first = 100
+    rows = [[str(cur - i * HOUR_MS)] + [str(x) for x in bars[first - 1 - i]]
+            for i in range(first)]
+    store = KlineStore(kline_session(rows), "http://rest.invalid")
+
+    for k in range(first, 200):
+        ts_k = cur + (k - first + 1) * HOUR_MS
+        for _scan in range(2):
+            got = store.get_indicators("BTCUSDT", "60", 80)
+            assert got is not None
+            w_ts, w_vals, ind = got
+            assert len(w_ts) == 80
+            assert np.array_equal(ind, _ta_window(w_vals), equal_nan=True)
+            # Un'altra finestra sulla stessa chiave (es. limit 30) non interferisce
+            _, v30, ind30 = store.get_indicators("BTCUSDT", "60", 30)
+            assert np.array_equal(ind30, _ta_window(v30), equal_nan=True)
+            # aggiornamento della barra in formazione dallo stream
+            store.apply_bar("BTCUSDT", "60", int(w_ts[-1]), _forming(rnd, w_vals[-1]))
+        store.apply_bar("BTCUSDT", "60", ts_k, bars[k])
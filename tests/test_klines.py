@@ -0,0 +1,111 @@
+import types
+
+import numpy as np
+import pytest
+
+from bybit_core import klines
+from bybit_core.klines import INCREMENTAL_MAX_BARS, KlineStore
+
+HOUR_MS = 3_600_000
+T0 = 1_700_000_000_000 // HOUR_MS * HOUR_MS
+
+
+def _row(ts: int, close: float) -> list:
+    return [str(ts), str(close - 1), str(close + 1), str(close - 2), str(close), "10", str(10 * close)]
+
+
+class _Market:
+    """Barre 1h lato server (più recente prima) e orologio locale del processo."""
+
+    def __init__(self, session_cls, bars: int = 100):
+        self.now_ms = T0 + HOUR_MS // 2                   # a metà della barra T0
+        self.session = session_cls([_row(T0 - i * HOUR_MS, 100.0 + i) for i in range(bars)])
+
+    def advance(self, hours: int) -> None:
+        """Passano `hours` ore: nuove barre sul server, l'ultima in formazione."""
+        last = int(self.session.rows[0][0])
+        for k in range(1, hours + 1):
+            self.session.rows.insert(0, _row(last + k * HOUR_MS, 200.0 + k))
+        self.now_ms += hours * HOUR_MS
+
+
+@pytest.fixture
+def market(monkeypatch, kline_session):
+    m = _Market(kline_session)
+    monkeypatch.setattr(klines, "time", types.SimpleNamespace(time=lambda: m.now_ms / 1000))
+    return m
+
+
+def _full_reference(market, limit: int):
+    """Finestra come la darebbe un caricamento completo dallo stato attuale del server."""
+    return klines._parse_rows(market.session.rows[:limit])
+
+
+def test_refresh_merges_only_new_bars(market):
+    store = KlineStore(market.session, "http://rest.invalid")
+    ts, _ = store.get_arrays("BTCUSDT", "60", 80)
+    assert len(ts) == 80 and int(ts[-1]) == T0
+    assert store.stats["full"] == 1
+
+    # La barra T0 chiude con valori diversi da quelli in cache, poi ne arrivano 2
+    market.session.rows[0] = _row(T0, 150.0)
+    market.advance(2)
+    ts, vals = store.get_arrays("BTCUSDT", "60", 80)
+
+    assert store.stats == {"full": 1, "incremental": 1, "live": 0, "bars_downloaded": 83}
+    assert market.session.requests[-1]["start"] == T0
+    # Barra di sovrapposizione sostituita, finestra tagliata a `window`
+    assert len(ts) == 80 and int(ts[-1]) == T0 + 2 * HOUR_MS
+    assert vals[ts == T0][0, 3] == 150.0
+    want_ts, want_vals = _full_reference(market, 80)
+    assert np.array_equal(ts, want_ts)
+    assert np.array_equal(vals, want_vals)
+
+
+def test_smaller_limit_is_served_from_the_larger_window(market):
+    store = KlineStore(market.session, "http://rest.invalid")
+    store.get_arrays("BTCUSDT", "60", 80)
+    market.advance(1)
+    ts, vals = store.get_arrays("BTCUSDT", "60", 30)
+    assert store.stats["incremental"] == 1 and store.stats["full"] == 1
+    want_ts, want_vals = _full_reference(market, 30)
+    assert np.array_equal(ts, want_ts) and np.array_equal(vals, want_vals)
+    # La finestra in cache resta di 80 barre
+    ts80, _ = store.get_arrays("BTCUSDT", "60", 80)
+    assert len(ts80) == 80 and store.stats["full"] == 1
+
+
+def test_gap_falls_back_to_full_load(market):
+    store = KlineStore(market.session, "http://rest.invalid")
+    store.get_arrays("BTCUSDT", "60", 80)
+    market.advance(2)
+    # Il server non restituisce più la barra in cache: niente sovrapposizione
+    market.session.rows = [r for r in market.session.rows if int(r[0]) != T0]
+    ts, vals = store.get_arrays("BTCUSDT", "60", 80)
+    assert store.stats["incremental"] == 0 and store.stats["full"] == 2
+    want_ts, want_vals = _full_reference(market, 80)
+    assert np.array_equal(ts, want_ts) and np.array_equal(vals, want_vals)
+
+
+def test_long_absence_falls_back_to_full_load_without_incremental_request(market):
+    store = KlineStore(market.session, "http://rest.invalid")
+    store.get_arrays("BTCUSDT", "60", 80)
+    market.advance(INCREMENTAL_MAX_BARS)
+    ts, _ = store.get_arrays("BTCUSDT", "60", 80)
+    assert store.stats["incremental"] == 0 and store.stats["full"] == 2
+    assert all("start" not in p for p in market.session.requests)
+    assert int(ts[-1]) == T0 + INCREMENTAL_MAX_BARS * HOUR_MS
+
+
+def test_incremental_result_at_max_bars_falls_back_to_full_load(market):
+    store = KlineStore(market.session, "http://rest.invalid")
+    store.get_arrays("BTCUSDT", "60", 80)
+    # Orologio locale indietro rispetto al server: il controllo sul tempo passa
+    # ma la risposta da `start` è già di INCREMENTAL_MAX_BARS barre (troncata)
+    market.advance(INCREMENTAL_MAX_BARS + 10)
+    market.now_ms -= 20 * HOUR_MS
+    ts, vals = store.get_arrays("BTCUSDT", "60", 80)
+    assert market.session.requests[-2]["start"] == T0
+    assert store.stats["incremental"] == 0 and store.stats["full"] == 2
+    want_ts, want_vals = _full_reference(market, 80)
+    assert np.array_equal(ts, want_ts) and np.array_equal(vals, want_vals)
@@ -0,0 +1,293 @@
+import threading
+import time
+
+import pytest
+
+import bybit_core.private_stream as ps_mod
+from bybit_core.private_stream import TOPICS, PrivateStream
+from fake_bybit_ws import FakeBybitWS, wait_until
+
+KEY, SECRET = "test-key", "test-secret"
+
+
+@pytest.fixture(autouse=True)
+def fast_reconnect(monkeypatch):
+    monkeypatch.setattr(ps_mod, "RECONNECT_DELAY_SEC", 0.05)
+
+
+@pytest.fixture
+def server():
+    with FakeBybitWS(secret=SECRET) as srv:
+        yield srv
+
+
+class _Seed:
+    """seed_positions: snapshot REST delle posizioni, una lista per (ri)connessione."""
+
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+        self.calls = 0
+
+    def __call__(self):
+        rows = self.snapshots[min(self.calls, len(self.snapshots) - 1)]
+        self.calls += 1
+        return rows
+
+
+def _pos(symbol, idx, size, avg="100"):
+    return {"symbol": symbol, "positionIdx": idx, "side": "Buy" if idx == 1 else "Sell",
+            "size": str(size), "avgPrice": avg}
+
+
+@pytest.fixture
+def stream(server):
+    seed = _Seed([])
+    ps = PrivateStream(server.url, KEY, SECRET, seed_positions=seed, log=lambda _m: None)
+    ps.seed = seed
+    assert ps.start()
+    wait_until(ps.is_ready)
+    yield ps
+    ps.stop()
+
+
+def _push(server, topic, *records):
+    server.push({"topic": topic, "creationTime": 0, "data": list(records)})
+
+
+# ── Autenticazione ────────────────────────────────────────────────────────────
+def test_auth_then_subscribe_then_seed(server, stream):
+    auth = server.ops("auth")[0]
+    assert auth["args"][0] == KEY
+    assert server.ops("subscribe")[0]["args"] == TOPICS
+    # La subscribe parte solo dopo la risposta positiva all'auth
+    ops = [m.get("op") for _, m in server.received if m.get("op") != "ping"]
+    assert ops[:2] == ["auth", "subscribe"]
+    assert stream.seed.calls == 1
+    assert stream.positions("Buy") == {}
+
+
+def test_wrong_secret_stays_on_rest(server):
+    seed = _Seed([])
+    ps = PrivateStream(server.url, KEY, "wrong-secret", seed_positions=seed, log=lambda _m: None)
+    assert ps.start()
+    try:
+        server.wait_for(lambda m: m.get("op") == "auth")
+        wait_until(lambda: ps._connected)
+        assert not ps.is_ready()
+        assert ps.positions("Buy") is None
+        assert ps.wait_fill("o1", 1, 0.05) is None
+        assert server.ops("subscribe") == []
+        assert seed.calls == 0
+    finally:
+        ps.stop()
+
+
+def test_missing_credentials_do_not_start(server):
+    assert not PrivateStream(server.url, "", "", log=lambda _m: None).start()
+
+
+# ── Fill ──────────────────────────────────────────────────────────────────────
+def test_wait_fill_from_order_push(server, stream):
+    result = []
+    t = threading.Thread(target=lambda: result.append(stream.wait_fill("o1", 1, 5.0)))
+    t.start()
+    _push(server, "order", {"orderId": "o1", "symbol": "BTCUSDT", "positionIdx": 1,
+                            "orderStatus": "New", "cumExecQty": "0", "avgPrice": ""})
+    _push(server, "order", {"orderId": "o1", "symbol": "BTCUSDT", "positionIdx": 1,
+                            "orderStatus": "Filled", "cumExecQty": "2", "avgPrice": "100.5"})
+    t.join(5)
+    assert result == [2.0]
+
+
+def test_wait_fill_execution_before_order(server, stream):
+    result = []
+    t = threading.Thread(target=lambda: result.append(stream.wait_fill("o2", 1, 5.0)))
+    t.start()
+    # L'execution arriva prima del push order: qty eseguita = orderQty − leavesQty
+    _push(server, "execution", {"orderId": "o2", "symbol": "ETHUSDT", "side": "Buy",
+                                "execType": "Trade", "execQty": "0.4", "execPrice": "2000",
+                                "orderQty": "1", "leavesQty": "0.6", "closedSize": "0"})
+    t.join(5)
+    assert result == [0.4]
+    # Il push order successivo con cumExecQty più basso non fa regredire la qty
+    _push(server, "order", {"orderId": "o2", "symbol": "ETHUSDT", "positionIdx": 1,
+                            "orderStatus": "PartiallyFilled", "cumExecQty": "0.3",
+                            "avgPrice": "2000"})
+    wait_until(lambda: stream._orders["o2"]["status"] == "PartiallyFilled")
+    assert stream.wait_fill("o2", 1, 0.1) == 0.4
+
+
+def test_wait_fill_terminal_without_fill_and_timeout(server, stream):
+    _push(server, "order", {"orderId": "o3", "symbol": "BTCUSDT", "positionIdx": 1,
+                            "orderStatus": "Cancelled", "cumExecQty": "0"})
+    wait_until(lambda: "o3" in stream._orders)
+    assert stream.wait_fill("o3", 1, 1.0) == 0.0
+    assert stream.wait_fill("never-sent", 1, 0.05) == 0.0
+
+
+# ── Posizione provvisoria ─────────────────────────────────────────────────────
+def test_fill_creates_provisional_position(server, stream):
+    _push(server, "execution", {"orderId": "o4", "symbol": "SOLUSDT", "side": "Sell",
+                                "execType": "Trade", "execQty": "3", "execPrice": "150",
+                                "orderQty": "3", "leavesQty": "0", "closedSize": "0"})
+    # positionIdx non noto dall'execution: usa quello dell'ordine inviato (2 = SHORT)
+    assert stream.wait_fill("o4", 2, 5.0) == 3.0
+    short = stream.positions("Sell")
+    assert short["SOLUSDT"]["size"] == "3.0"
+    assert short["SOLUSDT"]["positionIdx"] == 2
+    assert stream.positions("Buy") == {}
+
+    # Il push position successivo sostituisce il record provvisorio
+    _push(server, "position", {**_pos("SOLUSDT", 2, 3, avg="149.9"), "stopLoss": "160"})
+    wait_until(lambda: stream.positions("Sell")["SOLUSDT"].get("stopLoss") == "160")
+    assert stream.positions("Sell")["SOLUSDT"]["avgPrice"] == "149.9"
+
+
+def test_provisional_position_does_not_overwrite_open_one(server):
+    seed = _Seed([_pos("BTCUSDT", 1, 5, avg="90")])
+    ps = PrivateStream(server.url, KEY, SECRET, seed_positions=seed, log=lambda _m: None)
+    assert ps.start()
+    try:
+        wait_until(ps.is_ready)
+        _push(server, "order", {"orderId": "o5", "symbol": "BTCUSDT", "positionIdx": 1,
+                                "orderStatus": "Filled", "cumExecQty": "1", "avgPrice": "100"})
+        assert ps.wait_fill("o5", 1, 5.0) == 1.0
+        assert ps.positions("Buy")["BTCUSDT"]["size"] == "5"
+        assert ps.positions("Buy")["BTCUSDT"]["avgPrice"] == "90"
+    finally:
+        ps.stop()
+
+
+def test_closed_position_is_not_listed(server, stream):
+    _push(server, "position", _pos("XRPUSDT", 1, 10))
+    wait_until(lambda: "XRPUSDT" in stream.positions("Buy"))
+    _push(server, "position", _pos("XRPUSDT", 1, 0))
+    wait_until(lambda: "XRPUSDT" not in stream.positions("Buy"))
+
+
+# ── Uscite ────────────────────────────────────────────────────────────────────
+def _close_exec(symbol, side, qty, price, pnl, fee, oid="c1"):
+    return {"orderId": oid, "symbol": symbol, "side": side, "execType": "Trade",
+            "execQty": str(qty), "execPrice": str(price), "closedSize": str(qty),
+            "execPnl": str(pnl), "execFee": str(fee)}
+
+
+def test_pop_exit_aggregates_reduce_executions(server, stream):
+    _push(server, "position", _pos("BTCUSDT", 1, 3))
+    # LONG chiuso da esecuzioni Sell in due messaggi; funding e apertura ignorati
+    _push(server, "execution",
+          _close_exec("BTCUSDT", "Sell", 1, 110, 10, 0.5),
+          {"orderId": "f1", "symbol": "BTCUSDT", "side": "Sell", "execType": "Funding",
+           "execQty": "3", "execPrice": "1", "closedSize": "3", "execPnl": "-9"})
+    _push(server, "execution",
+          _close_exec("BTCUSDT", "Sell", 2, 104, 8, 0.25, oid="c2"),
+          {"orderId": "o9", "symbol": "BTCUSDT", "side": "Buy", "execType": "Trade",
+           "execQty": "1", "execPrice": "100", "closedSize": "0"})
+    wait_until(lambda: "c2" in stream._orders)
+
+    exit_ = stream.pop_exit("BTCUSDT", 1)
+    assert exit_["qty"] == 3.0
+    assert exit_["price"] == pytest.approx((110 + 2 * 104) / 3)
+    assert exit_["pnl"] == pytest.approx(10 - 0.5 + 8 - 0.25)
+    assert stream.pop_exit("BTCUSDT", 1) is None
+    assert stream.pop_exit("BTCUSDT", 2) is None
+
+
+def test_short_exit_and_new_trade_resets_exits(server, stream):
+    # SHORT chiuso da una Buy: uscita registrata su positionIdx 2
+    _push(server, "execution", _close_exec("ETHUSDT", "Buy", 1, 1900, 100, 1))
+    wait_until(lambda: "c1" in stream._orders)
+    # Nuova posizione aperta sullo stesso lato: l'uscita precedente non conta più
+    _push(server, "position", _pos("ETHUSDT", 2, 1))
+    wait_until(lambda: "ETHUSDT" in stream.positions("Sell"))
+    assert stream.pop_exit("ETHUSDT", 2) is None
+
+
+# ── Riconnessione ─────────────────────────────────────────────────────────────
+def test_reconnect_reseeds_positions(server):
+    seed = _Seed([_pos("BTCUSDT", 1, 1)], [_pos("ETHUSDT", 2, 4)])
+    ps = PrivateStream(server.url, KEY, SECRET, seed_positions=seed, log=lambda _m: None)
+    assert ps.start()
+    try:
+        wait_until(ps.is_ready)
+        assert set(ps.positions("Buy")) == {"BTCUSDT"}
+
+        server.drop()
+        wait_until(lambda: not ps.is_ready())
+        assert ps.positions("Buy") is None            # stream giù: il chiamante usa il REST
+        assert ps.wait_fill("o1", 1, 0.05) is None
+        assert not ps.wait_event(0.05)
+
+        # Nuova connessione: auth + subscribe di nuovo, poi snapshot REST aggiornato
+        server.wait_connections(2)
+        wait_until(ps.is_ready)
+        assert seed.calls == 2
+        assert len(server.ops("auth")) == 2
+        assert ps.positions("Buy") == {}
+        assert set(ps.positions("Sell")) == {"ETHUSDT"}
+    finally:
+        ps.stop()
+
+
+def test_failed_seed_keeps_stream_not_ready(server):
+    ps = PrivateStream(server.url, KEY, SECRET, seed_positions=lambda: None, log=lambda _m: None)
+    assert ps.start()
+    try:
+        server.wait_for(lambda m: m.get("op") == "subscribe")
+        wait_until(lambda: ps._connected)
+        assert not ps.is_ready()
+        assert ps.positions("Buy") is None
+    finally:
+        ps.stop()
+
+
+def test_wait_event_wakes_on_push(server, stream):
+    woke = []
+    t = threading.Thread(target=lambda: woke.append(stream.wait_event(5.0)))
+    t.start()
+    _push(server, "position", _pos("BTCUSDT", 1, 1))
+    t.join(5)
+    assert woke == [True]
+
+
+def test_wallet_push_reaches_listeners(server, stream):
+    got = []
+    stream.add_wallet_listener(got.append)
+    _push(server, "wallet", {"accountType": "UNIFIED", "totalEquity": "1234.5"})
+    wait_until(lambda: got)
+    assert got[0]["totalEquity"] == "1234.5"
+
+
+# ── Orologio ──────────────────────────────────────────────────────────────────
+SKEW_MS = 60_000    # orologio locale indietro di un minuto rispetto al server
+
+
+def _local_ms():
+    return int(time.time() * 1000)
+
+
+def test_auth_expires_uses_synced_clock():
+    with FakeBybitWS(secret=SECRET, clock_ms=lambda: _local_ms() + SKEW_MS) as srv:
+        ps = PrivateStream(srv.url, KEY, SECRET, seed_positions=_Seed([]),
+                           log=lambda _m: None, now_ms=lambda: _local_ms() + SKEW_MS)
+        assert ps.start()
+        try:
+            wait_until(ps.is_ready)
+            expires = srv.ops("auth")[0]["args"][1]
+            assert expires > _local_ms() + SKEW_MS
+        finally:
+            ps.stop()
+
+
+def test_auth_with_local_clock_is_rejected_when_skewed():
+    with FakeBybitWS(secret=SECRET, clock_ms=lambda: _local_ms() + SKEW_MS) as srv:
+        ps = PrivateStream(srv.url, KEY, SECRET, seed_positions=_Seed([]), log=lambda _m: None)
+        assert ps.start()
+        try:
+            srv.wait_for(lambda m: m.get("op") == "auth")
+            wait_until(lambda: ps._connected)
+            time.sleep(0.1)
+            assert not ps.is_ready()
+            assert srv.ops("subscribe") == []
+        finally:
+            ps.stop()
@@ -0,0 +1,118 @@
+import math
+import random
+from decimal import ROUND_UP, Decimal
+
+import pytest
+
+from bybit_core.market import format_price_ceil, format_price_floor, format_qty_with_step
+from bybit_core.quantize import Quantizer, quantizer
+
+# Tick size e qty step reali dei perpetual linear Bybit
+REAL_STEPS = [
+    1e-8, 1e-7, 1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+    0.01, 0.025, 0.05, 0.1, 0.2, 0.25, 0.5, 1.0, 5.0, 10.0, 100.0, 1000.0,
+]
+# Step non decimali "tondi": mantissa ≠ 1/2.5/5 e interi senza decimali
+ODD_STEPS = [3e-7, 7.5e-5, 0.003, 0.3, 0.75, 1.25, 3.0, 7, 25, 250]
+
+
+# ── Riferimento: la versione Decimal usata prima di Quantizer ─────────────────
+def _ref_floor(x: float, step: float) -> str:
+    step_dec = Decimal(str(step))
+    floored = (Decimal(str(x)) // step_dec) * step_dec
+    exp = step_dec.as_tuple().exponent
+    return f"{floored:.{-exp if exp < 0 else 0}f}"
+
+
+def _ref_ceil(x: float, step: float) -> str:
+    step_dec = Decimal(str(step))
+    ceiled = (Decimal(str(x)) / step_dec).to_integral_value(rounding=ROUND_UP) * step_dec
+    exp = step_dec.as_tuple().exponent
+    return f"{ceiled:.{-exp if exp < 0 else 0}f}"
+
+
+def _outcome(fn, *args):
+    """Risultato o tipo d'eccezione: anche gli errori Decimal devono coincidere."""
+    try:
+        return fn(*args)
+    except ArithmeticError as e:
+        return type(e)
+
+
+def _assert_same(step, x):
+    q = quantizer(step)
+    assert _outcome(q.floor_str, x) == _outcome(_ref_floor, x, step), (step, x)
+    assert _outcome(q.ceil_str, x) == _outcome(_ref_ceil, x, step), (step, x)
+
+
+def _on_grid(k: int, step: float) -> float:
+    """k·step esatto in decimale, poi il float più vicino (come un prezzo Bybit)."""
+    return float(Decimal(k) * Decimal(str(step)))
+
+
+# ── Proprietà su corpus casuale (seed fisso) ─────────────────────────────────
+@pytest.mark.parametrize("step", REAL_STEPS + ODD_STEPS)
+def test_random_values_match_decimal(step):
+    rnd = random.Random(f"quantize-{step!r}")
+    for _ in range(3000):
+        x = 10 ** rnd.uniform(-9, 9)
+        _assert_same(step, x)
+        _assert_same(step, round(x, rnd.randint(0, 12)))
+
+
+@pytest.mark.parametrize("step", REAL_STEPS + ODD_STEPS)
+def test_exact_multiples_and_neighbours_match_decimal(step):
+    rnd = random.Random(f"grid-{step!r}")
+    for _ in range(2000):
+        # indici del tick su tutte le scale, fino al limite della via intera
+        k = int(10 ** rnd.uniform(0, 15.5 - max(0, math.log10(max(step, 1e-300)) + 8)))
+        k = max(1, k)
+        on = _on_grid(k, step)
+        for x in (on, math.nextafter(on, 0), math.nextafter(on, math.inf),
+                  _on_grid(k, step) + step / 2, on - step / 2):
+            if x > 0:
+                _assert_same(step, x)
+
+
+@pytest.mark.parametrize("step", REAL_STEPS)
+def test_decimal_string_prices_match_decimal(step):
+    """Prezzi come arrivano da Bybit: stringhe decimali con 0-10 cifre."""
+    rnd = random.Random(f"str-{step!r}")
+    for _ in range(3000):
+        digits = rnd.randint(0, 10)
+        x = float(f"{rnd.uniform(0, 10 ** rnd.randint(0, 7)):.{digits}f}")
+        if x > 0:
+            _assert_same(step, x)
+
+
+def test_index_limit_boundary_matches_decimal():
+    # Attorno a k·m = 10^15 il Quantizer passa alla versione Decimal
+    for step in (1e-8, 0.01, 1.0):
+        q = Quantizer(step)
+        k_lim = 10 ** 15 // q._m
+        for k in range(k_lim - 3, k_lim + 3):
+            on = _on_grid(k, step)
+            for x in (on, math.nextafter(on, 0), math.nextafter(on, math.inf)):
+                _assert_same(step, x)
+
+
+@pytest.mark.parametrize("x", [0.0, -0.0, -1.5, -0.004, 1e20, 1e300, 5e-324])
+def test_out_of_domain_values_match_decimal(x):
+    for step in (1e-8, 0.01, 1, 1.0, 25):
+        _assert_same(step, x)
+
+
+# ── Formattazione ─────────────────────────────────────────────────────────────
+def test_int_and_float_steps_format_differently():
+    assert quantizer(1).floor_str(12.7) == "12"
+    assert quantizer(1.0).floor_str(12.7) == "12.0"
+    assert quantizer(1e-8).floor_str(0.5) == "0.50000000"
+    assert quantizer(0.025).ceil_str(1.0001) == "1.025"
+    assert quantizer(10.0).floor_str(9.99) == "0.0"
+
+
+def test_market_helpers_use_quantizer():
+    assert format_price_floor(1.23456789, 0.0001) == "1.2345"
+    assert format_price_ceil(1.23450001, 0.0001) == "1.2346"
+    assert format_qty_with_step(123.456, 0.01) == "123.45"
+    assert quantizer(0.01) is quantizer(0.01)
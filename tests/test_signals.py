@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+from bybit_core import signals
+from bybit_core.direction import LONG, SHORT
+from bybit_core.klines import KlineStore
+
+# Finestre 1h registrate: payload /v5/market/kline (più recente prima) con il
+# segnale o il motivo di scarto atteso per LONG/SHORT, top mover (rank 1) e
+# non (rank 99). Generate una volta dal percorso DataFrame di
+# check_entry_signal (commit "baseline" nel file), precedente agli array NumPy.
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "signal_windows.json")
+DIRECTIONS = {"LONG": LONG, "SHORT": SHORT}
+
+with open(FIXTURE, encoding="utf-8") as fh:
+    RECORDED = json.load(fh)
+
+CASES = [
+    pytest.param(w["rows"], case, expected, id=f"w{i:02d}-{case}")
+    for i, w in enumerate(RECORDED["windows"])
+    for case, expected in w["expected"].items()
+]
+
+
+def _evaluate(monkeypatch, kline_session, rows: list, case: str):
+    name, rank = case.split(":")
+    store = KlineStore(kline_session(rows), "http://rest.invalid")
+    monkeypatch.setattr(signals, "fetch_klines_ind",
+                        lambda sym, interval, limit: store.get_indicators(sym, interval, limit))
+    monkeypatch.setattr(signals, "log", lambda _m: None)
+    stats: dict = {}
+    signal = signals.check_entry_signal(DIRECTIONS[name], RECORDED["symbol"], stats, rank=int(rank))
+    return signal, stats
+
+
+@pytest.mark.parametrize("rows,case,expected", CASES)
+def test_recorded_window_gives_recorded_outcome(monkeypatch, kline_session, rows, case, expected):
+    signal, stats = _evaluate(monkeypatch, kline_session, rows, case)
+    if isinstance(expected, str):
+        assert signal is None
+        assert stats == {expected: 1}
+    else:
+        assert stats == {}
+        assert signal == expected
+
+
+def test_recorded_windows_cover_signals_and_rejects():
+    outcomes = {}
+    for w in RECORDED["windows"]:
+        for case, expected in w["expected"].items():
+            key = expected if isinstance(expected, str) else "signal"
+            outcomes.setdefault(case, set()).add(key)
+    for case, seen in outcomes.items():
+        assert "signal" in seen, case
+        assert len(seen) >= 8, (case, seen)
+
+
+@pytest.mark.parametrize("d", [LONG, SHORT], ids=["LONG", "SHORT"])
+def test_missing_window_rejects_as_insufficient(monkeypatch, d):
+    monkeypatch.setattr(signals, "fetch_klines_ind", lambda *_a, **_k: None)
+    stats: dict = {}
+    assert signals.check_entry_signal(d, "TESTUSDT", stats) is None
+    assert stats == {"kline_insufficient": 1}
@@ -0,0 +1,186 @@
+import time
+
+import numpy as np
+import pytest
+
+import bybit_core.stream as stream_mod
+from bybit_core.klines import KlineStore
+from bybit_core.stream import MarketStream
+from fake_bybit_ws import FakeBybitWS, wait_until
+
+HOUR_MS = 3_600_000
+
+
+@pytest.fixture
+def server():
+    with FakeBybitWS() as srv:
+        yield srv
+
+
+@pytest.fixture(autouse=True)
+def fast_reconnect(monkeypatch):
+    monkeypatch.setattr(stream_mod, "RECONNECT_DELAY_SEC", 0.05)
+
+
+def _start(server, store=None, stale_sec=30.0, tickers=("BTCUSDT",), klines=None):
+    ms = MarketStream(server.url, kline_store=store, log=lambda _m: None, stale_sec=stale_sec)
+    ms.set_subscriptions(tickers, klines)
+    assert ms.start()
+    server.wait_for(lambda m: m.get("op") == "subscribe")
+    wait_until(lambda: ms._connected)
+    return ms
+
+
+def _subscribed(server, op="subscribe") -> list:
+    return sorted(t for m in server.ops(op) for t in m["args"])
+
+
+def _ticker_msg(symbol, type_, **fields):
+    return {"topic": f"tickers.{symbol}", "type": type_, "ts": int(time.time() * 1000),
+            "data": {"symbol": symbol, **fields}}
+
+
+SNAPSHOT = {"lastPrice": "100.5", "bid1Price": "100.4", "ask1Price": "100.6",
+            "markPrice": "100.45", "turnover24h": "123456.7", "price24hPcnt": "0.052"}
+
+
+# ── Ticker ────────────────────────────────────────────────────────────────────
+def test_ticker_snapshot_then_delta_merges_fields(server):
+    ms = _start(server)
+    seen = []
+    ms.add_listener(lambda sym, t: seen.append((sym, t)))
+    try:
+        server.push(_ticker_msg("BTCUSDT", "snapshot", **SNAPSHOT))
+        wait_until(lambda: ms.get_ticker("BTCUSDT") is not None)
+        t = ms.get_ticker("BTCUSDT")
+        assert (t["price"], t["bid1"], t["ask1"], t["mark"]) == (100.5, 100.4, 100.6, 100.45)
+        assert t["price24hPcnt"] == 0.052
+
+        # Il delta porta solo i campi cambiati: gli altri restano dallo snapshot.
+        server.push(_ticker_msg("BTCUSDT", "delta", lastPrice="101", bid1Price=""))
+        wait_until(lambda: ms.get_ticker("BTCUSDT")["price"] == 101.0)
+        t = ms.get_ticker("BTCUSDT")
+        assert (t["bid1"], t["ask1"], t["mark"], t["turnover24h"]) == (100.4, 100.6, 100.45, 123456.7)
+        assert [sym for sym, _ in seen] == ["BTCUSDT", "BTCUSDT"]
+        assert seen[-1][1]["price"] == 101.0
+    finally:
+        ms.stop()
+
+
+def test_unknown_symbol_has_no_ticker(server):
+    ms = _start(server)
+    try:
+        assert ms.get_ticker("ETHUSDT") is None
+    finally:
+        ms.stop()
+
+
+# ── Fallback REST ─────────────────────────────────────────────────────────────
+def test_stale_ticker_falls_back_to_rest(server):
+    ms = _start(server, stale_sec=0.3)
+    try:
+        server.push(_ticker_msg("BTCUSDT", "snapshot", **SNAPSHOT))
+        wait_until(lambda: ms.get_ticker("BTCUSDT") is not None)
+        assert ms.is_fresh()
+        time.sleep(0.45)
+        assert ms.get_ticker("BTCUSDT") is None
+        assert not ms.is_fresh()
+    finally:
+        ms.stop()
+
+
+def test_disconnect_falls_back_to_rest_and_resubscribes(server):
+    ms = _start(server, tickers=("BTCUSDT", "ETHUSDT"))
+    try:
+        server.push(_ticker_msg("BTCUSDT", "snapshot", **SNAPSHOT))
+        wait_until(lambda: ms.get_ticker("BTCUSDT") is not None)
+
+        server.drop()
+        wait_until(lambda: ms.get_ticker("BTCUSDT") is None)
+        assert not ms.is_fresh()
+
+        # Riconnessione: tutti i topic correnti vengono sottoscritti di nuovo.
+        server.wait_connections(2)
+        wait_until(lambda: len(server.ops("subscribe")) >= 2)
+        assert server.ops("subscribe")[-1]["args"] == ["tickers.BTCUSDT", "tickers.ETHUSDT"]
+        wait_until(lambda: ms._connected)
+        server.push(_ticker_msg("BTCUSDT", "snapshot", **SNAPSHOT))
+        wait_until(lambda: ms.get_ticker("BTCUSDT") is not None)
+    finally:
+        ms.stop()
+
+
+# ── Sottoscrizioni ────────────────────────────────────────────────────────────
+def test_set_subscriptions_sends_only_differences(server):
+    ms = _start(server, tickers=("AUSDT", "BUSDT"), klines={"60": ["AUSDT"]})
+    try:
+        assert _subscribed(server) == ["kline.60.AUSDT", "tickers.AUSDT", "tickers.BUSDT"]
+        server.push(_ticker_msg("AUSDT", "snapshot", **SNAPSHOT))
+        wait_until(lambda: ms.get_ticker("AUSDT") is not None)
+
+        ms.set_subscriptions(["BUSDT", "CUSDT"], {"60": ["CUSDT"]})
+        server.wait_for(lambda m: m.get("op") == "unsubscribe")
+        wait_until(lambda: len(server.ops("subscribe")) == 2)
+        assert _subscribed(server, "unsubscribe") == ["kline.60.AUSDT", "tickers.AUSDT"]
+        assert server.ops("subscribe")[-1]["args"] == ["kline.60.CUSDT", "tickers.CUSDT"]
+        # Ticker di un simbolo non più sottoscritto: scartato subito
+        assert ms.get_ticker("AUSDT") is None
+
+        n_msgs = len(server.received)
+        ms.set_subscriptions(["BUSDT", "CUSDT"], {"60": ["CUSDT"]})
+        time.sleep(0.1)
+        assert len(server.received) == n_msgs     # nessuna differenza, nessun messaggio
+    finally:
+        ms.stop()
+
+
+def test_subscribe_is_chunked(server):
+    symbols = [f"C{i:02d}USDT" for i in range(25)]
+    ms = _start(server, tickers=symbols)
+    try:
+        wait_until(lambda: len(_subscribed(server)) == 25)
+        sizes = [len(m["args"]) for m in server.ops("subscribe")]
+        assert sizes == [10, 10, 5]
+    finally:
+        ms.stop()
+
+
+# ── Kline → KlineStore ────────────────────────────────────────────────────────
+def _bar(start_ms: int, close: float) -> dict:
+    return {"start": start_ms, "end": start_ms + HOUR_MS - 1, "interval": "60",
+            "open": str(close - 1), "high": str(close + 1), "low": str(close - 2),
+            "close": str(close), "volume": "10", "turnover": str(10 * close),
+            "confirm": False, "timestamp": start_ms}
+
+
+def test_kline_push_reaches_kline_store(server, kline_session):
+    cur = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+    rows = [[str(cur - i * HOUR_MS), "1", "2", "0.5", str(100 - i), "5", "500"] for i in range(10)]
+    store = KlineStore(kline_session(rows), "http://rest.invalid")
+    ts, _ = store.get_arrays("BTCUSDT", "60", 10)
+    assert int(ts[-1]) == cur
+
+    ms = _start(server, store=store, tickers=(), klines={"60": ["BTCUSDT"]})
+    try:
+        assert _subscribed(server) == ["kline.60.BTCUSDT"]
+        # Aggiornamento della barra in formazione
+        server.push({"topic": "kline.60.BTCUSDT", "type": "snapshot",
+                     "data": [_bar(cur, 123.0)]})
+        wait_until(lambda: store.get_arrays("BTCUSDT", "60", 10)[1][-1, 3] == 123.0)
+        # Barra successiva: la finestra scorre
+        server.push({"topic": "kline.60.BTCUSDT", "type": "snapshot",
+                     "data": [_bar(cur + HOUR_MS, 124.0)]})
+        wait_until(lambda: int(store.get_arrays("BTCUSDT", "60", 10)[0][-1]) == cur + HOUR_MS)
+        ts, vals = store.get_arrays("BTCUSDT", "60", 10)
+        assert len(ts) == 10
+        np.testing.assert_array_equal(vals[-2:, 3], [123.0, 124.0])
+        assert vals[-1].tolist() == [123.0, 125.0, 122.0, 124.0, 10.0, 1240.0]
+        # Buco (barra non contigua): ignorata, la colmerà il REST
+        server.push({"topic": "kline.60.BTCUSDT", "type": "snapshot",
+                     "data": [_bar(cur + 3 * HOUR_MS, 200.0)]})
+        server.push({"topic": "kline.60.BTCUSDT", "type": "snapshot",
+                     "data": [_bar(cur + HOUR_MS, 125.0)]})
+        wait_until(lambda: store.get_arrays("BTCUSDT", "60", 10)[1][-1, 3] == 125.0)
+        assert int(store.get_arrays("BTCUSDT", "60", 10)[0][-1]) == cur + HOUR_MS
+    finally:
+        ms.stop()
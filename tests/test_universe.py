@@ -0,0 +1,97 @@
+import json
+
+from bybit_core.config import BLOCKED_SYMBOLS_TTL_H
+from bybit_core.universe import Blocklist, EligibleUniverse, SymbolFilter
+
+TTL_SEC = BLOCKED_SYMBOLS_TTL_H * 3600
+SYMBOLS = ("BTCUSDT", "ETHUSDT", "SOLUSDT", "ETHBTC", "USDCUSDT", "1000PEPEUSDT")
+
+
+class _Clock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _universe(tmp_path, clock):
+    flt = SymbolFilter("USDT", substrings=("1000",), symbols=("USDCUSDT",))
+    bl = Blocklist(str(tmp_path / "blocked.json"), TTL_SEC, log=lambda _m: None, clock=clock)
+    return EligibleUniverse(flt, bl), bl
+
+
+def test_filter_and_cache(tmp_path):
+    uni, _ = _universe(tmp_path, _Clock())
+    first = uni.get(1, SYMBOLS)
+    assert first == {"BTCUSDT", "ETHUSDT", "SOLUSDT"}
+    assert uni.get(1, SYMBOLS) is first
+    assert uni.rebuilds == 1
+    uni.get(2, SYMBOLS + ("XRPUSDT",))
+    assert uni.rebuilds == 2
+
+
+def test_block_excludes_symbol_and_persists(tmp_path):
+    clock = _Clock()
+    uni, bl = _universe(tmp_path, clock)
+    uni.get(1, SYMBOLS)
+    bl.add("ETHUSDT")
+    assert "ETHUSDT" in bl
+    assert uni.get(1, SYMBOLS) == {"BTCUSDT", "SOLUSDT"}
+
+    saved = json.loads((tmp_path / "blocked.json").read_text())
+    assert saved == {"ETHUSDT": clock.now}
+    # Riavvio: la blocklist riletta esclude ancora il simbolo
+    clock.now += 3600
+    uni2, bl2 = _universe(tmp_path, clock)
+    assert bl2.load() == 1
+    assert uni2.get(1, SYMBOLS) == {"BTCUSDT", "SOLUSDT"}
+
+
+def test_expired_block_readmits_symbol_without_other_changes(tmp_path):
+    clock = _Clock()
+    uni, bl = _universe(tmp_path, clock)
+    bl.add("ETHUSDT")
+    clock.now += 10
+    bl.add("SOLUSDT")
+    assert uni.get(1, SYMBOLS) == {"BTCUSDT"}
+
+    # Subito prima della scadenza: nessun ricalcolo
+    clock.now += TTL_SEC - 11
+    assert uni.get(1, SYMBOLS) == {"BTCUSDT"}
+    assert uni.rebuilds == 1
+
+    # Scade il primo blocco: stessa versione strumenti, stesso filtro
+    clock.now += 1
+    assert "ETHUSDT" not in bl
+    assert uni.get(1, SYMBOLS) == {"BTCUSDT", "ETHUSDT"}
+    assert uni.rebuilds == 2
+    assert len(bl) == 1
+
+    clock.now += 10
+    assert uni.get(1, SYMBOLS) == {"BTCUSDT", "ETHUSDT", "SOLUSDT"}
+    assert len(bl) == 0
+    # Nessun blocco rimasto: niente più ricalcoli
+    clock.now += 10 * TTL_SEC
+    uni.get(1, SYMBOLS)
+    assert uni.rebuilds == 3
+
+
+def test_load_drops_expired_blocks(tmp_path):
+    clock = _Clock()
+    path = tmp_path / "blocked.json"
+    path.write_text(json.dumps({"ETHUSDT": clock.now - TTL_SEC - 1,
+                                "SOLUSDT": clock.now - TTL_SEC + 60}))
+    uni, bl = _universe(tmp_path, clock)
+    assert bl.load() == 1
+    assert uni.get(1, SYMBOLS) == {"BTCUSDT", "ETHUSDT"}
+    clock.now += 60
+    assert uni.get(1, SYMBOLS) == {"BTCUSDT", "ETHUSDT", "SOLUSDT"}
+
+
+def test_unreadable_file_starts_empty(tmp_path):
+    (tmp_path / "blocked.json").write_text("{not json")
+    logged = []
+    bl = Blocklist(str(tmp_path / "blocked.json"), TTL_SEC, log=logged.append)
+    assert bl.load() == 0
+    assert logged and logged[0].startswith("[BLOCK]")